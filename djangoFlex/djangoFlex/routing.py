@@ -1,9 +1,16 @@
 from channels.routing import ProtocolTypeRouter, URLRouter
 from django.core.asgi import get_asgi_application
-from django.urls import path
-from clients import rabbitmq_websocket_urlpatterns
 
-# Redefine websocket_application by including the imported patterns and Socket.IO
-websocket_urlpatterns = URLRouter(
-    path("rabbitmq_io/", rabbitmq_websocket_urlpatterns)
-)
+# 先初始化 Django，再載入會使用 models 的 consumers
+django_asgi_app = get_asgi_application()
+
+from djangoFlex_servers.videoCap_server.routing import websocket_urlpatterns as videocap_websocket_urlpatterns
+
+websocket_urlpatterns = [
+    *videocap_websocket_urlpatterns,
+]
+
+application = ProtocolTypeRouter({
+    "http": django_asgi_app,
+    "websocket": URLRouter(websocket_urlpatterns),
+})
@@ -37,6 +37,17 @@ SRS_SERVER_HOST = os.getenv("SRS_SERVER_HOST", SRS_HOST)
 SRS_SERVER_PORT = int(os.getenv("SRS_SERVER_PORT", "1935"))
 SRS_HTTP_SERVER_PORT = int(os.getenv("SRS_HTTP_SERVER_PORT", "8080"))
 
+# Video Capture Configuration
+# 設定 VIDEO_CAP_SUPERVISOR_HOST 後，擷取改由 `manage.py run_capture_supervisor` 進程執行
+VIDEO_CAP_SUPERVISOR_HOST = os.getenv("VIDEO_CAP_SUPERVISOR_HOST")
+VIDEO_CAP_SUPERVISOR_PORT = int(os.getenv("VIDEO_CAP_SUPERVISOR_PORT", "6010"))
+VIDEO_CAP_SUPERVISOR_ADDRESS = (VIDEO_CAP_SUPERVISOR_HOST, VIDEO_CAP_SUPERVISOR_PORT) if VIDEO_CAP_SUPERVISOR_HOST else None
+# 控制通道的驗證金鑰，web 端與 supervisor 需設定相同的值
+VIDEO_CAP_SUPERVISOR_AUTHKEY = os.getenv("VIDEO_CAP_SUPERVISOR_AUTHKEY")
+# 最新幀存放於 Redis（redis）或進程內記憶體（memory），不再寫入資料庫
+VIDEO_CAP_FRAME_STORE = os.getenv("VIDEO_CAP_FRAME_STORE", "redis")
+VIDEO_CAP_FRAME_STORE_URL = os.getenv("VIDEO_CAP_FRAME_STORE_URL", "redis://redis:6379/1")
+
 # VisionAI Configuration
 VISIONAI_RULE_CONFIG_PATH = os.getenv("VISIONAI_RULE_CONFIG_PATH", "djangoFlex_servers/visionAI_server/type_initial_config/rule.yaml")
 VISIONAI_ROLE_CONFIG_PATH = os.getenv("VISIONAI_ROLE_CONFIG_PATH", "djangoFlex_servers/visionAI_server/type_initial_config/role.yaml")
@@ -8,8 +8,9 @@ from django.utils import timezone
 
 # from .services.videoCap_service import VideoCapService
 from .services.video_cap_manager import VideoCapManager
+from .services.camera_online_prober import CameraOnlineProber
 
-from .models import VideoCapConfig, CurrentVideoClip, CameraList
+from .models import VideoCapConfig, CurrentVideoClip, CameraList, StreamProbe
 from ..visionAI_server.models import CameraDrawingStatus
 from ..visionAI_server.api_draw import DrawView
 from .views import VideoCapServerView
@@ -21,9 +22,14 @@ class VideoCapConfigAdmin(admin.ModelAdmin):
 
 @admin.register(CurrentVideoClip)
 class CurrentVideoClipAdmin(admin.ModelAdmin):
-    list_display = ('config', 'clip_path', 'start_time', 'end_time', 'duration', 'processed')
+    list_display = ('config', 'clip_path', 'start_time', 'end_time', 'duration', 'sequence_number', 'processed')
     readonly_fields = ('duration',)
 
+@admin.register(StreamProbe)
+class StreamProbeAdmin(admin.ModelAdmin):
+    list_display = ('rtmp_url', 'is_online', 'codec_name', 'width', 'height', 'fps', 'bit_rate', 'probed_at')
+    readonly_fields = ('probed_at',)
+
 @admin.register(CameraList)
 class CameraListAdmin(admin.ModelAdmin):
     list_display = ('camera_name', 'camera_url', 'camera_online_status', 'camera_status_display', 'start_stop_button', 'drawing_status_display', 'drawing_control_button')
@@ -50,8 +56,10 @@ class CameraListAdmin(admin.ModelAdmin):
     start_stop_button.short_description = '錄影操作'
 
     def camera_online_status(self, obj):
-        is_online = VideoCapManager().check_camera_online(rtmp_url=obj.camera_url)
-        print('is_online:', is_online)
+        # 從背景探測的快取讀取，避免每列都啟動 ffmpeg
+        is_online = CameraOnlineProber.get_instance().get_status(obj.camera_url)
+        if is_online is None:
+            return format_html('<span style="color: {};">{}</span>', 'gray', '檢查中')
         return format_html('<span style="color: {};">{}</span>',
                            'green' if is_online else 'red',
                            '在線' if is_online else '離線')
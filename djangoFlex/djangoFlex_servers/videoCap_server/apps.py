@@ -7,8 +7,14 @@ class VideoCapServerConfig(AppConfig):
     name = "djangoFlex_servers.videoCap_server"
 
     def ready(self):
+        from . import signals
+
         try:
             from .repositories.video_cap_repository import VideoCapRepository
+            from .utils.config_loader import ConfigLoader
+            # 使用 capture supervisor 時，擷取狀態由 supervisor 進程負責重置
+            if ConfigLoader.load_config().supervisor_address:
+                return
             VideoCapRepository.reset_video_cap_system()
         except ProgrammingError:
             pass
\ No newline at end of file
@@ -0,0 +1,138 @@
+import asyncio
+import contextlib
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+from .logs.log_manager import LogManager
+from .services.latest_frame_store import get_latest_frame_store, annotated_frame_key
+from .services.snapshot_service import SnapshotService
+
+class LatestFrameMailbox:
+    """
+    只保留最新一幀的信箱：寫入永不阻塞，送出較慢時舊幀直接被覆蓋，
+    每個連線最多只佔用一幀的記憶體。
+    """
+
+    def __init__(self):
+        self.frame = None
+        self.event = asyncio.Event()
+        self.dropped = 0
+
+    def put(self, frame):
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = frame
+        self.event.set()
+
+    async def get(self):
+        await self.event.wait()
+        self.event.clear()
+        frame, self.frame = self.frame, None
+        return frame
+
+class FrameBroadcaster:
+    """
+    同一進程內每個畫面來源（攝影機或標註畫面）只有一個訂閱與一個背景 task，
+    收到新版本時讀取一次畫面，再放進每個連線的 LatestFrameMailbox。
+    最後一個連線離開時取消 task 並關閉訂閱。
+    """
+    _broadcasters = {}
+    wait_timeout = 1
+    retry_delay = 1
+
+    @classmethod
+    def join(cls, frame_key, mailbox):
+        broadcaster = cls._broadcasters.get(frame_key)
+        if broadcaster is None:
+            broadcaster = cls._broadcasters[frame_key] = cls(frame_key)
+        broadcaster.mailboxes.add(mailbox)
+        if broadcaster.latest_frame is not None:
+            mailbox.put(broadcaster.latest_frame)
+        return broadcaster
+
+    def __init__(self, frame_key):
+        self.frame_key = frame_key
+        self.frame_store = get_latest_frame_store()
+        self.logger = LogManager.get_logger(__name__)
+        self.mailboxes = set()
+        self.latest_frame = None
+        self.task = asyncio.create_task(self._run())
+
+    async def leave(self, mailbox):
+        self.mailboxes.discard(mailbox)
+        if self.mailboxes or self._broadcasters.get(self.frame_key) is not self:
+            return
+        del self._broadcasters[self.frame_key]
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await self.task
+
+    def _broadcast(self, frame):
+        if frame is None:
+            return
+        self.latest_frame = frame
+        for mailbox in self.mailboxes:
+            mailbox.put(frame)
+
+    async def _run(self):
+        while True:
+            subscription = None
+            try:
+                subscription = await self.frame_store.subscribe(self.frame_key)
+                self._broadcast(await subscription.get())
+                while True:
+                    version = await subscription.wait(self.wait_timeout)
+                    if version is not None:
+                        self._broadcast(await subscription.get())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.warning(f"預覽訂閱 {self.frame_key} 發生錯誤，稍後重試: {str(e)}")
+                await asyncio.sleep(self.retry_delay)
+            finally:
+                if subscription is not None:
+                    with contextlib.suppress(Exception):
+                        await subscription.close()
+
+class CameraPreviewConsumer(AsyncWebsocketConsumer):
+    """
+    以 WebSocket 推送攝影機的 JPEG 畫面（?annotated=1 時推送繪圖服務的標註畫面）。
+
+    畫面來自最新幀存放區的 pub/sub 通知，不接觸擷取流程；同一攝影機的所有連線共用
+    一個 FrameBroadcaster，每個連線有自己的 LatestFrameMailbox，較慢的客戶端只會跳過畫面。
+    """
+
+    async def connect(self):
+        camera_name = self.scope['url_route']['kwargs']['camera_name']
+        query = parse_qs(self.scope['query_string'].decode())
+        annotated = query.get('annotated', ['0'])[0] in ('1', 'true')
+
+        rtmp_url = await database_sync_to_async(SnapshotService.get_instance().resolve_camera)(camera_name)
+        if rtmp_url is None:
+            await self.close(code=4404)
+            return
+
+        frame_key = annotated_frame_key(rtmp_url) if annotated else rtmp_url
+        await self.accept()
+        self.mailbox = LatestFrameMailbox()
+        self.broadcaster = FrameBroadcaster.join(frame_key, self.mailbox)
+        self.send_task = asyncio.create_task(self._send_frames())
+
+    async def disconnect(self, close_code):
+        send_task = getattr(self, 'send_task', None)
+        if send_task is None:
+            return
+        self.send_task = None
+        send_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, Exception):
+            await send_task
+        await self.broadcaster.leave(self.mailbox)
+
+    async def _send_frames(self):
+        last_version = None
+        while True:
+            frame = await self.mailbox.get()
+            if frame.version == last_version:
+                continue
+            last_version = frame.version
+            await self.send(bytes_data=frame.data)
@@ -1,2 +1,14 @@
 class VideoCapException(Exception):
     pass
+
+class ExportRangeError(VideoCapException):
+    """匯出範圍不合法（順序錯誤、超過上限或跨越不同的片段格式）"""
+    pass
+
+class ExportNotFoundError(VideoCapException):
+    """找不到攝影機或範圍內沒有可用的片段"""
+    pass
+
+class SupervisorUnavailableError(VideoCapException):
+    """無法連線至 capture supervisor（連線被拒、中途斷線或驗證失敗）"""
+    pass
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from djangoFlex_servers.videoCap_server.repositories.video_cap_repository import VideoCapRepository
+from djangoFlex_servers.videoCap_server.services.capture_supervisor import CaptureSupervisor
+from djangoFlex_servers.videoCap_server.services.segment_retention_service import SegmentRetentionService
+from djangoFlex_servers.videoCap_server.utils.config_loader import ConfigLoader
+
+class Command(BaseCommand):
+    help = 'Run the capture supervisor that executes camera capture in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+        parser.add_argument('--start-all', action='store_true', help='Start every camera in CameraList on launch')
+
+    def handle(self, *args, **options):
+        config = ConfigLoader.load_config()
+        if not config.supervisor_address:
+            raise CommandError('VIDEO_CAP_SUPERVISOR_ADDRESS is not configured')
+        if not config.supervisor_authkey:
+            raise CommandError('VIDEO_CAP_SUPERVISOR_AUTHKEY is not configured')
+
+        VideoCapRepository.reset_video_cap_system()
+
+        supervisor = CaptureSupervisor(num_workers=options['workers'])
+        supervisor.start()
+        SegmentRetentionService.get_instance().start()
+        self.stdout.write(self.style.SUCCESS(f'Capture supervisor started with {len(supervisor.workers)} workers'))
+
+        if options['start_all']:
+            started_count, total_count, _ = supervisor.start_all_video_cap_service()
+            self.stdout.write(f'Started {started_count} out of {total_count} video capture servers')
+
+        try:
+            supervisor.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            SegmentRetentionService.get_instance().stop()
+            supervisor.shutdown()
+            self.stdout.write(self.style.SUCCESS('Capture supervisor stopped'))
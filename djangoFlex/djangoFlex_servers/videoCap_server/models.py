@@ -25,11 +25,15 @@ class CurrentVideoClip(models.Model):
     end_time = models.DateTimeField(null=True, blank=True)
     duration = models.FloatField(null=True, blank=True)  # Duration in seconds
     processed = models.BooleanField(default=False)  # Flag to indicate if AI processing is done
+    sequence_number = models.BigIntegerField(null=True, blank=True)  # HLS media sequence number
 
     class Meta:
         verbose_name = "Video Clip"
         verbose_name_plural = "Video Clips"
         ordering = ['-start_time']
+        indexes = [
+            models.Index(fields=['config', 'start_time'], name='videoclip_config_start_idx'),
+        ]
 
     def __str__(self):
         return f"Video Clip for {self.config.rtmp_url} from {self.start_time} to {self.end_time}"
@@ -51,3 +55,20 @@ class CameraList(models.Model):
 
     def __str__(self):
         return f"Camera: {self.camera_name}, URL={self.camera_url}, Status={self.camera_status}"
+
+class StreamProbe(models.Model):
+    rtmp_url = models.CharField(max_length=255, unique=True)
+    is_online = models.BooleanField(default=False)
+    codec_name = models.CharField(max_length=50, null=True, blank=True)
+    width = models.IntegerField(null=True, blank=True)
+    height = models.IntegerField(null=True, blank=True)
+    fps = models.FloatField(null=True, blank=True)
+    bit_rate = models.BigIntegerField(null=True, blank=True)
+    probed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Stream Probe"
+        verbose_name_plural = "Stream Probes"
+
+    def __str__(self):
+        return f"Stream probe for {self.rtmp_url}: {self.codec_name} {self.width}x{self.height}@{self.fps}"
@@ -1,7 +1,17 @@
+import time
+import threading
+from datetime import timedelta
 from django.db import transaction
-from ..models import VideoCapConfig, CurrentVideoClip
+from ..models import VideoCapConfig, CurrentVideoClip, StreamProbe
+from ..utils.config_loader import ConfigLoader
 
 class VideoCapRepository:
+    # rtmp_url -> (VideoCapConfig, 快取時間)。save/delete 由 signals 失效，
+    # QuerySet.update 不會觸發 signals，需在呼叫處明確失效；TTL 作為跨進程的保險
+    _config_cache = {}
+    _config_cache_lock = threading.Lock()
+    _config_cache_ttl = None
+
     @staticmethod
     def get_or_create_config(rtmp_url):
         config, created = VideoCapConfig.objects.get_or_create(rtmp_url=rtmp_url)
@@ -10,35 +20,94 @@ class VideoCapRepository:
             config.save()
         return config
 
-    @staticmethod
-    def get_config(rtmp_url):
-        return VideoCapConfig.objects.get(rtmp_url=rtmp_url)
+    @classmethod
+    def get_config(cls, rtmp_url):
+        now = time.time()
+        with cls._config_cache_lock:
+            cached = cls._config_cache.get(rtmp_url)
+        if cached is not None and now - cached[1] < cls._cache_ttl():
+            return cached[0]
+
+        config = VideoCapConfig.objects.get(rtmp_url=rtmp_url)
+        with cls._config_cache_lock:
+            cls._config_cache[rtmp_url] = (config, now)
+        return config
+
+    @classmethod
+    def invalidate_config(cls, rtmp_url=None):
+        with cls._config_cache_lock:
+            if rtmp_url is None:
+                cls._config_cache.clear()
+            else:
+                cls._config_cache.pop(rtmp_url, None)
+
+    @classmethod
+    def _cache_ttl(cls):
+        if cls._config_cache_ttl is None:
+            cls._config_cache_ttl = ConfigLoader.load_config().config_cache_ttl
+        return cls._config_cache_ttl
 
     @staticmethod
     def set_config_active(config, is_active):
         config.is_active = is_active
         config.save()
 
+    @staticmethod
+    def update_config_active(rtmp_url, is_active):
+        VideoCapConfig.objects.filter(rtmp_url=rtmp_url).update(is_active=is_active)
+        VideoCapRepository.invalidate_config(rtmp_url)
+
     @staticmethod
     def set_config_inactive(rtmp_url):
-        VideoCapConfig.objects.filter(rtmp_url=rtmp_url).update(is_active=False)
+        VideoCapRepository.update_config_active(rtmp_url, False)
 
     @staticmethod
     @transaction.atomic
     def reset_video_cap_system():
         CurrentVideoClip.objects.all().delete()
         VideoCapConfig.objects.update(is_active=False)
+        VideoCapRepository.invalidate_config()
 
     @staticmethod
-    def create_current_video_clip(config, clip_path, start_time, end_time, duration):
+    def create_current_video_clip(config, clip_path, start_time, end_time, duration, sequence_number=None):
         return CurrentVideoClip.objects.create(
             config=config,
             clip_path=clip_path,
             start_time=start_time,
             end_time=end_time,
-            duration=duration
+            duration=duration,
+            sequence_number=sequence_number
         )
 
+    @staticmethod
+    def get_clips_in_range(config, start_time, end_time, max_segment_duration):
+        # 與範圍重疊的片段，開始時間必定落在 [start_time - 最長片段時長, end_time) 內；
+        # 對 start_time 設上下界，(config, start_time) 複合索引才是有界的範圍搜尋，而不是掃過所有歷史
+        return CurrentVideoClip.objects.filter(
+            config=config,
+            start_time__gte=start_time - timedelta(seconds=max_segment_duration),
+            start_time__lt=end_time,
+            end_time__gt=start_time
+        ).order_by('start_time')
+
     @staticmethod
     def delete_current_video_clips(config):
         CurrentVideoClip.objects.filter(config=config).delete()
+
+    @staticmethod
+    def save_stream_probe(rtmp_url, probe_result):
+        defaults = {'is_online': probe_result is not None}
+        if probe_result is not None:
+            defaults.update(
+                codec_name=probe_result.codec_name,
+                width=probe_result.width,
+                height=probe_result.height,
+                fps=probe_result.fps,
+                bit_rate=probe_result.bit_rate
+            )
+        stream_probe, _ = StreamProbe.objects.update_or_create(rtmp_url=rtmp_url, defaults=defaults)
+        return stream_probe
+
+    @staticmethod
+    def get_stream_probe(rtmp_url):
+        return StreamProbe.objects.filter(rtmp_url=rtmp_url).first()
@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import CameraPreviewConsumer
+
+websocket_urlpatterns = [
+    path('ws/videocap/preview/<str:camera_name>/', CameraPreviewConsumer.as_asgi()),
+]
@@ -0,0 +1,93 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+from ..models import CameraList
+from .stream_probe_service import StreamProbeService
+
+class CameraOnlineProber:
+    """
+    背景定期並行檢查所有攝影機是否在線，結果附 TTL 快取。
+
+    admin 列表只讀取快取，不會在頁面渲染時啟動 ffmpeg；
+    快取中沒有的攝影機會立即排入探測，結果出來前回傳 None。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+                cls._instance.start()
+            return cls._instance
+
+    def __init__(self):
+        self.config = ConfigLoader.load_config()
+        self.logger = LogManager.get_logger(__name__)
+        self.executor = ThreadPoolExecutor(max_workers=self.config.online_probe_concurrency,
+                                           thread_name_prefix='camera-online-prober')
+        self.results = {}
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._probe_loop, name='camera-online-prober', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.executor.shutdown(wait=False)
+
+    def get_status(self, rtmp_url):
+        with self.lock:
+            entry = self.results.get(rtmp_url)
+            if entry is not None and time.time() - entry[1] <= self.config.online_probe_ttl:
+                return entry[0]
+        self._schedule(rtmp_url)
+        return None
+
+    def probe_all(self):
+        try:
+            camera_urls = list(CameraList.objects.values_list('camera_url', flat=True))
+        finally:
+            connection.close()
+        for camera_url in camera_urls:
+            self._schedule(camera_url)
+
+    def _probe_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                self.probe_all()
+            except Exception as e:
+                self.logger.error(f"排程攝影機在線檢查時發生錯誤: {str(e)}")
+            self.stop_event.wait(self.config.online_probe_interval)
+
+    def _schedule(self, rtmp_url):
+        with self.lock:
+            if rtmp_url in self.pending:
+                return
+            self.pending.add(rtmp_url)
+        try:
+            self.executor.submit(self._probe_one, rtmp_url)
+        except RuntimeError:
+            # executor 已關閉
+            with self.lock:
+                self.pending.discard(rtmp_url)
+
+    def _probe_one(self, rtmp_url):
+        try:
+            # 只讀取串流標頭，並順便保存串流參數供後續重用
+            stream_probe = StreamProbeService.probe(rtmp_url)
+            with self.lock:
+                self.results[rtmp_url] = (stream_probe.is_online, time.time())
+        except Exception as e:
+            self.logger.error(f"檢查攝影機 {rtmp_url} 是否在線時發生錯誤: {str(e)}")
+        finally:
+            connection.close()
+            with self.lock:
+                self.pending.discard(rtmp_url)
@@ -0,0 +1,62 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.db import connection
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+
+class CameraSupervisor:
+    """
+    以有上限的並行度批次啟動、停止或重連攝影機。
+
+    每次提交之間會錯開 start_stagger 秒，避免同時對 SRS 發起大量連線；
+    回傳每支攝影機的執行結果，順序與輸入相同。
+    """
+
+    def __init__(self, manager, max_concurrency=None, stagger=None):
+        config = ConfigLoader.load_config()
+        self.logger = LogManager.get_logger(__name__)
+        self.manager = manager
+        self.max_concurrency = max_concurrency or config.start_concurrency
+        self.stagger = config.start_stagger if stagger is None else stagger
+
+    def start_cameras(self, rtmp_urls):
+        return self._run(self.manager.start_video_cap_service, rtmp_urls)
+
+    def stop_cameras(self, rtmp_urls):
+        # 停止不會連線到來源，不需要錯開
+        return self._run(self.manager.stop_video_cap_service, rtmp_urls, stagger=0)
+
+    def reconnect_cameras(self, rtmp_urls):
+        return self._run(self.manager.restart_video_cap_service, rtmp_urls)
+
+    def _run(self, operation, rtmp_urls, stagger=None):
+        stagger = self.stagger if stagger is None else stagger
+        rtmp_urls = list(dict.fromkeys(rtmp_urls))
+        if not rtmp_urls:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(rtmp_urls)),
+                                thread_name_prefix='camera-supervisor') as executor:
+            futures = []
+            for index, rtmp_url in enumerate(rtmp_urls):
+                if index and stagger:
+                    time.sleep(stagger)
+                futures.append(executor.submit(self._run_one, operation, rtmp_url))
+            return [future.result() for future in futures]
+
+    def _run_one(self, operation, rtmp_url):
+        started_at = time.time()
+        try:
+            success, message = operation(rtmp_url)
+        except Exception as e:
+            self.logger.error(f"批次操作 {rtmp_url} 時發生錯誤: {str(e)}")
+            success, message = False, str(e)
+        finally:
+            # 執行緒池中的線程不會經過 request 週期，需自行關閉資料庫連線
+            connection.close()
+        return {
+            'rtmp_url': rtmp_url,
+            'success': success,
+            'message': message,
+            'elapsed': round(time.time() - started_at, 3)
+        }
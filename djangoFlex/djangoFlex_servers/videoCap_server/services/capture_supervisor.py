@@ -0,0 +1,219 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+from ..exceptions.video_cap_exceptions import VideoCapException
+from ..models import CameraList
+from .capture_worker import capture_worker_main
+
+# 控制通道允許呼叫的方法，與 VideoCapManager 的公開介面一致
+CONTROL_METHODS = (
+    'start_video_cap_service',
+    'stop_video_cap_service',
+    'get_service_running_status',
+    'start_all_video_cap_service',
+    'stop_all_video_cap_service',
+    'list_running_threads',
+)
+
+class CaptureWorker:
+    def __init__(self, index, context):
+        self.index = index
+        self.context = context
+        self.lock = threading.Lock()
+        self.cameras = set()
+        self.process = None
+        self.conn = None
+
+    def start(self):
+        parent_conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=capture_worker_main,
+            args=(child_conn,),
+            name=f"capture-worker-{self.index}",
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.cameras.clear()
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def call(self, method, *args):
+        with self.lock:
+            if not self.is_alive():
+                self.start()
+            self.conn.send((method, args))
+            status, result = self.conn.recv()
+        if status == 'error':
+            raise VideoCapException(result)
+        return result
+
+    def shutdown(self):
+        if not self.is_alive():
+            return
+        try:
+            self.call('shutdown')
+        finally:
+            self.process.join(timeout=15)
+            if self.process.is_alive():
+                self.process.terminate()
+
+class CaptureSupervisor:
+    """
+    在專用進程中管理攝影機擷取：攝影機平均分配到與 CPU 核心數相同的 worker 進程，
+    並透過 multiprocessing.connection 控制通道接收 web 端的 start/stop/status 指令。
+
+    supervisor 本身是多線程進程（控制通道、各 worker 的呼叫），在其中 fork 可能複製到
+    被其他線程持有的鎖（logging、資料庫、Listener）而讓子進程死鎖，因此 worker 一律以 spawn 啟動。
+    """
+
+    def __init__(self, num_workers=None):
+        self.config = ConfigLoader.load_config()
+        self.logger = LogManager.get_logger(__name__)
+        self.context = multiprocessing.get_context('spawn')
+        num_workers = num_workers or self.config.supervisor_workers or os.cpu_count() or 1
+        self.workers = [CaptureWorker(index, self.context) for index in range(num_workers)]
+        self.assignments = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+        self.logger.info(f"Capture supervisor 已啟動 {len(self.workers)} 個 worker 進程")
+
+    def shutdown(self):
+        for worker in self.workers:
+            try:
+                worker.shutdown()
+            except Exception as e:
+                self.logger.error(f"關閉 worker {worker.index} 時發生錯誤: {str(e)}")
+        self.assignments.clear()
+
+    def serve_forever(self):
+        address = tuple(self.config.supervisor_address)
+        with Listener(address, authkey=self.config.supervisor_authkey.encode()) as listener:
+            self.logger.info(f"Capture supervisor 控制通道監聽於 {address[0]}:{address[1]}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except multiprocessing.AuthenticationError:
+                    self.logger.warning("控制通道收到驗證失敗的連線")
+                    continue
+                threading.Thread(target=self._handle_connection, args=(conn,), daemon=True).start()
+
+    def _handle_connection(self, conn):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except EOFError:
+                    break
+                if method not in CONTROL_METHODS:
+                    conn.send(('error', f"不支援的操作: {method}"))
+                    continue
+                try:
+                    conn.send(('ok', getattr(self, method)(*args)))
+                except Exception as e:
+                    self.logger.error(f"處理控制指令 {method} 時發生錯誤: {str(e)}")
+                    conn.send(('error', str(e)))
+
+    def _assign_worker(self, rtmp_url):
+        with self.lock:
+            worker = self.assignments.get(rtmp_url)
+            if worker is None or not worker.is_alive():
+                worker = min(self.workers, key=lambda w: len(w.cameras) if w.is_alive() else 0)
+                self.assignments[rtmp_url] = worker
+            worker.cameras.add(rtmp_url)
+            return worker
+
+    def _release_worker(self, rtmp_url):
+        with self.lock:
+            worker = self.assignments.pop(rtmp_url, None)
+            if worker is not None:
+                worker.cameras.discard(rtmp_url)
+
+    def start_video_cap_service(self, rtmp_url):
+        worker = self._assign_worker(rtmp_url)
+        try:
+            success, message = worker.call('start_video_cap_service', rtmp_url)
+            if not success and not worker.call('get_service_running_status', rtmp_url):
+                self._release_worker(rtmp_url)
+        except Exception:
+            # worker 呼叫失敗時撤銷分配，下次啟動可改派到其他（或重啟後的）worker
+            self._release_worker(rtmp_url)
+            raise
+        return success, message
+
+    def stop_video_cap_service(self, rtmp_url):
+        worker = self.assignments.get(rtmp_url)
+        if worker is None:
+            return False, "伺服器未找到或未運行"
+        result = worker.call('stop_video_cap_service', rtmp_url)
+        self._release_worker(rtmp_url)
+        return result
+
+    def get_service_running_status(self, rtmp_url):
+        worker = self.assignments.get(rtmp_url)
+        if worker is None or not worker.is_alive():
+            return False
+        return worker.call('get_service_running_status', rtmp_url)
+
+    def _is_running(self, rtmp_url):
+        try:
+            return self.get_service_running_status(rtmp_url)
+        except Exception:
+            return False
+
+    def list_running_threads(self):
+        running_threads = []
+        for worker in self.workers:
+            if not worker.is_alive():
+                continue
+            for thread_info in worker.call('list_running_threads'):
+                thread_info['worker_pid'] = worker.process.pid
+                running_threads.append(thread_info)
+        return running_threads
+
+    def start_all_video_cap_service(self):
+        camera_urls = list(CameraList.objects.values_list('camera_url', flat=True))
+        batches = {}
+        for camera_url in camera_urls:
+            worker = self._assign_worker(camera_url)
+            batches.setdefault(worker, []).append(camera_url)
+
+        # 各 worker 同時啟動自己負責的攝影機，worker 內再以有上限的並行度啟動
+        results = []
+        with ThreadPoolExecutor(max_workers=len(self.workers)) as executor:
+            futures = {executor.submit(worker.call, 'start_video_cap_services', urls): urls for worker, urls in batches.items()}
+            for future, urls in futures.items():
+                try:
+                    results.extend(future.result())
+                except Exception as e:
+                    self.logger.error(f"worker 啟動攝影機失敗: {str(e)}")
+                    results.extend({'rtmp_url': url, 'success': False, 'message': str(e), 'elapsed': 0} for url in urls)
+
+        for result in results:
+            if not result['success'] and not self._is_running(result['rtmp_url']):
+                self._release_worker(result['rtmp_url'])
+
+        order = {camera_url: index for index, camera_url in enumerate(camera_urls)}
+        results.sort(key=lambda result: order[result['rtmp_url']])
+        started_count = sum(1 for result in results if result['success'])
+        return started_count, len(camera_urls), results
+
+    def stop_all_video_cap_service(self):
+        stopped_count = 0
+        for worker in self.workers:
+            if worker.is_alive():
+                stopped_count += worker.call('stop_all_video_cap_service')
+        with self.lock:
+            for worker in self.workers:
+                worker.cameras.clear()
+            self.assignments.clear()
+        return stopped_count
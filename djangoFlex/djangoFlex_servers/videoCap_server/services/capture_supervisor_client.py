@@ -0,0 +1,62 @@
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+from ..logs.log_manager import LogManager
+from ..exceptions.video_cap_exceptions import VideoCapException, SupervisorUnavailableError
+
+class CaptureSupervisorClient:
+    """
+    capture supervisor 控制通道的代理，提供與 VideoCapManager 相同的控制介面，
+    讓 web 端的 start/stop/status 操作不必在 Django 進程內執行擷取。
+    """
+
+    def __init__(self, address, authkey):
+        self.logger = LogManager.get_logger(__name__)
+        if not authkey:
+            raise VideoCapException("未設定 VIDEO_CAP_SUPERVISOR_AUTHKEY，無法連線至 capture supervisor")
+        self.address = tuple(address)
+        self.authkey = authkey.encode()
+
+    def _call(self, method, *args):
+        try:
+            with Client(self.address, authkey=self.authkey) as conn:
+                conn.send((method, args))
+                status, result = conn.recv()
+        except (OSError, EOFError, AuthenticationError) as e:
+            raise SupervisorUnavailableError(f"無法連線至 capture supervisor: {type(e).__name__}: {str(e)}")
+        if status == 'error':
+            raise VideoCapException(result)
+        return result
+
+    def start_video_cap_service(self, rtmp_url):
+        try:
+            return self._call('start_video_cap_service', rtmp_url)
+        except VideoCapException as e:
+            self.logger.error(f"啟動視頻捕獲服務時發生錯誤: {str(e)}")
+            return False, str(e)
+
+    def stop_video_cap_service(self, rtmp_url):
+        try:
+            return self._call('stop_video_cap_service', rtmp_url)
+        except VideoCapException as e:
+            self.logger.error(f"停止視頻捕獲服務時發生錯誤: {str(e)}")
+            return False, str(e)
+
+    def get_service_running_status(self, rtmp_url):
+        try:
+            return self._call('get_service_running_status', rtmp_url)
+        except VideoCapException as e:
+            self.logger.error(f"查詢視頻捕獲狀態時發生錯誤: {str(e)}")
+            return False
+
+    def start_all_video_cap_service(self):
+        return self._call('start_all_video_cap_service')
+
+    def stop_all_video_cap_service(self):
+        return self._call('stop_all_video_cap_service')
+
+    def list_running_threads(self):
+        try:
+            return self._call('list_running_threads')
+        except VideoCapException as e:
+            self.logger.error(f"查詢擷取線程時發生錯誤: {str(e)}")
+            return []
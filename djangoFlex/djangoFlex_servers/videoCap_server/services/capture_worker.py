@@ -0,0 +1,28 @@
+import django
+
+def capture_worker_main(conn):
+    """
+    worker 進程入口：在獨立進程中執行 VideoCapManager，逐一處理 supervisor 送來的指令。
+
+    worker 以 spawn 啟動，是全新的直譯器，需先初始化 Django 才能匯入 models；
+    因此本模組在頂層不匯入任何依賴 app registry 的模組。
+    """
+    django.setup()
+    from .video_cap_manager import VideoCapManager
+
+    manager = VideoCapManager()
+    while True:
+        try:
+            method, args = conn.recv()
+        except EOFError:
+            break
+
+        if method == 'shutdown':
+            manager.stop_all_video_cap_service()
+            conn.send(('ok', None))
+            break
+
+        try:
+            conn.send(('ok', getattr(manager, method)(*args)))
+        except Exception as e:
+            conn.send(('error', str(e)))
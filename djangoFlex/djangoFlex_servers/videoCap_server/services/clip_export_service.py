@@ -0,0 +1,126 @@
+import os
+import subprocess
+import tempfile
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+from ..repositories.video_cap_repository import VideoCapRepository
+from ..exceptions.video_cap_exceptions import VideoCapException, ExportRangeError, ExportNotFoundError
+from ..models import VideoCapConfig
+
+class ClipExportService:
+    """
+    將時間範圍內的 HLS 片段以 ffmpeg 直接串接（-c copy）成 MP4 串流輸出，不重新編碼。
+
+    .ts 片段使用 concat demuxer，以 inpoint/outpoint 裁切頭尾；
+    fMP4（.m4s）片段需接在 init.mp4 之後，改用 concat protocol 並以 -ss/-t 裁切。
+    -c copy 只能在關鍵幀切割，實際範圍會往前延伸到最近的關鍵幀。
+
+    範圍不合法時拋出 ExportRangeError，找不到片段時拋出 ExportNotFoundError，
+    ffmpeg 無法啟動時拋出 VideoCapException。
+    """
+
+    def __init__(self):
+        self.config = ConfigLoader.load_config()
+        self.logger = LogManager.get_logger(__name__)
+
+    def get_export_clips(self, rtmp_url, start_time, end_time):
+        if end_time <= start_time:
+            raise ExportRangeError("結束時間必須晚於開始時間")
+        if (end_time - start_time).total_seconds() > self.config.export_max_duration:
+            raise ExportRangeError(f"匯出範圍不可超過 {self.config.export_max_duration} 秒")
+
+        try:
+            config = VideoCapRepository.get_config(rtmp_url)
+        except VideoCapConfig.DoesNotExist:
+            raise ExportNotFoundError(f"找不到攝影機設定: {rtmp_url}")
+
+        clips = [clip for clip in VideoCapRepository.get_clips_in_range(config, start_time, end_time, self.config.max_segment_duration) if os.path.exists(clip.clip_path)]
+        if not clips:
+            raise ExportNotFoundError("指定範圍內沒有可用的片段")
+
+        # 串接方式依容器格式而定（.ts 用 concat demuxer、.m4s 用 concat protocol），不能混用
+        extensions = {os.path.splitext(clip.clip_path)[1] for clip in clips}
+        if len(extensions) > 1:
+            raise ExportRangeError(f"範圍內的片段格式不一致（{', '.join(sorted(extensions))}），請縮小匯出範圍")
+        return clips
+
+    def stream_export(self, clips, start_time, end_time):
+        """
+        啟動 ffmpeg 串接片段，回傳輸出 MP4 的 generator；
+        呼叫端關閉 generator 時會終止 ffmpeg 並清理暫存檔。
+
+        Args:
+            clips: 依 start_time 排序的 CurrentVideoClip。
+            start_time (datetime): 匯出開始時間。
+            end_time (datetime): 匯出結束時間。
+
+        Returns:
+            generator: 逐塊產生 fragmented MP4 資料。
+        """
+        list_path = None
+        if clips[0].clip_path.endswith('.m4s'):
+            input_args = self._concat_protocol_input(clips, start_time, end_time)
+        else:
+            list_path = self._write_concat_list(clips, start_time, end_time)
+            input_args = ['-f', 'concat', '-safe', '0', '-i', list_path]
+
+        ffmpeg_command = [
+            'ffmpeg',
+            '-nostdin',
+            '-loglevel', 'error',
+            *input_args,
+            '-map', '0',
+            '-c', 'copy',
+            # 輸出到 pipe 無法回寫 moov，改用 fragmented MP4
+            '-movflags', 'frag_keyframe+empty_moov+default_base_moof',
+            '-f', 'mp4',
+            'pipe:1'
+        ]
+        try:
+            process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except OSError as e:
+            if list_path is not None:
+                os.remove(list_path)
+            raise VideoCapException(f"啟動匯出進程時發生錯誤: {str(e)}")
+        return self._iter_output(process, list_path)
+
+    def _iter_output(self, process, list_path):
+        try:
+            for chunk in iter(lambda: process.stdout.read(self.config.export_chunk_size), b''):
+                yield chunk
+            process.wait()
+            if process.returncode != 0:
+                error = process.stderr.read().decode('utf-8', errors='replace').strip()
+                self.logger.error(f"匯出片段時 ffmpeg 發生錯誤: {error}")
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+            if list_path is not None:
+                os.remove(list_path)
+
+    def _write_concat_list(self, clips, start_time, end_time):
+        lines = ['ffconcat version 1.0']
+        for index, clip in enumerate(clips):
+            escaped_path = clip.clip_path.replace("'", "'\\''")
+            lines.append(f"file '{escaped_path}'")
+            if index == 0 and start_time > clip.start_time:
+                lines.append(f"inpoint {(start_time - clip.start_time).total_seconds():.3f}")
+            if index == len(clips) - 1 and end_time < clip.end_time:
+                lines.append(f"outpoint {(end_time - clip.start_time).total_seconds():.3f}")
+
+        with tempfile.NamedTemporaryFile('w', suffix='.ffconcat', delete=False) as list_file:
+            list_file.write('\n'.join(lines) + '\n')
+            return list_file.name
+
+    def _concat_protocol_input(self, clips, start_time, end_time):
+        init_path = os.path.join(os.path.dirname(clips[0].clip_path), 'init.mp4')
+        if not os.path.exists(init_path):
+            raise ExportNotFoundError(f"找不到 fMP4 初始化片段: {init_path}")
+
+        offset = max(0, (start_time - clips[0].start_time).total_seconds())
+        duration = (min(end_time, clips[-1].end_time) - max(start_time, clips[0].start_time)).total_seconds()
+        concat_input = 'concat:' + '|'.join([init_path] + [clip.clip_path for clip in clips])
+        return ['-ss', f"{offset:.3f}", '-i', concat_input, '-t', f"{duration:.3f}"]
@@ -1,49 +1,138 @@
 import os
 import subprocess
-import threading
 import shutil
 from ..logs.log_manager import LogManager
 from ..exceptions.video_cap_exceptions import VideoCapException
 from ..utils.config_loader import ConfigLoader
+from ..utils.ingest_frame_reader import IngestFrameReader
+from ..utils.capture_metrics import CaptureMetricsRegistry
+from ...visionAI_server.utils.ffmpeg_progress import FFmpegProgress, start_progress_reader
+from .stream_probe_service import StreamProbeService
+from .segment_store import SegmentStore
+from .snapshot_service import SnapshotPublisher
 
 class HLSStreamService:
     def __init__(self):
         self.logger = LogManager.get_logger(__name__)
         self.stream_processes = {}
+        self.frame_readers = {}
+        self.snapshot_publishers = {}
+        self.passthrough = {}
         self.config = ConfigLoader.load_config()
 
     def start_hls_stream(self, rtmp_url, output_dir):
         try:
-            hls_output_dir = os.path.join(output_dir, f"{rtmp_url.split('/')[-1]}_hls")
+            hls_output_dir = os.path.join(output_dir, SegmentStore.camera_dir_name(rtmp_url))
             os.makedirs(hls_output_dir, exist_ok=True)
             hls_output = os.path.join(hls_output_dir, 'index.m3u8')
 
-            ffmpeg_command = self._build_ffmpeg_command(rtmp_url, hls_output)
-            process = subprocess.Popen(ffmpeg_command, stderr=subprocess.PIPE, universal_newlines=True)
+            # 單一 ingest 進程：同時寫入 HLS 片段，並從 stdout 輸出解碼後的幀
+            passthrough = self._should_passthrough(rtmp_url)
+            ffmpeg_command = self._build_ffmpeg_command(rtmp_url, hls_output, passthrough)
+            process = subprocess.Popen(ffmpeg_command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+            metrics = CaptureMetricsRegistry.get_instance().get(rtmp_url)
+            metrics.set_process(process.pid)
+            snapshot_publisher = SnapshotPublisher(rtmp_url, self.config.snapshot_interval, self.config.snapshot_jpeg_quality)
+            frame_reader = IngestFrameReader(process.stdout, self.config.frame_output_resolution, metrics, snapshot_publisher)
+            frame_reader.start()
+
+            progress = FFmpegProgress(
+                rtmp_url,
+                min_speed=self.config.ffmpeg_min_speed,
+                slow_reports=self.config.ffmpeg_slow_reports,
+                on_alert=self.logger.warning
+            )
+            metrics.set_progress(progress)
+            start_progress_reader(process.stderr, progress, on_log=lambda line: self.logger.warning(f"FFmpeg ({rtmp_url}): {line}"))
 
             self.stream_processes[rtmp_url] = process
-            self._start_log_thread(process, rtmp_url)
+            self.frame_readers[rtmp_url] = frame_reader
+            self.snapshot_publishers[rtmp_url] = snapshot_publisher
+            self.passthrough[rtmp_url] = passthrough
 
             return hls_output_dir
         except Exception as e:
             raise VideoCapException(f"啟動 HLS 串流時發生錯誤: {str(e)}")
 
     def stop_hls_stream(self, rtmp_url):
+        self.frame_readers.pop(rtmp_url, None)
+        self.passthrough.pop(rtmp_url, None)
+        snapshot_publisher = self.snapshot_publishers.pop(rtmp_url, None)
+        if snapshot_publisher is not None:
+            snapshot_publisher.close()
         if rtmp_url in self.stream_processes:
             process = self.stream_processes[rtmp_url]
             process.terminate()
-            process.wait()
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
             del self.stream_processes[rtmp_url]
 
+    def wait_until_live(self, rtmp_url, timeout):
+        frame_reader = self.frame_readers.get(rtmp_url)
+        return frame_reader is not None and frame_reader.wait_for_first_frame(timeout)
+
+    def is_stream_alive(self, rtmp_url, timeout):
+        process = self.stream_processes.get(rtmp_url)
+        frame_reader = self.frame_readers.get(rtmp_url)
+        if process is None or frame_reader is None or process.poll() is not None:
+            return False
+        elapsed = frame_reader.seconds_since_last_frame()
+        return elapsed is not None and elapsed <= timeout
+
+    def get_latest_frame(self, rtmp_url):
+        frame_reader = self.frame_readers.get(rtmp_url)
+        if frame_reader is None:
+            return None, None
+        return frame_reader.get_latest_frame()
+
+    def get_hls_mode(self, rtmp_url):
+        if rtmp_url not in self.stream_processes:
+            return None
+        return 'copy' if self.passthrough.get(rtmp_url) else 'transcode'
+
+    def _should_passthrough(self, rtmp_url):
+        """
+        判斷 HLS 輸出是否可直接 remux（-c copy）。
+
+        auto 模式下，來源已是 H.264 且解析度與設定相同時才直接複製；
+        fps 不同不影響判斷，下游繪圖流程會自行調整幀率。
+        """
+        mode = self.config.hls_passthrough
+        if mode == 'never' or rtmp_url == '0':
+            return False
+        # 低延遲模式需要在每個子片段強制關鍵幀，auto 模式下一律轉碼
+        if self.config.low_latency and mode != 'always':
+            return False
+        if mode == 'always':
+            return True
+
+        try:
+            stream_probe = StreamProbeService.get_stream_parameters(rtmp_url, self.config.passthrough_probe_max_age)
+        except Exception as e:
+            self.logger.warning(f"探測 {rtmp_url} 串流參數失敗，改用轉碼: {str(e)}")
+            return False
+
+        passthrough = (
+            stream_probe.is_online
+            and stream_probe.codec_name == 'h264'
+            and (stream_probe.width, stream_probe.height) == tuple(self.config.resolution)
+        )
+        self.logger.info(f"{rtmp_url} HLS 模式: {'copy' if passthrough else 'transcode'}")
+        return passthrough
+
     def cleanup_hls_output(self, rtmp_url):
-        hls_output_dir = os.path.join(self.config.video_clip_dir, f"{rtmp_url.split('/')[-1]}_hls")
-        if os.path.exists(hls_output_dir):
-            try:
-                shutil.rmtree(hls_output_dir)
-            except Exception as e:
-                self.logger.error(f"刪除目錄 {hls_output_dir} 時發生錯誤: {str(e)}")
+        for hls_output_dir in SegmentStore().camera_dirs(rtmp_url):
+            if os.path.exists(hls_output_dir):
+                try:
+                    shutil.rmtree(hls_output_dir)
+                except Exception as e:
+                    self.logger.error(f"刪除目錄 {hls_output_dir} 時發生錯誤: {str(e)}")
 
-    def _build_ffmpeg_command(self, rtmp_url, hls_output):
+    def _build_ffmpeg_command(self, rtmp_url, hls_output, passthrough=False):
         # 檢查是否在 Docker 環境中
         is_docker = os.getenv('IS_DOCKER', 'False') == 'True'
 
@@ -52,34 +141,71 @@ class HLSStreamService:
         if is_docker and 'localhost' in rtmp_url:
             input_url = rtmp_url.replace('localhost', 'srs')
 
+        if rtmp_url == '0':
+            input_args = ['-f', 'v4l2', '-i', '/dev/video0']
+        else:
+            input_args = ['-i', input_url]
+
+        frame_width, frame_height = self.config.frame_output_resolution
+        hls_dir = os.path.dirname(hls_output)
+
+        if self.config.low_latency:
+            # 低延遲模式：fMP4 子秒級片段，每個片段以關鍵幀開始，可單獨交給下游處理
+            segment_type = 'fmp4'
+            hls_time = self.config.ll_hls_part_time
+            gop_length = max(1, round(self.config.fps * hls_time))
+            hls_flags = 'independent_segments+program_date_time+second_level_segment_index'
+            segment_filename = '%Y%m%d%H%M_%s_%%04d.m4s'
+        else:
+            segment_type = self.config.hls_segment_type
+            hls_time = self.config.hls_time
+            gop_length = self.config.gop_length
+            hls_flags = 'independent_segments+program_date_time'
+            segment_filename = '%Y%m%d%H%M_%s.m4s' if segment_type == 'fmp4' else '%Y%m%d%H%M_%s.ts'
+
+        if passthrough:
+            # 來源已符合設定：直接 remux，片段在來源的關鍵幀處切割
+            video_args = ['-c:v', 'copy']
+        else:
+            video_args = [
+                '-c:v', 'libx264',
+                '-preset', 'ultrafast',
+                '-tune', 'zerolatency',
+                '-r', str(self.config.fps),
+                '-g', str(gop_length),
+                '-keyint_min', str(gop_length),
+                '-force_key_frames', f"expr:if(isnan(prev_forced_n),1,eq(n,prev_forced_n+{gop_length}))",
+                '-s', f'{self.config.resolution[0]}x{self.config.resolution[1]}',
+            ]
+
+        segment_args = ['-hls_segment_type', segment_type]
+        if segment_type == 'fmp4':
+            segment_args += ['-hls_fmp4_init_filename', 'init.mp4']
+
         return [
             'ffmpeg',
             '-y',
-            '-i', input_url,
-            '-c:v', 'libx264',
-            '-preset', 'ultrafast',
-            '-tune', 'zerolatency',
-            '-r', str(self.config.fps),
-            '-g', str(self.config.gop_length),
-            '-keyint_min', str(self.config.gop_length),
-            '-force_key_frames', f"expr:if(isnan(prev_forced_n),1,eq(n,prev_forced_n+{self.config.gop_length}))",
-            '-s', f'{self.config.resolution[0]}x{self.config.resolution[1]}',
+            # 以 -progress 輸出機器可讀的進度，與警告日誌一起由 stderr 解析
+            '-nostats',
+            '-progress', 'pipe:2',
+            *input_args,
+            # 輸出 1：HLS 片段
+            *video_args,
             '-f', 'hls',
-            '-hls_time', str(self.config.hls_time),
-            '-hls_segment_type', 'mpegts',
-            '-hls_flags', 'independent_segments',
+            '-hls_time', str(hls_time),
+            *segment_args,
+            '-hls_flags', hls_flags,
             '-strftime', '1',
             '-strftime_mkdir', '1',
-            '-hls_segment_filename', os.path.join(os.path.dirname(hls_output), '%Y%m%d%H%M_%s.ts'),
+            '-hls_segment_filename', os.path.join(hls_dir, segment_filename),
             '-loglevel', 'warning',
             '-err_detect', 'ignore_err',
-            hls_output
+            hls_output,
+            # 輸出 2：降頻縮小的 bgr24 幀，供 Python 端存活檢查與取幀
+            '-map', '0:v:0',
+            '-an',
+            '-vf', f'fps={self.config.frame_output_fps},scale={frame_width}:{frame_height}',
+            '-pix_fmt', 'bgr24',
+            '-f', 'rawvideo',
+            'pipe:1'
         ]
-
-    def _start_log_thread(self, process, rtmp_url):
-        def log_stderr(stderr):
-            for line in iter(stderr.readline, ''):
-                if line.strip():
-                    self.logger.warning(f"FFmpeg ({rtmp_url}): {line.strip()}")
-
-        threading.Thread(target=log_stderr, args=(process.stderr,), daemon=True).start()
@@ -0,0 +1,190 @@
+import time
+import asyncio
+import threading
+from dataclasses import dataclass
+import redis
+import redis.asyncio
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+
+@dataclass
+class LatestFrame:
+    data: bytes
+    timestamp: float
+    version: int
+
+class MemoryFrameSubscription:
+    """
+    事件迴圈中使用的訂閱：記憶體存放區在同一進程內，以短間隔輪詢版本號，不佔用執行緒池。
+    """
+    poll_interval = 0.05
+
+    def __init__(self, store, rtmp_url):
+        self.store = store
+        self.rtmp_url = rtmp_url
+        self.last_version = store.get_version(rtmp_url)
+
+    async def wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            version = self.store.get_version(self.rtmp_url)
+            if version > self.last_version:
+                self.last_version = version
+                return version
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            await asyncio.sleep(min(self.poll_interval, remaining))
+
+    async def get(self):
+        return self.store.get(self.rtmp_url)
+
+    async def close(self):
+        pass
+
+class MemoryLatestFrameStore:
+    """
+    單一進程內的最新幀存放區，每支攝影機只保留最新一幀，適用於未使用 Redis 的開發環境。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.frames = {}
+        self.versions = {}
+
+    def publish(self, rtmp_url, data, timestamp=None):
+        with self.lock:
+            version = self.versions.get(rtmp_url, 0) + 1
+            self.versions[rtmp_url] = version
+            self.frames[rtmp_url] = LatestFrame(data, timestamp or time.time(), version)
+        return version
+
+    def get(self, rtmp_url):
+        with self.lock:
+            return self.frames.get(rtmp_url)
+
+    def get_version(self, rtmp_url):
+        with self.lock:
+            return self.versions.get(rtmp_url, 0)
+
+    async def subscribe(self, rtmp_url):
+        return MemoryFrameSubscription(self, rtmp_url)
+
+class RedisFrameSubscription:
+    """
+    以 redis.asyncio 實作的訂閱，等待通知時不佔用執行緒池。
+    """
+
+    def __init__(self, store, rtmp_url, pubsub):
+        self.store = store
+        self.rtmp_url = rtmp_url
+        self.pubsub = pubsub
+
+    async def wait(self, timeout):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        version = int(message['data'])
+        while True:
+            pending = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=0)
+            if pending is None:
+                return version
+            version = max(version, int(pending['data']))
+
+    async def get(self):
+        values = await self.store.async_client.hgetall(self.store.frame_key(self.rtmp_url))
+        return self.store.parse_frame(values)
+
+    async def close(self):
+        # reset() 會取消訂閱並歸還連線
+        await self.pubsub.reset()
+
+class RedisLatestFrameStore:
+    """
+    以 Redis 存放每支攝影機的最新幀。
+
+    幀資料與時間戳寫入同一個 hash 並設定 TTL，攝影機停止後自動過期；
+    版本號以獨立的 INCR 計數器產生，不會因過期而倒退（ETag 不會重複），並透過 pub/sub 通知讀取端；
+    幀過期後 get_version 回傳 0，與 get 回傳 None 一致。
+    連線與讀寫都設有逾時，Redis 緩慢或無法連線時寫入端很快失敗，不會無限期阻塞。
+    """
+
+    def __init__(self, url, ttl, socket_timeout=1):
+        self.url = url
+        self.socket_timeout = socket_timeout
+        self.client = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+        self.ttl = ttl
+        self._async_client = None
+
+    @property
+    def async_client(self):
+        # 非同步客戶端只在 ASGI 進程中建立；pub/sub 連線需阻塞等待，不設定讀取逾時
+        if self._async_client is None:
+            self._async_client = redis.asyncio.Redis.from_url(self.url, socket_connect_timeout=self.socket_timeout)
+        return self._async_client
+
+    @staticmethod
+    def frame_key(rtmp_url):
+        return f"videocap:frame:{rtmp_url}"
+
+    @staticmethod
+    def version_key(rtmp_url):
+        return f"videocap:frame_version:{rtmp_url}"
+
+    @staticmethod
+    def channel(rtmp_url):
+        return f"videocap:frame_updates:{rtmp_url}"
+
+    def publish(self, rtmp_url, data, timestamp=None):
+        version = self.client.incr(self.version_key(rtmp_url))
+        frame_key = self.frame_key(rtmp_url)
+        pipeline = self.client.pipeline()
+        pipeline.hset(frame_key, mapping={'data': data, 'timestamp': timestamp or time.time(), 'version': version})
+        pipeline.expire(frame_key, self.ttl)
+        pipeline.publish(self.channel(rtmp_url), version)
+        pipeline.execute()
+        return version
+
+    def get(self, rtmp_url):
+        return self.parse_frame(self.client.hgetall(self.frame_key(rtmp_url)))
+
+    @staticmethod
+    def parse_frame(values):
+        if not values:
+            return None
+        return LatestFrame(values[b'data'], float(values[b'timestamp']), int(values[b'version']))
+
+    def get_version(self, rtmp_url):
+        # 版本號計數器不設 TTL；幀已過期（攝影機停止）時回傳 0，快照端不會以舊版本號回應 304
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.exists(self.frame_key(rtmp_url))
+        pipeline.get(self.version_key(rtmp_url))
+        frame_exists, version = pipeline.execute()
+        return int(version) if frame_exists and version else 0
+
+    async def subscribe(self, rtmp_url):
+        pubsub = self.async_client.pubsub()
+        await pubsub.subscribe(self.channel(rtmp_url))
+        return RedisFrameSubscription(self, rtmp_url, pubsub)
+
+def annotated_frame_key(rtmp_url):
+    # 繪圖服務輸出的標註畫面與原始畫面分開存放
+    return f"{rtmp_url}#annotated"
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_latest_frame_store():
+    """
+    依 VIDEO_CAP_FRAME_STORE 設定取得進程內共用的最新幀存放區（redis 或 memory）。
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            config = ConfigLoader.load_config()
+            if config.frame_store == 'redis':
+                _store = RedisLatestFrameStore(config.frame_store_url, config.frame_store_ttl, config.frame_store_socket_timeout)
+            else:
+                LogManager.get_logger(__name__).info("最新幀存放區使用進程內記憶體")
+                _store = MemoryLatestFrameStore()
+        return _store
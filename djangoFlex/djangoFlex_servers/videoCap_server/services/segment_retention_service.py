@@ -0,0 +1,151 @@
+import os
+import time
+import threading
+from dataclasses import dataclass
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+from ..models import CurrentVideoClip
+from .segment_store import SegmentStore, SEGMENT_EXTENSIONS
+
+@dataclass
+class SegmentFile:
+    path: str
+    size: int
+    mtime: float
+
+class SegmentRetentionService:
+    """
+    HLS 片段的保留與回收。
+
+    依容量（每支攝影機與全域）上限，以及選用的時間上限，由舊到新分批刪除片段檔，
+    並以 clip_path__in 批次刪除對應的 CurrentVideoClip，使資料庫與檔案一致。
+    仍列在 index.m3u8 中的片段不會被刪除。在獨立的計時線程執行，不佔用擷取迴圈。
+
+    VIDEO_CAP_RETENTION_MAX_AGE 預設不設定（None），只依容量回收，讓匯出功能能取得較長的歷史影片；
+    設定秒數後，超過該時間的片段與資料列也會被刪除。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        self.config = ConfigLoader.load_config()
+        self.logger = LogManager.get_logger(__name__)
+        self.segment_store = SegmentStore()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run_loop, name='segment-retention', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run_loop(self):
+        while not self.stop_event.wait(self.config.retention_interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error(f"執行片段保留回收時發生錯誤: {str(e)}")
+            finally:
+                connection.close()
+
+    def run_once(self):
+        # 記憶體片段目錄超過上限時先搬到磁碟，再套用保留規則
+        self.segment_store.spill()
+        segments_by_dir = self._scan_segments()
+        expired = self._select_expired(segments_by_dir)
+        deleted_count = self._delete_in_batches(expired)
+
+        # 設定時間上限時，過期的資料列一併清除
+        if self.config.retention_max_age is not None:
+            cutoff = timezone.now() - timedelta(seconds=self.config.retention_max_age)
+            CurrentVideoClip.objects.filter(end_time__lt=cutoff).delete()
+
+        if deleted_count:
+            self.logger.info(f"片段保留回收：刪除 {deleted_count} 個片段")
+        return deleted_count
+
+    def _scan_segments(self):
+        segments_by_dir = {}
+        for root in self.segment_store.roots():
+            if not os.path.isdir(root):
+                continue
+            for entry in os.scandir(root):
+                if entry.is_dir() and entry.name.endswith('_hls'):
+                    segments_by_dir.setdefault(entry.name, []).extend(self._scan_camera_dir(entry.path))
+
+        for segments in segments_by_dir.values():
+            segments.sort(key=lambda segment: segment.mtime)
+        return segments_by_dir
+
+    def _scan_camera_dir(self, hls_output_dir):
+        protected = SegmentStore.protected_segment_paths(hls_output_dir)
+        segments = []
+        for file_entry in os.scandir(hls_output_dir):
+            if not file_entry.name.endswith(SEGMENT_EXTENSIONS) or file_entry.path in protected:
+                continue
+            try:
+                stat = file_entry.stat()
+            except FileNotFoundError:
+                continue
+            segments.append(SegmentFile(file_entry.path, stat.st_size, stat.st_mtime))
+        return segments
+
+    def _select_expired(self, segments_by_dir):
+        now = time.time()
+        max_age = self.config.retention_max_age
+        expired = []
+        remaining = []
+
+        for segments in segments_by_dir.values():
+            camera_bytes = sum(segment.size for segment in segments)
+            for segment in segments:
+                too_old = max_age is not None and now - segment.mtime > max_age
+                over_quota = camera_bytes > self.config.retention_camera_max_bytes
+                if too_old or over_quota:
+                    expired.append(segment)
+                    camera_bytes -= segment.size
+                else:
+                    remaining.append(segment)
+
+        total_bytes = sum(segment.size for segment in remaining)
+        if total_bytes > self.config.retention_total_max_bytes:
+            for segment in sorted(remaining, key=lambda segment: segment.mtime):
+                if total_bytes <= self.config.retention_total_max_bytes:
+                    break
+                expired.append(segment)
+                total_bytes -= segment.size
+
+        expired.sort(key=lambda segment: segment.mtime)
+        return expired
+
+    def _delete_in_batches(self, segments):
+        deleted_count = 0
+        batch_size = self.config.retention_batch_size
+        for start in range(0, len(segments), batch_size):
+            batch_paths = [segment.path for segment in segments[start:start + batch_size]]
+            # 先刪除資料列，避免繪圖流程取到即將被刪除的片段
+            CurrentVideoClip.objects.filter(clip_path__in=batch_paths).delete()
+            for path in batch_paths:
+                try:
+                    os.remove(path)
+                    deleted_count += 1
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self.logger.error(f"刪除片段 {path} 時發生錯誤: {str(e)}")
+        return deleted_count
@@ -0,0 +1,122 @@
+import os
+import shutil
+import filecmp
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+from ..utils.hls_playlist import read_playlist
+from ..models import CurrentVideoClip
+
+SEGMENT_EXTENSIONS = ('.ts', '.m4s')
+
+class SegmentStore:
+    """
+    決定 HLS 片段的存放位置。
+
+    disk：片段寫入 VIDEO_CAP_CLIP_DIR。
+    memory：片段寫入 tmpfs（預設 /dev/shm），擷取到推論之間不經過磁碟；
+            超過 VIDEO_CAP_MEMORY_SEGMENT_MAX_BYTES 時，最舊的片段搬移到磁碟目錄，
+            並同步更新 CurrentVideoClip.clip_path。
+    """
+
+    def __init__(self):
+        self.config = ConfigLoader.load_config()
+        self.logger = LogManager.get_logger(__name__)
+
+    @staticmethod
+    def camera_dir_name(rtmp_url):
+        return f"{rtmp_url.split('/')[-1]}_hls"
+
+    def is_memory_backed(self):
+        if self.config.segment_store != 'memory':
+            return False
+        try:
+            os.makedirs(self.config.memory_segment_dir, exist_ok=True)
+            return os.access(self.config.memory_segment_dir, os.W_OK)
+        except OSError as e:
+            self.logger.warning(f"無法使用記憶體片段目錄 {self.config.memory_segment_dir}，改用磁碟: {str(e)}")
+            return False
+
+    def output_root(self):
+        return self.config.memory_segment_dir if self.is_memory_backed() else self.config.video_clip_dir
+
+    def roots(self):
+        roots = [self.config.video_clip_dir]
+        if self.config.segment_store == 'memory':
+            roots.append(self.config.memory_segment_dir)
+        return roots
+
+    def camera_dirs(self, rtmp_url):
+        return [os.path.join(root, self.camera_dir_name(rtmp_url)) for root in self.roots()]
+
+    def spill(self):
+        """
+        記憶體目錄超過容量上限時，將最舊且不在 playlist 中的片段搬到磁碟。
+
+        Returns:
+            int: 搬移的片段數。
+        """
+        if not self.is_memory_backed():
+            return 0
+
+        segments = []
+        total_bytes = 0
+        for entry in os.scandir(self.config.memory_segment_dir):
+            if not entry.is_dir() or not entry.name.endswith('_hls'):
+                continue
+            protected = self.protected_segment_paths(entry.path)
+            for file_entry in os.scandir(entry.path):
+                if not file_entry.name.endswith(SEGMENT_EXTENSIONS):
+                    continue
+                try:
+                    stat = file_entry.stat()
+                except FileNotFoundError:
+                    continue
+                total_bytes += stat.st_size
+                if file_entry.path not in protected:
+                    segments.append((stat.st_mtime, stat.st_size, entry.name, file_entry.path))
+
+        if total_bytes <= self.config.memory_segment_max_bytes:
+            return 0
+
+        moved_paths = {}
+        for _, size, dir_name, path in sorted(segments):
+            if total_bytes <= self.config.memory_segment_max_bytes:
+                break
+            disk_dir = os.path.join(self.config.video_clip_dir, dir_name)
+            os.makedirs(disk_dir, exist_ok=True)
+            disk_path = os.path.join(disk_dir, os.path.basename(path))
+            self._copy_init_segment(os.path.dirname(path), disk_dir)
+            try:
+                shutil.move(path, disk_path)
+            except FileNotFoundError:
+                continue
+            moved_paths[path] = disk_path
+            total_bytes -= size
+
+        if moved_paths:
+            clips = list(CurrentVideoClip.objects.filter(clip_path__in=list(moved_paths)))
+            for clip in clips:
+                clip.clip_path = moved_paths[clip.clip_path]
+            CurrentVideoClip.objects.bulk_update(clips, ['clip_path'])
+            self.logger.info(f"記憶體片段目錄超過上限，已搬移 {len(moved_paths)} 個片段至磁碟")
+        return len(moved_paths)
+
+    @staticmethod
+    def _copy_init_segment(source_dir, disk_dir):
+        # fMP4 片段需要同目錄的 init.mp4 才能單獨解碼；ingest 重啟或編碼參數改變後 init.mp4 會不同，
+        # 內容不一致時覆寫，避免新搬移的片段配上過期的 init.mp4
+        init_path = os.path.join(source_dir, 'init.mp4')
+        disk_init_path = os.path.join(disk_dir, 'init.mp4')
+        if not os.path.exists(init_path):
+            return
+        if os.path.exists(disk_init_path) and filecmp.cmp(init_path, disk_init_path, shallow=False):
+            return
+        shutil.copy2(init_path, disk_init_path)
+
+    @staticmethod
+    def protected_segment_paths(hls_output_dir):
+        try:
+            playlist = read_playlist(os.path.join(hls_output_dir, 'index.m3u8'))
+        except (OSError, ValueError):
+            return set()
+        return {os.path.join(hls_output_dir, segment.uri) for segment in playlist.segments}
@@ -0,0 +1,111 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from ..logs.log_manager import LogManager
+from ..utils.hls_playlist import read_playlist
+
+@dataclass
+class FinishedSegment:
+    sequence: int
+    path: str
+    start_time: datetime
+    end_time: datetime
+    duration: float
+    init_path: str = None
+
+class HLSSegmentWatcher:
+    """
+    監看 ffmpeg 持續更新的 index.m3u8，每個完成的片段只回報一次。
+
+    ffmpeg 只會在片段寫完後才把它加入 playlist，因此 playlist 中的片段都是完成的。
+    每次 poll 只做一次 stat；playlist 未變動時不會讀取目錄或查詢資料庫。
+    開始時間優先採用 PROGRAM-DATE-TIME，時長採用 EXTINF，舊版 playlist 才退回檔名時間。
+    """
+
+    def __init__(self, hls_output_dir, playlist_name='index.m3u8'):
+        self.logger = LogManager.get_logger(__name__)
+        self.hls_output_dir = hls_output_dir
+        self.playlist_path = os.path.join(hls_output_dir, playlist_name)
+        self.last_mtime_ns = None
+        self.last_sequence = None
+        self.last_end_time = None
+        self.uncommitted = False
+
+    def poll(self):
+        """
+        回傳上次 commit 之後新完成的片段。
+
+        poll 本身不推進進度：呼叫端寫入成功後需呼叫 commit，
+        寫入失敗時下次 poll 會再次回傳同一批片段，不會遺失。
+        """
+        try:
+            mtime_ns = os.stat(self.playlist_path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+
+        if mtime_ns == self.last_mtime_ns and not self.uncommitted:
+            return []
+
+        try:
+            playlist = read_playlist(self.playlist_path)
+        except (OSError, ValueError) as e:
+            # ffmpeg 以暫存檔覆寫 playlist，極少數情況下仍可能讀到不完整內容
+            self.logger.warning(f"讀取 playlist {self.playlist_path} 失敗: {str(e)}")
+            self.last_mtime_ns = None
+            return []
+        self.last_mtime_ns = mtime_ns
+
+        init_path = os.path.join(self.hls_output_dir, playlist.init_uri) if playlist.init_uri else None
+        finished = []
+        previous_end = self.last_end_time
+        for segment in playlist.segments:
+            if self.last_sequence is not None and segment.sequence <= self.last_sequence:
+                continue
+            finished.append(self._build_segment(segment, previous_end, init_path))
+            previous_end = finished[-1].end_time
+        self.uncommitted = bool(finished)
+        return finished
+
+    def commit(self, segments):
+        """
+        標記片段已寫入，之後的 poll 不再回傳。
+
+        Args:
+            segments (list): poll 回傳且已成功寫入的 FinishedSegment。
+        """
+        if segments:
+            self.last_sequence = segments[-1].sequence
+            self.last_end_time = segments[-1].end_time
+        self.uncommitted = False
+
+    def _build_segment(self, segment, previous_end, init_path=None):
+        start_time = self._segment_start_time(segment, previous_end)
+        end_time = start_time + timedelta(seconds=segment.duration)
+        return FinishedSegment(
+            sequence=segment.sequence,
+            path=os.path.join(self.hls_output_dir, segment.uri),
+            start_time=start_time,
+            end_time=end_time,
+            duration=segment.duration,
+            init_path=init_path
+        )
+
+    def _segment_start_time(self, segment, previous_end):
+        # ffmpeg 的 HLS muxer 以初始化時的系統時間加上累計的片段時長產生 PROGRAM-DATE-TIME，
+        # 與 EXTINF 連續銜接且不受檔名只精確到秒的限制；它反映的是 muxer 的時間軸，不是各片段首幀的 PTS
+        if segment.program_date_time is not None:
+            return segment.program_date_time.astimezone(timezone.utc)
+
+        # 片段檔名格式為 %Y%m%d%H%M_%s[_序號].ts|m4s，%s 即片段開始時的 epoch 秒數
+        stem = os.path.splitext(os.path.basename(segment.uri))[0]
+        parts = stem.split('_')
+        epoch = parts[1] if len(parts) > 1 else ''
+        if epoch.isdigit():
+            start_time = datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+            # 檔名只精確到秒，以前一片段的結束時間銜接，避免時間軸出現縫隙
+            if previous_end is not None and abs((start_time - previous_end).total_seconds()) < 1:
+                return previous_end
+            return start_time
+        if previous_end is not None:
+            return previous_end
+        return datetime.now(timezone.utc) - timedelta(seconds=segment.duration)
@@ -0,0 +1,147 @@
+import time
+import queue
+import threading
+import cv2
+import numpy as np
+from ..logs.log_manager import LogManager
+from ..utils.config_loader import ConfigLoader
+from ..models import CameraList
+from .latest_frame_store import get_latest_frame_store
+
+class SnapshotPublisher:
+    """
+    ingest 幀的回呼：依設定的間隔把最新幀編碼為 JPEG 寫入最新幀存放區，
+    讓快照與預覽不必在 web 進程解碼串流。
+
+    回呼在讀取 ffmpeg stdout 的線程中執行，不能被編碼或存放區的網路延遲拖慢，
+    否則 pipe 塞滿會讓 ingest 停頓並觸發重連。因此只把幀放進有上限的佇列，
+    由背景線程編碼與寫入；佇列已滿時直接丟棄該幀，下一個間隔再送新的。
+    """
+
+    def __init__(self, rtmp_url, interval, quality, max_pending=1):
+        self.rtmp_url = rtmp_url
+        self.interval = interval
+        self.quality = quality
+        self.logger = LogManager.get_logger(__name__)
+        self.frame_store = get_latest_frame_store()
+        self.last_publish = 0
+        self.failing = False
+        self.dropped = 0
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._publish_loop, name='snapshot-publisher', daemon=True)
+        self.thread.start()
+
+    def __call__(self, frame):
+        now = time.time()
+        if now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+        # 可寫入的幀可能在呼叫端被繼續修改，需複製一份
+        if frame.flags.writeable:
+            frame = frame.copy()
+        try:
+            self.pending.put_nowait((frame, now))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        self.stop_event.set()
+
+    def _publish_loop(self):
+        while not self.stop_event.is_set():
+            try:
+                frame, timestamp = self.pending.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            try:
+                _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                self.frame_store.publish(self.rtmp_url, buffer.tobytes(), timestamp)
+                if self.failing:
+                    self.logger.info(f"{self.rtmp_url} 最新幀寫入已恢復")
+                self.failing = False
+            except Exception as e:
+                # 存放區無法連線時只記錄一次，恢復後再重新記錄
+                if not self.failing:
+                    self.logger.warning(f"寫入 {self.rtmp_url} 最新幀失敗: {str(e)}")
+                self.failing = True
+
+class SnapshotService:
+    """
+    由最新幀存放區提供各攝影機的 JPEG 快照。
+
+    每支攝影機只快取最新版本，各尺寸在第一次被請求時編碼一次；
+    版本號即為 ETag，輪詢端帶 If-None-Match 時只需讀取版本號即可回應 304。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        self.config = ConfigLoader.load_config()
+        self.frame_store = get_latest_frame_store()
+        self.lock = threading.Lock()
+        # rtmp_url -> (version, timestamp, {size: jpeg bytes})
+        self.cache = {}
+        # camera_name -> (rtmp_url, 快取時間)
+        self.camera_urls = {}
+
+    def resolve_camera(self, camera_name):
+        now = time.time()
+        cached = self.camera_urls.get(camera_name)
+        if cached is not None and now - cached[1] < self.config.config_cache_ttl:
+            return cached[0]
+        rtmp_url = CameraList.objects.filter(camera_name=camera_name).values_list('camera_url', flat=True).first()
+        if rtmp_url is not None:
+            self.camera_urls[camera_name] = (rtmp_url, now)
+        return rtmp_url
+
+    @staticmethod
+    def etag(version, size):
+        return f'"{version}-{size}"'
+
+    def get_version(self, rtmp_url):
+        return self.frame_store.get_version(rtmp_url)
+
+    def get_snapshot(self, rtmp_url, size):
+        """
+        取得指定尺寸的快照。
+
+        Args:
+            rtmp_url (str): 攝影機 URL。
+            size (str): VIDEO_CAP_SNAPSHOT_SIZES 中的尺寸名稱。
+
+        Returns:
+            tuple: (JPEG bytes, 版本號, 幀時間戳)；沒有可用的幀時回傳 (None, None, None)。
+        """
+        with self.lock:
+            cached = self.cache.get(rtmp_url)
+        version = self.frame_store.get_version(rtmp_url)
+
+        if cached is None or cached[0] != version:
+            latest_frame = self.frame_store.get(rtmp_url)
+            if latest_frame is None:
+                return None, None, None
+            cached = (latest_frame.version, latest_frame.timestamp, {'full': latest_frame.data})
+            with self.lock:
+                self.cache[rtmp_url] = cached
+
+        version, timestamp, encoded = cached
+        if size not in encoded:
+            resized = self._encode_size(encoded['full'], self.config.snapshot_sizes[size])
+            with self.lock:
+                encoded[size] = resized
+        return encoded[size], version, timestamp
+
+    def _encode_size(self, jpeg_data, width):
+        frame = cv2.imdecode(np.frombuffer(jpeg_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        height = max(1, round(frame.shape[0] * width / frame.shape[1]))
+        resized = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        _, buffer = cv2.imencode('.jpg', resized, [cv2.IMWRITE_JPEG_QUALITY, self.config.snapshot_jpeg_quality])
+        return buffer.tobytes()
@@ -0,0 +1,25 @@
+from datetime import timedelta
+from django.utils import timezone
+from ..repositories.video_cap_repository import VideoCapRepository
+from ..utils.video_cap_utils import VideoCapUtils
+
+class StreamProbeService:
+    """
+    以 ffprobe 讀取串流參數並依攝影機保存，後續階段可直接重用而不必重新探測。
+    """
+
+    @staticmethod
+    def probe(rtmp_url, timeout=2):
+        probe_result = VideoCapUtils.probe_stream(rtmp_url, timeout)
+        return VideoCapRepository.save_stream_probe(rtmp_url, probe_result)
+
+    @staticmethod
+    def get_stream_parameters(rtmp_url, max_age=None, timeout=2):
+        """
+        取得攝影機的串流參數；已保存且未超過 max_age 秒的結果直接回傳，否則重新探測。
+        """
+        stream_probe = VideoCapRepository.get_stream_probe(rtmp_url)
+        if stream_probe is not None and stream_probe.is_online:
+            if max_age is None or timezone.now() - stream_probe.probed_at <= timedelta(seconds=max_age):
+                return stream_probe
+        return StreamProbeService.probe(rtmp_url, timeout)
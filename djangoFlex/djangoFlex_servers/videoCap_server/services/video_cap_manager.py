@@ -1,19 +1,22 @@
-import cv2
 import time
 import threading
 import os
 import shutil
-from datetime import datetime, timedelta
-import pytz
 from django.conf import settings
 from django.db import transaction
 from ..utils.config_loader import ConfigLoader
 from ..utils.video_cap_utils import VideoCapUtils
+from ..utils.reconnect_policy import ReconnectPolicy, CircuitState
+from ..utils.capture_metrics import CaptureMetricsRegistry
 from ..repositories.video_cap_repository import VideoCapRepository
 from ..exceptions.video_cap_exceptions import VideoCapException
 from ..logs.log_manager import LogManager
 from .hls_stream_service import HLSStreamService
+from .segment_watcher import HLSSegmentWatcher
 from .camera_status_service import CameraStatusService
+from .camera_supervisor import CameraSupervisor
+from .segment_retention_service import SegmentRetentionService
+from .segment_store import SegmentStore
 from ..models import CameraList, CurrentVideoClip
 
 class VideoCapManager:
@@ -22,10 +25,14 @@ class VideoCapManager:
         self.logger = LogManager.get_logger(__name__)
         self.repository = VideoCapRepository()
         self.hls_service = HLSStreamService()
+        self.segment_store = SegmentStore()
         self.camera_status_service = CameraStatusService()
         self.running = {}
         self.capture_threads = {}
-        self.caps = {}
+        self.hls_output_dirs = {}
+        self.segment_watchers = {}
+        self.reconnect_policies = {}
+        self.metrics_registry = CaptureMetricsRegistry.get_instance()
 
     def start_video_cap_service(self, rtmp_url):
         try:
@@ -33,10 +40,20 @@ class VideoCapManager:
                 return False, "伺服器已在運行中"
 
             config = self.repository.get_or_create_config(rtmp_url)
+            if not self.config.supervisor_address:
+                # supervisor 模式下由 supervisor 進程統一回收，避免每個 worker 重複掃描
+                SegmentRetentionService.get_instance().start()
             self.running[rtmp_url] = True
             self.repository.set_config_active(config, True)
 
-            self._initialize_capture(rtmp_url)
+            try:
+                self._initialize_capture(rtmp_url)
+            except VideoCapException:
+                self.running.pop(rtmp_url, None)
+                self.repository.set_config_inactive(rtmp_url)
+                raise
+
+            self.reconnect_policies[rtmp_url] = self._create_reconnect_policy(rtmp_url)
             self.capture_threads[rtmp_url] = threading.Thread(
                 target=self._capture_loop,
                 args=(rtmp_url,)
@@ -75,92 +92,95 @@ class VideoCapManager:
         self.logger.info(f"伺服器狀態 {rtmp_url}: {'運行中' if is_running else '未運行'}")
         return is_running
 
+    def get_latest_frame(self, rtmp_url):
+        return self.hls_service.get_latest_frame(rtmp_url)
+
     def _initialize_capture(self, rtmp_url):
+        """
+        啟動單一 ingest ffmpeg 進程，同時產生 HLS 片段與解碼後的幀，
+        並等待第一幀到達以確認串流可用。
+        """
         try:
-            if rtmp_url in self.caps and self.caps[rtmp_url] is not None:
-                self.caps[rtmp_url].release()
-
-            # 檢查是否在 Docker 環境中
-            is_docker = os.getenv('IS_DOCKER', 'False') == 'True'
-
-            # 如果在 Docker 中，將 localhost 替換為 srs 容器名稱
-            cap_source = rtmp_url
-            if is_docker and 'localhost' in rtmp_url:
-                cap_source = rtmp_url.replace('localhost', 'srs')
-                self.logger.info(f"Docker 環境中：將 {rtmp_url} 替換為 {cap_source}")
-            elif rtmp_url == '0':
-                cap_source = 0
-
-            self.logger.info(f"嘗試初始化視頻捕獲：{cap_source}")
-            self.caps[rtmp_url] = cv2.VideoCapture(cap_source)
-
-            # 檢查 VideoCapture 是否成功創建
-            if self.caps[rtmp_url] is None:
-                raise VideoCapException("VideoCapture 對象創建失敗")
-
-            self.logger.info("設置視頻捕獲參數")
-            self.caps[rtmp_url].set(cv2.CAP_PROP_BUFFERSIZE, 1)
-            self.caps[rtmp_url].set(cv2.CAP_PROP_FPS, self.config.fps)
-            self.caps[rtmp_url].set(cv2.CAP_PROP_FRAME_WIDTH, self.config.resolution[0])
-            self.caps[rtmp_url].set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.resolution[1])
-
-            if not self.caps[rtmp_url].isOpened():
-                self.logger.error(f"無法開啟視頻捕獲：{cap_source}")
+            self._release_capture_object(rtmp_url)
+
+            self.logger.info(f"嘗試初始化視頻捕獲：{rtmp_url}")
+            self.hls_output_dirs[rtmp_url] = self.hls_service.start_hls_stream(rtmp_url, self.segment_store.output_root())
+            self.segment_watchers[rtmp_url] = HLSSegmentWatcher(self.hls_output_dirs[rtmp_url])
+
+            if not self.hls_service.wait_until_live(rtmp_url, self.config.open_timeout):
+                self.logger.error(f"無法開啟視頻捕獲：{rtmp_url}")
                 raise VideoCapException("無法開啟視頻捕獲")
 
-            self.logger.info(f"視頻捕獲初始化成功：{cap_source}")
+            self.logger.info(f"視頻捕獲初始化成功：{rtmp_url}")
         except Exception as e:
             self.logger.error(f"初始化捕獲 {rtmp_url} 時發生錯誤: {str(e)}")
             self.logger.error(f"異常類型: {type(e)}")
-            self.caps[rtmp_url] = None
+            self._release_capture_object(rtmp_url)
             raise VideoCapException(f"初始化捕獲失敗: {str(e)}")
 
     def _capture_loop(self, rtmp_url):
-        config = self.repository.get_config(rtmp_url)
-        reconnect_start_time = None
-        reconnect_attempts = 0
-        last_frame_time = time.time()
-        last_check_time = time.time()
-
-        hls_output_dir = self.hls_service.start_hls_stream(rtmp_url, self.config.video_clip_dir)
+        policy = self.reconnect_policies[rtmp_url]
+        metrics = self.metrics_registry.get(rtmp_url)
+        was_alive = True
 
         try:
-            while self.running[rtmp_url]:
-                if self.caps[rtmp_url] and self.caps[rtmp_url].isOpened():
-                    ret, frame = self.caps[rtmp_url].read()
-                    current_time = time.time()
-
-                    if ret:
-                        last_frame_time = current_time
-                        reconnect_start_time = None
-                        reconnect_attempts = 0
-
-                        if current_time - last_check_time >= self.config.check_interval:
-                            self._check_and_update_video_clip(rtmp_url, hls_output_dir)
-                            last_check_time = current_time
-                    elif current_time - last_frame_time > 1:
-                        if reconnect_start_time is None:
-                            reconnect_start_time = current_time
-                            reconnect_attempts += 1
-                        self._reconnect(rtmp_url)
+            while self.running.get(rtmp_url):
+                if self.hls_service.is_stream_alive(rtmp_url, self.config.liveness_timeout):
+                    was_alive = True
+                    policy.record_success()
+                    self._check_and_update_video_clip(rtmp_url)
+                    time.sleep(self.config.check_interval)
+                    continue
+
+                if was_alive:
+                    # 只在串流由正常轉為中斷時記錄一次
+                    metrics.record_read_failure()
+                    was_alive = False
+
+                if not policy.ready():
+                    self._wait_while_running(rtmp_url, policy.seconds_until_ready())
+                elif policy.state == CircuitState.OPEN:
+                    # 斷路中：只以 ffprobe 讀取串流標頭，串流確實恢復才進入 HALF_OPEN 並啟動 ffmpeg
+                    policy.record_probe(VideoCapUtils.probe_stream_available(rtmp_url, self.config.probe_timeout))
+                elif self._reconnect(rtmp_url):
+                    metrics.record_reconnect(True)
+                    policy.record_success()
                 else:
-                    if reconnect_start_time is None:
-                        reconnect_start_time = time.time()
-                        reconnect_attempts += 1
-                    self._reconnect(rtmp_url)
-
-                if reconnect_start_time is not None:
-                    elapsed_time = time.time() - reconnect_start_time
-                    if elapsed_time > self.config.reconnect_timeout or reconnect_attempts > self.config.max_reconnect_attempts:
-                        self._set_inactive(rtmp_url)
-                        break
+                    metrics.record_reconnect(False)
+                    policy.record_failure()
 
         except Exception as e:
             self.logger.error(f"捕獲循環中發生錯誤 {rtmp_url}: {str(e)}")
         finally:
-            self.hls_service.stop_hls_stream(rtmp_url)
             self._cleanup_resources(rtmp_url)
 
+    def _wait_while_running(self, rtmp_url, seconds):
+        deadline = time.time() + seconds
+        while self.running.get(rtmp_url) and time.time() < deadline:
+            time.sleep(min(0.5, max(0, deadline - time.time())))
+
+    def _create_reconnect_policy(self, rtmp_url):
+        metrics = self.metrics_registry.get(rtmp_url)
+        metrics.set_reconnect_state(CircuitState.CLOSED)
+
+        def on_state_change(old_state, new_state):
+            self.logger.warning(f"{rtmp_url} 重連狀態變更: {old_state} -> {new_state}")
+            metrics.record_reconnect_transition(old_state, new_state)
+            if new_state == CircuitState.OPEN:
+                self._release_capture_object(rtmp_url)
+                self.camera_status_service.update_camera_status(rtmp_url, False)
+            elif new_state == CircuitState.CLOSED:
+                self.camera_status_service.update_camera_status(rtmp_url, True)
+
+        return ReconnectPolicy(
+            base_delay=self.config.reconnect_base_delay,
+            max_delay=self.config.reconnect_max_delay,
+            failure_threshold=self.config.max_reconnect_attempts,
+            open_cooldown=self.config.circuit_open_cooldown,
+            max_open_cooldown=self.config.circuit_max_cooldown,
+            on_state_change=on_state_change
+        )
+
     def _stop_capture_thread(self, rtmp_url):
         if rtmp_url in self.capture_threads:
             try:
@@ -175,92 +195,97 @@ class VideoCapManager:
             self.logger.warning(f"嘗試停止不存在的捕獲線程: {rtmp_url}")
 
     def _release_capture_object(self, rtmp_url):
-        if rtmp_url in self.caps and self.caps[rtmp_url] is not None:
-            try:
-                self.caps[rtmp_url].release()
-            except Exception as e:
-                self.logger.error(f"釋放捕獲對象 {rtmp_url} 時發生錯誤: {str(e)}")
-            finally:
-                del self.caps[rtmp_url]
+        try:
+            self.hls_service.stop_hls_stream(rtmp_url)
+        except Exception as e:
+            self.logger.error(f"停止 ingest 進程 {rtmp_url} 時發生錯誤: {str(e)}")
 
     def _reconnect(self, rtmp_url):
         self._release_capture_object(rtmp_url)
-        time.sleep(1)
         try:
             self._initialize_capture(rtmp_url)
-            return self.caps[rtmp_url] is not None and self.caps[rtmp_url].isOpened()
+            return True
         except VideoCapException:
             return False
 
-    def _set_inactive(self, rtmp_url):
-        self.repository.set_config_inactive(rtmp_url)
-        self.running[rtmp_url] = False
-        self._release_capture_object(rtmp_url)
-        self.camera_status_service.update_camera_status(rtmp_url, False)
-
     def _cleanup_resources(self, rtmp_url):
         self._release_capture_object(rtmp_url)
         if rtmp_url in self.running:
             del self.running[rtmp_url]
         if rtmp_url in self.capture_threads:
             del self.capture_threads[rtmp_url]
+        self.hls_output_dirs.pop(rtmp_url, None)
+        self.segment_watchers.pop(rtmp_url, None)
+        self.reconnect_policies.pop(rtmp_url, None)
+        self.metrics_registry.remove(rtmp_url)
         self.camera_status_service.update_camera_status(rtmp_url, False)
         self.logger.info(f"已清理 {rtmp_url} 的資源")
 
-    def _check_and_update_video_clip(self, rtmp_url, hls_output_dir):
-        config = self.repository.get_config(rtmp_url)
+    def _check_and_update_video_clip(self, rtmp_url):
+        watcher = self.segment_watchers.get(rtmp_url)
+        if watcher is None:
+            return
         try:
-            ts_files = [f for f in os.listdir(hls_output_dir) if f.endswith('.ts')]
-            if ts_files:
-                latest_ts_file = max(ts_files, key=lambda f: os.path.getmtime(os.path.join(hls_output_dir, f)))
-                ts_file_path = os.path.join(hls_output_dir, latest_ts_file)
-
-                existing_clip = CurrentVideoClip.objects.filter(config=config, clip_path=ts_file_path).first()
-                if not existing_clip:
-                    if os.path.exists(ts_file_path):
-                        ts_file_timestamp = datetime.fromtimestamp(os.path.getmtime(ts_file_path))
-                        ts_file_timestamp = pytz.timezone('UTC').localize(ts_file_timestamp)
-
-                        with transaction.atomic():
-                            self.repository.create_current_video_clip(
-                                config,
-                                ts_file_path,
-                                ts_file_timestamp,
-                                ts_file_timestamp + timedelta(seconds=self.config.hls_time),
-                                self.config.hls_time
-                            )
+            finished_segments = watcher.poll()
+            if not finished_segments:
+                return
+
+            config = self.repository.get_config(rtmp_url)
+            with transaction.atomic():
+                for segment in finished_segments:
+                    self.repository.create_current_video_clip(
+                        config,
+                        segment.path,
+                        segment.start_time,
+                        segment.end_time,
+                        segment.duration,
+                        segment.sequence
+                    )
+            # 寫入成功才推進進度；失敗時下次 poll 會重新回傳這批片段
+            watcher.commit(finished_segments)
+            self.metrics_registry.get(rtmp_url).record_segments(finished_segments)
         except Exception as e:
+            # 設定可能已在其他進程被刪除或修改，下次重新讀取
+            self.repository.invalidate_config(rtmp_url)
             self.logger.error(f"Error checking and updating video clip for {rtmp_url}: {str(e)}")
 
     def list_running_threads(self):
         running_threads = []
         for rtmp_url, thread in self.capture_threads.items():
+            policy = self.reconnect_policies.get(rtmp_url)
             running_threads.append({
                 'rtmp_url': rtmp_url,
                 'thread_id': thread.ident,
                 'thread_name': thread.name,
-                'is_alive': thread.is_alive()
+                'is_alive': thread.is_alive(),
+                'hls_mode': self.hls_service.get_hls_mode(rtmp_url),
+                'reconnect': policy.snapshot() if policy else None,
+                'metrics': self.metrics_registry.snapshot(rtmp_url)
             })
         return running_threads
 
+    def restart_video_cap_service(self, rtmp_url):
+        if self.running.get(rtmp_url):
+            self.stop_video_cap_service(rtmp_url)
+        return self.start_video_cap_service(rtmp_url)
+
+    def start_video_cap_services(self, rtmp_urls):
+        return CameraSupervisor(self).start_cameras(rtmp_urls)
+
     def start_all_video_cap_service(self):
-        cameras = CameraList.objects.all()
-        started_count = 0
-        for camera in cameras:
-            success, _ = self.start_video_cap_service(camera.camera_url)
-            if success:
-                started_count += 1
-                self.camera_status_service.update_camera_status(camera.camera_url, True)
-        return started_count, cameras.count()
+        camera_urls = list(CameraList.objects.values_list('camera_url', flat=True))
+        results = self.start_video_cap_services(camera_urls)
+        started_count = sum(1 for result in results if result['success'])
+        return started_count, len(camera_urls), results
 
     def stop_all_video_cap_service(self):
+        running_urls = [rtmp_url for rtmp_url, is_running in list(self.running.items()) if is_running]
+        results = CameraSupervisor(self).stop_cameras(running_urls)
         stopped_count = 0
-        for rtmp_url in list(self.running.keys()):
-            if self.running[rtmp_url]:
-                success, _ = self.stop_video_cap_service(rtmp_url)
-                if success:
-                    stopped_count += 1
-                    self.repository.set_config_inactive(rtmp_url)
+        for result in results:
+            if result['success']:
+                stopped_count += 1
+                self.repository.set_config_inactive(result['rtmp_url'])
         return stopped_count
 
     @staticmethod
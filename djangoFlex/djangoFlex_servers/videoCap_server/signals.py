@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import VideoCapConfig
+from .repositories.video_cap_repository import VideoCapRepository
+
+@receiver(post_save, sender=VideoCapConfig)
+@receiver(post_delete, sender=VideoCapConfig)
+def invalidate_video_cap_config(sender, instance, **kwargs):
+    # rtmp_url 可能在編輯時被修改，舊的鍵無從得知，直接清空整個快取
+    VideoCapRepository.invalidate_config()
@@ -1,9 +1,9 @@
 from celery import shared_task
 import cv2
 import time
-from django.db import transaction
-from django.utils import timezone
-from .models import VideoCapConfig, CurrentFrame
+from .models import VideoCapConfig
+from .services.latest_frame_store import get_latest_frame_store
+from .utils.config_loader import ConfigLoader
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,13 +12,18 @@ logger = logging.getLogger(__name__)
 def capture_loop(self, rtmp_url):
     retries = 0
     config = VideoCapConfig.objects.get(rtmp_url=rtmp_url)
+    frame_store = get_latest_frame_store()
+    active_check_interval = ConfigLoader.load_config().active_check_interval
     cap = cv2.VideoCapture(rtmp_url)
     cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
     max_retries = 3
     retry_delay = 1
+    is_active = config.is_active
+    frame_interval = config.frame_interval
+    last_active_check = time.time()
 
     try:
-        while config.is_active:
+        while is_active:
             ret, frame = cap.read()
             if not ret:
                 retries += 1
@@ -31,16 +36,15 @@ def capture_loop(self, rtmp_url):
             # retries = 0
 
             _, buffer = cv2.imencode('.jpg', frame)
-            frame_bytes = buffer.tobytes()
-            
-            with transaction.atomic():
-                current_frame, created = CurrentFrame.objects.get_or_create(config=config)
-                current_frame.frame_data = frame_bytes
-                current_frame.timestamp = timezone.now()
-                current_frame.save()
-            
-            time.sleep(config.frame_interval)
-            config.refresh_from_db()
+            # 最新幀寫入存放區並通知訂閱者，不再每幀寫入資料庫
+            frame_store.publish(rtmp_url, buffer.tobytes())
+
+            time.sleep(frame_interval)
+
+            # 只定期確認設定是否仍啟用，避免每幀查詢資料庫
+            if time.time() - last_active_check >= active_check_interval:
+                is_active, frame_interval = VideoCapConfig.objects.values_list('is_active', 'frame_interval').get(pk=config.pk)
+                last_active_check = time.time()
 
     except Exception as e:
         logger.error(f"Error in capture_loop: {str(e)}")
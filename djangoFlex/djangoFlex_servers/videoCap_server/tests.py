@@ -1,3 +1,942 @@
-from django.test import TestCase
+import io
+import os
+import asyncio
+import importlib
+import subprocess
+import multiprocessing
+import tempfile
+import threading
+import time
+from unittest import mock
+from dataclasses import replace
+from types import SimpleNamespace
+from datetime import datetime, timedelta, timezone
+import cv2
+import numpy as np
+from multiprocessing.connection import Listener
+from django.db.models.signals import post_save
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APIRequestFactory
+from .consumers import FrameBroadcaster, LatestFrameMailbox
+from .exceptions.video_cap_exceptions import VideoCapException, SupervisorUnavailableError
+from .services.capture_supervisor import CaptureSupervisor
+from .services.capture_supervisor_client import CaptureSupervisorClient
+from .services.camera_supervisor import CameraSupervisor
+from .services.camera_online_prober import CameraOnlineProber
+from .services.clip_export_service import ClipExportService
+from .services.snapshot_service import SnapshotService
+from .services.latest_frame_store import LatestFrame, MemoryLatestFrameStore, RedisLatestFrameStore
+from .services.hls_stream_service import HLSStreamService
+from .services.segment_retention_service import SegmentFile, SegmentRetentionService
+from .services.segment_store import SegmentStore
+from .repositories.video_cap_repository import VideoCapRepository
+from .models import VideoCapConfig
+from .services.segment_watcher import HLSSegmentWatcher
+from .services.video_cap_manager import VideoCapManager
+from .utils.capture_metrics import CameraMetrics, render_prometheus
+from .utils.config_loader import ConfigLoader
+from .utils.hls_playlist import parse_playlist
+from .utils.ingest_frame_reader import IngestFrameReader
+from .utils.video_cap_utils import VideoCapUtils
+from .views import CameraSnapshotView, CaptureMetricsView, VideoCapServerView, VideoClipExportView
+from .utils.reconnect_policy import CircuitState, ReconnectPolicy
 
-# Create your tests here.
+PLAYLIST = """#EXTM3U
+#EXT-X-VERSION:7
+#EXT-X-TARGETDURATION:2
+#EXT-X-MEDIA-SEQUENCE:41
+#EXT-X-MAP:URI="init.mp4"
+#EXT-X-PROGRAM-DATE-TIME:2024-01-01T12:00:00.000+0800
+#EXTINF:2.000000,
+202401011200_1704081600.m4s
+#EXTINF:1.500000,
+202401011200_1704081602.m4s
+"""
+
+class HLSPlaylistTests(SimpleTestCase):
+    def test_parse_playlist_reads_sequence_and_durations(self):
+        playlist = parse_playlist(PLAYLIST)
+
+        self.assertEqual(playlist.media_sequence, 41)
+        self.assertEqual(playlist.target_duration, 2)
+        self.assertEqual(playlist.init_uri, 'init.mp4')
+        self.assertFalse(playlist.ended)
+        self.assertEqual([segment.sequence for segment in playlist.segments], [41, 42])
+        self.assertEqual([segment.duration for segment in playlist.segments], [2.0, 1.5])
+
+    def test_program_date_time_is_derived_for_untagged_segments(self):
+        first, second = parse_playlist(PLAYLIST).segments
+
+        expected = datetime(2024, 1, 1, 4, 0, tzinfo=timezone.utc)
+        self.assertEqual(first.program_date_time, expected)
+        self.assertEqual(second.program_date_time, expected + timedelta(seconds=2))
+
+    def test_missing_extinf_falls_back_to_target_duration(self):
+        playlist = parse_playlist("#EXT-X-TARGETDURATION:4\nsegment.ts\n#EXT-X-ENDLIST\n")
+
+        self.assertEqual(playlist.segments[0].duration, 4)
+        self.assertEqual(playlist.segments[0].program_date_time, None)
+        self.assertTrue(playlist.ended)
+
+class HLSSegmentWatcherTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.playlist_path = os.path.join(self.temp_dir.name, 'index.m3u8')
+
+    def write_playlist(self, content, mtime_ns):
+        with open(self.playlist_path, 'w') as playlist_file:
+            playlist_file.write(content)
+        os.utime(self.playlist_path, ns=(mtime_ns, mtime_ns))
+
+    def test_each_segment_is_reported_once(self):
+        watcher = HLSSegmentWatcher(self.temp_dir.name)
+        self.write_playlist(PLAYLIST, 1_000_000_000)
+
+        finished = watcher.poll()
+        self.assertEqual([segment.sequence for segment in finished], [41, 42])
+        self.assertEqual(finished[0].init_path, os.path.join(self.temp_dir.name, 'init.mp4'))
+        self.assertEqual(finished[0].end_time, finished[1].start_time)
+        watcher.commit(finished)
+
+        # playlist 未變動時不重新解析
+        self.assertEqual(watcher.poll(), [])
+
+        self.write_playlist(PLAYLIST + "#EXTINF:2.000000,\n202401011200_1704081604.m4s\n", 2_000_000_000)
+        self.assertEqual([segment.sequence for segment in watcher.poll()], [43])
+
+    def test_uncommitted_segments_are_returned_again(self):
+        watcher = HLSSegmentWatcher(self.temp_dir.name)
+        self.write_playlist(PLAYLIST, 1_000_000_000)
+
+        first = watcher.poll()
+        # 未 commit（寫入失敗）時，playlist 未變動也要重新回傳同一批片段
+        self.assertEqual(watcher.poll(), first)
+        watcher.commit(first)
+        self.assertEqual(watcher.poll(), [])
+
+    def test_failed_clip_insert_keeps_segments_for_the_next_poll(self):
+        self.write_playlist(PLAYLIST, 1_000_000_000)
+        manager = VideoCapManager.__new__(VideoCapManager)
+        manager.running = {}
+        manager.logger = mock.Mock()
+        manager.metrics_registry = mock.Mock()
+        manager.repository = mock.Mock()
+        manager.repository.get_config.side_effect = [Exception('database unavailable'), 'config']
+        watcher = HLSSegmentWatcher(self.temp_dir.name)
+        manager.segment_watchers = {'rtmp://host/live/cam': watcher}
+
+        with mock.patch('djangoFlex_servers.videoCap_server.services.video_cap_manager.transaction'):
+            manager._check_and_update_video_clip('rtmp://host/live/cam')
+            manager.repository.create_current_video_clip.assert_not_called()
+            manager._check_and_update_video_clip('rtmp://host/live/cam')
+
+        sequences = [call.args[5] for call in manager.repository.create_current_video_clip.call_args_list]
+        self.assertEqual(sequences, [41, 42])
+        manager.repository.invalidate_config.assert_called_once_with('rtmp://host/live/cam')
+        self.assertEqual(watcher.poll(), [])
+
+    def test_missing_playlist_returns_nothing(self):
+        self.assertEqual(HLSSegmentWatcher(self.temp_dir.name).poll(), [])
+
+    def test_filename_epoch_is_used_without_program_date_time(self):
+        watcher = HLSSegmentWatcher(self.temp_dir.name)
+        self.write_playlist("#EXTINF:2.0,\n202401011200_1704081600.ts\n", 1_000_000_000)
+
+        segment, = watcher.poll()
+        self.assertEqual(segment.start_time, datetime.fromtimestamp(1704081600, tz=timezone.utc))
+        self.assertEqual(segment.end_time, segment.start_time + timedelta(seconds=2))
+
+class ReconnectPolicyTests(SimpleTestCase):
+    def make_policy(self, **kwargs):
+        transitions = []
+        kwargs.setdefault('on_state_change', lambda old, new: transitions.append((old, new)))
+        return ReconnectPolicy(base_delay=1, max_delay=30, failure_threshold=3,
+                               open_cooldown=30, max_open_cooldown=300, jitter=0, **kwargs), transitions
+
+    def test_circuit_opens_after_threshold_and_recovers_through_half_open(self):
+        policy, transitions = self.make_policy()
+
+        policy.record_failure()
+        policy.record_failure()
+        self.assertEqual(policy.state, CircuitState.CLOSED)
+        policy.record_failure()
+        self.assertEqual(policy.state, CircuitState.OPEN)
+        self.assertFalse(policy.ready())
+
+        policy.record_probe(True)
+        self.assertEqual(policy.state, CircuitState.HALF_OPEN)
+        self.assertTrue(policy.ready())
+        policy.record_success()
+
+        self.assertEqual(transitions, [
+            (CircuitState.CLOSED, CircuitState.OPEN),
+            (CircuitState.OPEN, CircuitState.HALF_OPEN),
+            (CircuitState.HALF_OPEN, CircuitState.CLOSED),
+        ])
+        self.assertEqual(policy.snapshot()['transitions']['closed->open'], 1)
+
+    def test_failure_in_half_open_reopens_immediately(self):
+        policy, transitions = self.make_policy()
+        for _ in range(3):
+            policy.record_failure()
+        policy.record_probe(True)
+        policy.record_failure()
+
+        self.assertEqual(policy.state, CircuitState.OPEN)
+        self.assertEqual(transitions[-1], (CircuitState.HALF_OPEN, CircuitState.OPEN))
+
+    def test_callback_runs_without_holding_the_lock(self):
+        snapshots = []
+
+        def on_state_change(old, new):
+            # 回呼中由其他線程讀取快照，若仍持有鎖會逾時
+            thread = threading.Thread(target=lambda: snapshots.append(policy.snapshot()))
+            thread.start()
+            thread.join(timeout=1)
+
+        policy, _ = self.make_policy(on_state_change=on_state_change)
+        for _ in range(3):
+            policy.record_failure()
+
+        self.assertEqual(len(snapshots), 1)
+        self.assertEqual(snapshots[0]['state'], CircuitState.OPEN)
+
+class OpenCircuitProbeTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def test_missing_stream_keeps_the_circuit_open(self):
+        policy = ReconnectPolicy(failure_threshold=1, jitter=0)
+        policy.record_failure()
+        policy.next_attempt_at = 0
+        manager = VideoCapManager.__new__(VideoCapManager)
+        manager.running = {self.rtmp_url: True}
+        manager.config = ConfigLoader.load_config()
+        manager.hls_service = mock.Mock(**{'is_stream_alive.return_value': False})
+        manager.metrics_registry = mock.Mock()
+        manager.reconnect_policies = {self.rtmp_url: policy}
+        manager._reconnect = mock.Mock()
+        manager._cleanup_resources = mock.Mock()
+
+        def probe_stream(rtmp_url, timeout):
+            # SRS 仍接受連線，但串流已不存在，ffprobe 讀不到標頭
+            manager.running[rtmp_url] = False
+            return None
+
+        with mock.patch.object(VideoCapUtils, 'probe_stream', side_effect=probe_stream) as probe:
+            manager._capture_loop(self.rtmp_url)
+
+        probe.assert_called_once_with(self.rtmp_url, manager.config.probe_timeout)
+        self.assertEqual(policy.state, CircuitState.OPEN)
+        self.assertFalse(policy.ready())
+        manager._reconnect.assert_not_called()
+
+    def test_stream_headers_move_the_circuit_to_half_open(self):
+        policy = ReconnectPolicy(failure_threshold=1, jitter=0)
+        policy.record_failure()
+        with mock.patch.object(VideoCapUtils, 'probe_stream', return_value=mock.Mock()):
+            policy.record_probe(VideoCapUtils.probe_stream_available(self.rtmp_url))
+
+        self.assertEqual(policy.state, CircuitState.HALF_OPEN)
+
+class SegmentRetentionSelectionTests(SimpleTestCase):
+    def make_service(self, max_age=None, camera_max_bytes=1000, total_max_bytes=10000):
+        service = SegmentRetentionService.__new__(SegmentRetentionService)
+        service.config = SimpleNamespace(
+            retention_max_age=max_age,
+            retention_camera_max_bytes=camera_max_bytes,
+            retention_total_max_bytes=total_max_bytes
+        )
+        return service
+
+    def make_segments(self, name, count, size=100, age_step=10):
+        now = time.time()
+        return [SegmentFile(f"{name}/{index}.ts", size, now - (count - index) * age_step) for index in range(count)]
+
+    def paths(self, segments):
+        return [segment.path for segment in segments]
+
+    def test_no_age_limit_by_default(self):
+        segments = self.make_segments('cam1_hls', 5, age_step=100000)
+
+        self.assertEqual(self.make_service()._select_expired({'cam1_hls': segments}), [])
+
+    def test_age_limit_removes_only_old_segments(self):
+        segments = self.make_segments('cam1_hls', 5, age_step=10)
+
+        expired = self.make_service(max_age=25)._select_expired({'cam1_hls': segments})
+        self.assertEqual(self.paths(expired), self.paths(segments[:3]))
+
+    def test_camera_quota_removes_oldest_first(self):
+        segments = self.make_segments('cam1_hls', 12)
+
+        expired = self.make_service(camera_max_bytes=1000)._select_expired({'cam1_hls': segments})
+        self.assertEqual(self.paths(expired), self.paths(segments[:2]))
+
+    def test_total_quota_applies_across_cameras(self):
+        cam1 = self.make_segments('cam1_hls', 4, age_step=10)
+        cam2 = self.make_segments('cam2_hls', 4, age_step=15)
+
+        expired = self.make_service(total_max_bytes=600)._select_expired({'cam1_hls': cam1, 'cam2_hls': cam2})
+        oldest = sorted(cam1 + cam2, key=lambda segment: segment.mtime)[:2]
+        self.assertEqual(self.paths(expired), self.paths(oldest))
+
+class RenderPrometheusTests(SimpleTestCase):
+    def test_renders_camera_metrics_with_escaped_labels(self):
+        metrics = CameraMetrics('rtmp://host/live/"cam"')
+        metrics.record_frame()
+        metrics.record_read_failure()
+        metrics.record_reconnect(success=False)
+        metrics.record_reconnect_transition('closed', 'open')
+
+        text = render_prometheus([{'rtmp_url': metrics.rtmp_url, 'metrics': metrics.snapshot()}])
+
+        label = 'camera="rtmp://host/live/\\"cam\\""'
+        self.assertIn('# TYPE videocap_frames_total counter', text)
+        self.assertIn(f'videocap_frames_total{{{label}}} 1', text)
+        self.assertIn(f'videocap_frame_read_failures_total{{{label}}} 1', text)
+        self.assertIn(f'videocap_reconnect_failures_total{{{label}}} 1', text)
+        self.assertIn(f'videocap_reconnect_state{{{label},state="open"}} 1', text)
+        self.assertIn(f'videocap_reconnect_state_transitions_total{{{label},from="closed",to="open"}} 1', text)
+        self.assertTrue(text.endswith('\n'))
+
+    def test_unset_values_and_missing_metrics_are_skipped(self):
+        text = render_prometheus([
+            {'rtmp_url': 'rtmp://host/live/a', 'metrics': CameraMetrics('rtmp://host/live/a').snapshot()},
+            {'rtmp_url': 'rtmp://host/live/b'},
+        ])
+
+        self.assertNotIn('videocap_ffmpeg_cpu_percent{', text)
+        self.assertNotIn('rtmp://host/live/b', text)
+        self.assertIn('videocap_frames_total{camera="rtmp://host/live/a"} 0', text)
+
+class IngestCommandTests(SimpleTestCase):
+    def make_service(self, **overrides):
+        service = HLSStreamService.__new__(HLSStreamService)
+        service.config = replace(ConfigLoader.load_config(), **overrides)
+        return service
+
+    def test_single_input_feeds_hls_and_raw_frames(self):
+        command = self.make_service(frame_output_resolution=(640, 360), frame_output_fps=2)._build_ffmpeg_command(
+            'rtmp://host/live/cam', '/clips/cam/index.m3u8')
+
+        self.assertEqual(command.count('-i'), 1)
+        self.assertEqual(command[command.index('-i') + 1], 'rtmp://host/live/cam')
+        hls_output = command.index('/clips/cam/index.m3u8')
+        self.assertEqual(command[command.index('-f') + 1], 'hls')
+        self.assertLess(command.index('libx264'), hls_output)
+        # 第二路輸出在 HLS 之後：降頻縮小的 bgr24 rawvideo 寫到 stdout
+        raw_args = command[hls_output + 1:]
+        self.assertEqual(raw_args[-1], 'pipe:1')
+        self.assertIn('fps=2,scale=640:360', raw_args)
+        self.assertEqual(raw_args[raw_args.index('-pix_fmt') + 1], 'bgr24')
+
+    def test_passthrough_copies_the_video_stream(self):
+        command = self.make_service()._build_ffmpeg_command('rtmp://host/live/cam', '/clips/cam/index.m3u8', passthrough=True)
+        hls_output = command.index('/clips/cam/index.m3u8')
+
+        self.assertEqual(command[command.index('-c:v') + 1], 'copy')
+        self.assertNotIn('libx264', command)
+        self.assertIn('-vf', command[hls_output:])
+
+class LowLatencyIngestTests(SimpleTestCase):
+    def build_command(self, **overrides):
+        service = HLSStreamService.__new__(HLSStreamService)
+        service.config = replace(ConfigLoader.load_config(), **overrides)
+        return service._build_ffmpeg_command('rtmp://host/live/cam', '/clips/cam/index.m3u8')
+
+    def argument(self, command, flag):
+        return command[command.index(flag) + 1]
+
+    def test_sub_second_fmp4_segments_start_on_key_frames(self):
+        command = self.build_command(low_latency=True, ll_hls_part_time=0.5, fps=20)
+
+        self.assertEqual(self.argument(command, '-hls_segment_type'), 'fmp4')
+        self.assertEqual(self.argument(command, '-hls_fmp4_init_filename'), 'init.mp4')
+        self.assertEqual(self.argument(command, '-hls_time'), '0.5')
+        self.assertEqual(self.argument(command, '-g'), '10')
+        self.assertIn('second_level_segment_index', self.argument(command, '-hls_flags'))
+        self.assertTrue(self.argument(command, '-hls_segment_filename').endswith('_%%04d.m4s'))
+
+    def test_default_mode_writes_mpegts_segments(self):
+        command = self.build_command(low_latency=False, hls_segment_type='mpegts', hls_time=2)
+
+        self.assertEqual(self.argument(command, '-hls_segment_type'), 'mpegts')
+        self.assertNotIn('-hls_fmp4_init_filename', command)
+        self.assertTrue(self.argument(command, '-hls_segment_filename').endswith('.ts'))
+
+class IngestFrameReaderTests(SimpleTestCase):
+    def test_reads_whole_frames_and_drops_partial_tail(self):
+        metrics = CameraMetrics('rtmp://host/live/cam')
+        frames = []
+        first = np.full((2, 3, 3), 1, dtype=np.uint8)
+        second = np.full((2, 3, 3), 2, dtype=np.uint8)
+        stdout = io.BytesIO(first.tobytes() + second.tobytes() + b'\x00' * 5)
+
+        reader = IngestFrameReader(stdout, (3, 2), metrics, on_frame=frames.append)
+        reader.start()
+        reader.thread.join(timeout=1)
+
+        self.assertTrue(reader.wait_for_first_frame(0))
+        latest, timestamp = reader.get_latest_frame()
+        np.testing.assert_array_equal(latest, second)
+        self.assertIsNotNone(timestamp)
+        self.assertEqual(len(frames), 2)
+        self.assertEqual(metrics.snapshot()['frames_total'], 2)
+        self.assertEqual(metrics.snapshot()['read_failures'], 1)
+
+class SupervisorSettingsTests(SimpleTestCase):
+    def test_authkey_is_read_from_the_environment(self):
+        from djangoFlex.settings import djangoFlex as project_settings
+
+        env = {'VIDEO_CAP_SUPERVISOR_HOST': 'capture', 'VIDEO_CAP_SUPERVISOR_AUTHKEY': 'secret'}
+        with mock.patch.dict(os.environ, env):
+            reloaded = importlib.reload(project_settings)
+        self.addCleanup(importlib.reload, project_settings)
+
+        self.assertEqual(reloaded.VIDEO_CAP_SUPERVISOR_ADDRESS, ('capture', 6010))
+        self.assertEqual(reloaded.VIDEO_CAP_SUPERVISOR_AUTHKEY, 'secret')
+
+@override_settings(VIDEO_CAP_SUPERVISOR_ADDRESS=('127.0.0.1', 6010), VIDEO_CAP_SUPERVISOR_AUTHKEY=None)
+class SupervisorUnavailableViewTests(SimpleTestCase):
+    def setUp(self):
+        VideoCapServerView.video_cap_service = None
+        self.addCleanup(setattr, VideoCapServerView, 'video_cap_service', None)
+
+    def test_control_api_returns_503_without_authkey(self):
+        request = APIRequestFactory().post('/api/videocap/', {'action': 'status', 'rtmp_url': 'rtmp://host/live/cam'}, format='json')
+
+        response = VideoCapServerView.as_view()(request)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('VIDEO_CAP_SUPERVISOR_AUTHKEY', response.data['error'])
+
+    def test_metrics_return_503_without_authkey(self):
+        response = CaptureMetricsView.as_view()(APIRequestFactory().get('/api/videocap/metrics/'))
+
+        self.assertEqual(response.status_code, 503)
+
+class FakeWorker:
+    def __init__(self):
+        self.calls = []
+        self.cameras = set()
+
+    def is_alive(self):
+        return True
+
+    def call(self, method, *args):
+        self.calls.append((method, args))
+        if method == 'start_video_cap_service':
+            return True, "started"
+        return True
+
+class CaptureSupervisorProtocolTests(SimpleTestCase):
+    def setUp(self):
+        self.worker = FakeWorker()
+        self.supervisor = CaptureSupervisor.__new__(CaptureSupervisor)
+        self.supervisor.logger = mock.Mock()
+        self.supervisor.workers = [self.worker]
+        self.supervisor.assignments = {}
+        self.supervisor.lock = threading.Lock()
+
+        self.listener = Listener(('127.0.0.1', 0), authkey=b'secret')
+        self.addCleanup(self.listener.close)
+        threading.Thread(target=self._serve, daemon=True).start()
+        self.client = CaptureSupervisorClient(self.listener.address, 'secret')
+
+    def _serve(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except multiprocessing.AuthenticationError:
+                continue
+            except OSError:
+                return
+            self.supervisor._handle_connection(conn)
+
+    def test_commands_round_trip_through_the_control_channel(self):
+        self.assertEqual(self.client.start_video_cap_service('rtmp://host/live/cam'), (True, "started"))
+        self.assertTrue(self.client.get_service_running_status('rtmp://host/live/cam'))
+        self.assertEqual(self.worker.calls[0], ('start_video_cap_service', ('rtmp://host/live/cam',)))
+        self.assertIs(self.supervisor.assignments['rtmp://host/live/cam'], self.worker)
+
+    def test_unknown_method_is_rejected(self):
+        with self.assertRaises(VideoCapException):
+            self.client._call('shutdown')
+
+    def test_wrong_authkey_is_reported_as_unavailable(self):
+        client = CaptureSupervisorClient(self.listener.address, 'wrong')
+
+        with self.assertRaises(SupervisorUnavailableError):
+            client.start_all_video_cap_service()
+
+class SupervisorConnectionErrorViewTests(SimpleTestCase):
+    def post(self, action):
+        request = APIRequestFactory().post('/api/videocap/', {'action': action}, format='json')
+        return VideoCapServerView.as_view()(request)
+
+    def test_bulk_actions_map_connection_errors_to_503(self):
+        self.addCleanup(setattr, VideoCapServerView, 'video_cap_service', None)
+        VideoCapServerView.video_cap_service = CaptureSupervisorClient(('127.0.0.1', 6010), 'secret')
+        client_path = 'djangoFlex_servers.videoCap_server.services.capture_supervisor_client.Client'
+
+        for error in (ConnectionRefusedError(111, 'Connection refused'), EOFError(), multiprocessing.AuthenticationError('digest')):
+            for action in ('start_all', 'stop_all'):
+                with self.subTest(error=type(error).__name__, action=action), mock.patch(client_path, side_effect=error):
+                    response = self.post(action)
+                    self.assertEqual(response.status_code, 503)
+                    self.assertIn(type(error).__name__, response.data['error'])
+
+class CameraSupervisorTests(SimpleTestCase):
+    def test_concurrency_is_bounded_and_results_keep_input_order(self):
+        lock = threading.Lock()
+        active = [0, 0]
+
+        def start(rtmp_url):
+            with lock:
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            if rtmp_url.endswith('3'):
+                raise VideoCapException('offline')
+            return True, 'started'
+
+        manager = SimpleNamespace(start_video_cap_service=start)
+        urls = [f'rtmp://host/live/cam{index}' for index in range(6)]
+        with mock.patch('djangoFlex_servers.videoCap_server.services.camera_supervisor.connection'):
+            results = CameraSupervisor(manager, max_concurrency=2, stagger=0).start_cameras(urls + urls[:1])
+
+        self.assertEqual([result['rtmp_url'] for result in results], urls)
+        self.assertEqual([result['success'] for result in results], [True, True, True, False, True, True])
+        self.assertEqual(results[3]['message'], 'offline')
+        self.assertLessEqual(active[1], 2)
+
+class CameraOnlineProberTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def setUp(self):
+        mock.patch('djangoFlex_servers.videoCap_server.services.camera_online_prober.connection').start()
+        self.probe = mock.patch(
+            'djangoFlex_servers.videoCap_server.services.camera_online_prober.StreamProbeService.probe',
+            return_value=SimpleNamespace(is_online=True)
+        ).start()
+        self.addCleanup(mock.patch.stopall)
+        self.prober = CameraOnlineProber()
+        self.addCleanup(self.prober.stop)
+
+    def test_unknown_camera_is_probed_in_the_background_then_cached(self):
+        self.assertIsNone(self.prober.get_status(self.rtmp_url))
+        self.prober.executor.shutdown(wait=True)
+
+        self.assertTrue(self.prober.get_status(self.rtmp_url))
+        self.probe.assert_called_once_with(self.rtmp_url)
+
+    def test_expired_result_is_not_served(self):
+        self.prober.results[self.rtmp_url] = (True, time.time() - self.prober.config.online_probe_ttl - 1)
+
+        self.assertIsNone(self.prober.get_status(self.rtmp_url))
+        self.prober.executor.shutdown(wait=True)
+        self.probe.assert_called_once_with(self.rtmp_url)
+
+class ProbeStreamTests(SimpleTestCase):
+    def run_ffprobe(self, stdout, returncode=0):
+        result = SimpleNamespace(returncode=returncode, stdout=stdout.encode(), stderr=b'')
+        return mock.patch('djangoFlex_servers.videoCap_server.utils.video_cap_utils.subprocess.run', return_value=result)
+
+    def test_reads_stream_parameters_from_headers(self):
+        output = ('{"streams": [{"codec_name": "h264", "width": 1280, "height": 720, "avg_frame_rate": "0/0", '
+                  '"r_frame_rate": "30000/1001"}], "format": {"bit_rate": "2500000"}}')
+        with self.run_ffprobe(output) as run:
+            result = VideoCapUtils.probe_stream('rtmp://host/live/cam', timeout=2)
+
+        command = run.call_args.args[0]
+        self.assertEqual(command[0], 'ffprobe')
+        self.assertNotIn('-t', command)
+        self.assertEqual((result.codec_name, result.width, result.height), ('h264', 1280, 720))
+        self.assertAlmostEqual(result.fps, 29.97, places=2)
+        self.assertEqual(result.bit_rate, 2500000)
+
+    def test_failed_probe_means_offline(self):
+        with self.run_ffprobe('', returncode=1):
+            self.assertIsNone(VideoCapUtils.probe_stream('rtmp://host/live/cam'))
+            self.assertFalse(VideoCapUtils.check_camera_online('rtmp://host/live/cam'))
+
+    def test_timeout_means_offline(self):
+        with mock.patch('djangoFlex_servers.videoCap_server.utils.video_cap_utils.subprocess.run',
+                        side_effect=subprocess.TimeoutExpired('ffprobe', 2)):
+            self.assertIsNone(VideoCapUtils.probe_stream('rtmp://host/live/cam'))
+
+class HLSPassthroughTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def make_service(self, **overrides):
+        service = HLSStreamService.__new__(HLSStreamService)
+        service.logger = mock.Mock()
+        overrides = {'resolution': (1280, 720), 'low_latency': False, **overrides}
+        service.config = replace(ConfigLoader.load_config(), **overrides)
+        return service
+
+    def probe(self, **stream):
+        values = {'is_online': True, 'codec_name': 'h264', 'width': 1280, 'height': 720}
+        values.update(stream)
+        return mock.patch('djangoFlex_servers.videoCap_server.services.hls_stream_service.StreamProbeService.get_stream_parameters',
+                          return_value=SimpleNamespace(**values))
+
+    def test_auto_copies_matching_h264(self):
+        with self.probe():
+            self.assertTrue(self.make_service(hls_passthrough='auto')._should_passthrough(self.rtmp_url))
+
+    def test_auto_transcodes_other_codecs_or_resolutions(self):
+        for stream in ({'codec_name': 'hevc'}, {'width': 1920, 'height': 1080}, {'is_online': False}):
+            with self.subTest(stream=stream), self.probe(**stream):
+                self.assertFalse(self.make_service(hls_passthrough='auto')._should_passthrough(self.rtmp_url))
+
+    def test_probe_errors_fall_back_to_transcoding(self):
+        with self.probe() as get_stream_parameters:
+            get_stream_parameters.side_effect = Exception('ffprobe missing')
+            self.assertFalse(self.make_service(hls_passthrough='auto')._should_passthrough(self.rtmp_url))
+
+    def test_explicit_modes_skip_the_probe(self):
+        with self.probe() as get_stream_parameters:
+            self.assertTrue(self.make_service(hls_passthrough='always')._should_passthrough(self.rtmp_url))
+            self.assertFalse(self.make_service(hls_passthrough='never')._should_passthrough(self.rtmp_url))
+            self.assertFalse(self.make_service(hls_passthrough='auto', low_latency=True)._should_passthrough(self.rtmp_url))
+        get_stream_parameters.assert_not_called()
+
+class SegmentStoreSpillTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.memory_dir = os.path.join(self.temp_dir.name, 'shm')
+        self.disk_dir = os.path.join(self.temp_dir.name, 'disk')
+        self.camera_dir = os.path.join(self.memory_dir, 'cam_hls')
+        os.makedirs(self.camera_dir)
+        self.store = SegmentStore.__new__(SegmentStore)
+        self.store.logger = mock.Mock()
+        self.store.config = SimpleNamespace(segment_store='memory', memory_segment_dir=self.memory_dir,
+                                            video_clip_dir=self.disk_dir, memory_segment_max_bytes=250)
+        self.clip_model = mock.patch('djangoFlex_servers.videoCap_server.services.segment_store.CurrentVideoClip').start()
+        self.clip_model.objects.filter.return_value = []
+        self.addCleanup(mock.patch.stopall)
+
+    def write(self, name, content, mtime=None):
+        path = os.path.join(self.camera_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_oldest_segments_outside_the_playlist_are_moved(self):
+        for index in range(4):
+            self.write(f'{index}.m4s', b'x' * 100, mtime=1000 + index)
+        # 0.m4s 仍在 playlist 中（ffmpeg 可能還在讀寫），即使最舊也不能搬移
+        self.write('index.m3u8', b'#EXTINF:2.0,\n0.m4s\n#EXTINF:2.0,\n3.m4s\n')
+
+        self.assertEqual(self.store.spill(), 2)
+
+        self.assertEqual(sorted(os.listdir(self.camera_dir)), ['0.m4s', '3.m4s', 'index.m3u8'])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.disk_dir, 'cam_hls'))), ['1.m4s', '2.m4s'])
+        moved = self.clip_model.objects.filter.call_args.kwargs['clip_path__in']
+        self.assertEqual(sorted(moved), [os.path.join(self.camera_dir, '1.m4s'), os.path.join(self.camera_dir, '2.m4s')])
+
+    def test_under_quota_moves_nothing(self):
+        self.write('0.m4s', b'x' * 100)
+
+        self.assertEqual(self.store.spill(), 0)
+        self.assertFalse(os.path.exists(self.disk_dir))
+
+    def test_stale_init_segment_on_disk_is_replaced(self):
+        disk_camera_dir = os.path.join(self.disk_dir, 'cam_hls')
+        os.makedirs(disk_camera_dir)
+        with open(os.path.join(disk_camera_dir, 'init.mp4'), 'wb') as f:
+            f.write(b'old-moov')
+        self.write('init.mp4', b'new-moov')
+        for index in range(3):
+            self.write(f'{index}.m4s', b'x' * 100, mtime=1000 + index)
+
+        self.store.spill()
+
+        with open(os.path.join(disk_camera_dir, 'init.mp4'), 'rb') as f:
+            self.assertEqual(f.read(), b'new-moov')
+
+class VideoCapConfigCacheTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def setUp(self):
+        VideoCapRepository.invalidate_config()
+        self.addCleanup(VideoCapRepository.invalidate_config)
+        self.objects = mock.patch('djangoFlex_servers.videoCap_server.repositories.video_cap_repository.VideoCapConfig.objects').start()
+        self.addCleanup(mock.patch.stopall)
+        self.objects.get.side_effect = lambda rtmp_url: SimpleNamespace(rtmp_url=rtmp_url)
+
+    def test_repeated_lookups_hit_the_cache(self):
+        first = VideoCapRepository.get_config(self.rtmp_url)
+
+        self.assertIs(VideoCapRepository.get_config(self.rtmp_url), first)
+        self.objects.get.assert_called_once_with(rtmp_url=self.rtmp_url)
+
+    def test_save_signal_invalidates_the_cache(self):
+        first = VideoCapRepository.get_config(self.rtmp_url)
+        post_save.send(sender=VideoCapConfig, instance=first, created=False)
+
+        self.assertIsNot(VideoCapRepository.get_config(self.rtmp_url), first)
+        self.assertEqual(self.objects.get.call_count, 2)
+
+    def test_entries_expire_after_the_ttl(self):
+        VideoCapRepository.get_config(self.rtmp_url)
+        expired = time.time() + VideoCapRepository._cache_ttl() + 1
+
+        with mock.patch('djangoFlex_servers.videoCap_server.repositories.video_cap_repository.time.time', return_value=expired):
+            VideoCapRepository.get_config(self.rtmp_url)
+        self.assertEqual(self.objects.get.call_count, 2)
+
+    def test_active_flag_update_invalidates_the_entry(self):
+        VideoCapRepository.get_config(self.rtmp_url)
+        VideoCapRepository.update_config_active(self.rtmp_url, False)
+        VideoCapRepository.get_config(self.rtmp_url)
+
+        self.objects.filter.return_value.update.assert_called_once_with(is_active=False)
+        self.assertEqual(self.objects.get.call_count, 2)
+
+class SegmentTimeIndexTests(SimpleTestCase):
+    def test_program_date_time_wins_over_the_filename_epoch(self):
+        with tempfile.TemporaryDirectory() as hls_dir:
+            with open(os.path.join(hls_dir, 'index.m3u8'), 'w') as playlist_file:
+                playlist_file.write("#EXT-X-MEDIA-SEQUENCE:7\n#EXT-X-PROGRAM-DATE-TIME:2024-01-01T04:00:00.250Z\n"
+                                    "#EXTINF:2.0,\n202401011159_1704081599.ts\n")
+
+            segment, = HLSSegmentWatcher(hls_dir).poll()
+
+        self.assertEqual(segment.sequence, 7)
+        self.assertEqual(segment.start_time, datetime(2024, 1, 1, 4, 0, 0, 250000, tzinfo=timezone.utc))
+        self.assertEqual(segment.end_time - segment.start_time, timedelta(seconds=2))
+
+    def test_range_lookup_bounds_start_time_on_both_sides(self):
+        start = datetime(2024, 1, 1, 4, 0, tzinfo=timezone.utc)
+        end = start + timedelta(minutes=5)
+
+        with mock.patch('djangoFlex_servers.videoCap_server.repositories.video_cap_repository.CurrentVideoClip') as clip_model:
+            VideoCapRepository.get_clips_in_range('config', start, end, max_segment_duration=30)
+
+        clip_model.objects.filter.assert_called_once_with(
+            config='config',
+            start_time__gte=start - timedelta(seconds=30),
+            start_time__lt=end,
+            end_time__gt=start
+        )
+        clip_model.objects.filter.return_value.order_by.assert_called_once_with('start_time')
+
+class VideoClipExportViewTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+    start = datetime(2024, 1, 1, 4, 0, tzinfo=timezone.utc)
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        repository = 'djangoFlex_servers.videoCap_server.services.clip_export_service.VideoCapRepository'
+        self.get_config = mock.patch(f'{repository}.get_config', return_value='config').start()
+        self.get_clips = mock.patch(f'{repository}.get_clips_in_range', return_value=[]).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def export(self, start, end, rtmp_url=rtmp_url):
+        params = {'rtmp_url': rtmp_url, 'start': start.isoformat(), 'end': end.isoformat()}
+        return VideoClipExportView.as_view()(APIRequestFactory().get('/api/videocap/export/', params))
+
+    def clip(self, name, offset):
+        path = os.path.join(self.temp_dir.name, name)
+        open(path, 'wb').close()
+        start_time = self.start + timedelta(seconds=offset)
+        return SimpleNamespace(clip_path=path, start_time=start_time, end_time=start_time + timedelta(seconds=2))
+
+    def test_invalid_ranges_are_400(self):
+        self.assertEqual(self.export(self.start, self.start).status_code, 400)
+        self.assertEqual(self.export(self.start, self.start + timedelta(days=1)).status_code, 400)
+        self.get_config.assert_not_called()
+
+    def test_mixed_containers_are_400(self):
+        self.get_clips.return_value = [self.clip('a.ts', 0), self.clip('b.m4s', 2)]
+
+        self.assertEqual(self.export(self.start, self.start + timedelta(seconds=4)).status_code, 400)
+
+    def test_unknown_camera_and_empty_range_are_404(self):
+        self.get_config.side_effect = VideoCapConfig.DoesNotExist
+        self.assertEqual(self.export(self.start, self.start + timedelta(seconds=4)).status_code, 404)
+
+        self.get_config.side_effect = None
+        # 資料庫中的片段已被回收（檔案不存在）也視為沒有片段
+        missing = self.clip('gone.ts', 0)
+        os.remove(missing.clip_path)
+        self.get_clips.return_value = [missing]
+        self.assertEqual(self.export(self.start, self.start + timedelta(seconds=4)).status_code, 404)
+
+    def test_concat_list_trims_the_first_and_last_segment(self):
+        clips = [self.clip('a.ts', 0), self.clip('b.ts', 2)]
+        list_path = ClipExportService()._write_concat_list(clips, self.start + timedelta(seconds=0.5), self.start + timedelta(seconds=3))
+        self.addCleanup(os.remove, list_path)
+
+        with open(list_path) as list_file:
+            lines = list_file.read().splitlines()
+        self.assertEqual(lines, ['ffconcat version 1.0', f"file '{clips[0].clip_path}'", 'inpoint 0.500',
+                                 f"file '{clips[1].clip_path}'", 'outpoint 1.000'])
+
+class MemoryLatestFrameStoreTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def test_keeps_only_the_latest_frame_with_increasing_versions(self):
+        store = MemoryLatestFrameStore()
+        self.assertIsNone(store.get(self.rtmp_url))
+        self.assertEqual(store.get_version(self.rtmp_url), 0)
+
+        store.publish(self.rtmp_url, b'first', 1.0)
+        version = store.publish(self.rtmp_url, b'second', 2.0)
+
+        self.assertEqual(version, 2)
+        self.assertEqual(store.get(self.rtmp_url), LatestFrame(b'second', 2.0, 2))
+        self.assertEqual(store.get_version('rtmp://host/live/other'), 0)
+
+    def test_subscription_waits_for_the_next_version(self):
+        store = MemoryLatestFrameStore()
+        store.publish(self.rtmp_url, b'old', 1.0)
+
+        async def scenario():
+            subscription = await store.subscribe(self.rtmp_url)
+            # 訂閱前已存在的版本不算新幀
+            self.assertIsNone(await subscription.wait(0.01))
+            asyncio.get_running_loop().call_later(0.01, store.publish, self.rtmp_url, b'new', 2.0)
+            version = await subscription.wait(1)
+            frame = await subscription.get()
+            await subscription.close()
+            return version, frame
+
+        version, frame = asyncio.run(scenario())
+        self.assertEqual(version, 2)
+        self.assertEqual(frame.data, b'new')
+
+class RedisFrameParsingTests(SimpleTestCase):
+    def test_hash_values_are_parsed_into_a_frame(self):
+        values = {b'data': b'jpeg', b'timestamp': b'12.5', b'version': b'7'}
+
+        self.assertEqual(RedisLatestFrameStore.parse_frame(values), LatestFrame(b'jpeg', 12.5, 7))
+        self.assertIsNone(RedisLatestFrameStore.parse_frame({}))
+
+class RedisLatestFrameStoreTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def make_store(self):
+        with mock.patch('djangoFlex_servers.videoCap_server.services.latest_frame_store.redis.Redis.from_url') as from_url:
+            store = RedisLatestFrameStore('redis://localhost:6379/1', ttl=30, socket_timeout=1)
+        from_url.assert_called_once_with('redis://localhost:6379/1', socket_timeout=1, socket_connect_timeout=1)
+        return store
+
+    def test_publish_expires_the_frame_and_announces_the_version(self):
+        store = self.make_store()
+        store.client.incr.return_value = 5
+        pipeline = store.client.pipeline.return_value
+
+        self.assertEqual(store.publish(self.rtmp_url, b'jpeg', 12.5), 5)
+        pipeline.hset.assert_called_once_with(store.frame_key(self.rtmp_url), mapping={'data': b'jpeg', 'timestamp': 12.5, 'version': 5})
+        pipeline.expire.assert_called_once_with(store.frame_key(self.rtmp_url), 30)
+        pipeline.publish.assert_called_once_with(store.channel(self.rtmp_url), 5)
+
+    def test_expired_frame_has_no_version(self):
+        store = self.make_store()
+        pipeline = store.client.pipeline.return_value
+
+        pipeline.execute.return_value = [1, b'5']
+        self.assertEqual(store.get_version(self.rtmp_url), 5)
+        # 攝影機停止、幀已過期，但版本號計數器仍在
+        pipeline.execute.return_value = [0, b'5']
+        self.assertEqual(store.get_version(self.rtmp_url), 0)
+
+class CameraSnapshotViewTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def setUp(self):
+        self.store = MemoryLatestFrameStore()
+        with mock.patch('djangoFlex_servers.videoCap_server.services.snapshot_service.get_latest_frame_store', return_value=self.store):
+            self.service = SnapshotService()
+        self.service.camera_urls['cam'] = (self.rtmp_url, time.time())
+        mock.patch.object(SnapshotService, 'get_instance', return_value=self.service).start()
+        self.addCleanup(mock.patch.stopall)
+
+    def publish(self):
+        _, buffer = cv2.imencode('.jpg', np.zeros((180, 640, 3), dtype=np.uint8))
+        return self.store.publish(self.rtmp_url, buffer.tobytes())
+
+    def get(self, size='full', etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        request = APIRequestFactory().get('/snapshot/cam/', {'size': size}, **headers)
+        return CameraSnapshotView.as_view()(request, camera_name='cam')
+
+    def test_unchanged_version_answers_304(self):
+        self.publish()
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+        self.assertEqual(self.get(etag=response['ETag']).status_code, 304)
+
+        self.publish()
+        refreshed = self.get(etag=response['ETag'])
+        self.assertEqual(refreshed.status_code, 200)
+        self.assertNotEqual(refreshed['ETag'], response['ETag'])
+
+    def test_thumbnail_is_resized_and_tagged_separately(self):
+        self.publish()
+        response = self.get(size='thumb')
+
+        thumb = cv2.imdecode(np.frombuffer(response.content, dtype=np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(thumb.shape[1], self.service.config.snapshot_sizes['thumb'])
+        self.assertNotEqual(response['ETag'], self.get()['ETag'])
+
+    def test_expired_frame_is_404_even_with_the_last_etag(self):
+        self.publish()
+        etag = self.get()['ETag']
+        # 攝影機停止後幀過期：存放區回報版本 0、沒有幀
+        self.store.frames.clear()
+        mock.patch.object(self.store, 'get_version', return_value=0).start()
+
+        self.assertEqual(self.get(etag=etag).status_code, 404)
+
+    def test_unknown_size_is_400(self):
+        self.assertEqual(self.get(size='huge').status_code, 400)
+
+class LatestFrameMailboxTests(SimpleTestCase):
+    def test_slow_reader_only_gets_the_newest_frame(self):
+        async def scenario():
+            mailbox = LatestFrameMailbox()
+            for version in range(1, 4):
+                mailbox.put(LatestFrame(b'jpeg', 0, version))
+            return await mailbox.get(), mailbox.dropped
+
+        frame, dropped = asyncio.run(scenario())
+        self.assertEqual(frame.version, 3)
+        self.assertEqual(dropped, 2)
+
+class FrameBroadcasterTests(SimpleTestCase):
+    rtmp_url = 'rtmp://host/live/cam'
+
+    def test_clients_share_one_subscription_per_camera(self):
+        store = MemoryLatestFrameStore()
+
+        async def scenario():
+            first, second = LatestFrameMailbox(), LatestFrameMailbox()
+            broadcaster = FrameBroadcaster.join(self.rtmp_url, first)
+            self.assertIs(FrameBroadcaster.join(self.rtmp_url, second), broadcaster)
+
+            store.publish(self.rtmp_url, b'jpeg')
+            frames = await asyncio.wait_for(asyncio.gather(first.get(), second.get()), timeout=1)
+
+            await broadcaster.leave(first)
+            self.assertIn(self.rtmp_url, FrameBroadcaster._broadcasters)
+            await broadcaster.leave(second)
+            return frames, broadcaster.task
+
+        with mock.patch('djangoFlex_servers.videoCap_server.consumers.get_latest_frame_store', return_value=store):
+            frames, task = asyncio.run(scenario())
+
+        self.assertEqual([frame.version for frame in frames], [1, 1])
+        self.assertNotIn(self.rtmp_url, FrameBroadcaster._broadcasters)
+        self.assertTrue(task.cancelled())
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import VideoCapServerView
+from .views import VideoCapServerView, CaptureMetricsView, VideoClipExportView, CameraSnapshotView
 
 urlpatterns = [
     path('api/videocap/', VideoCapServerView.as_view(), name='videocap_api'),
+    path('api/videocap/metrics/', CaptureMetricsView.as_view(), name='videocap_metrics'),
+    path('api/videocap/export/', VideoClipExportView.as_view(), name='videocap_export'),
+    path('snapshot/<str:camera_name>/', CameraSnapshotView.as_view(), name='videocap_snapshot'),
 ]
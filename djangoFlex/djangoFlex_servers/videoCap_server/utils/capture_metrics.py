@@ -0,0 +1,219 @@
+import time
+import threading
+from collections import Counter, deque
+from datetime import datetime, timezone
+import psutil
+
+class CameraMetrics:
+    """
+    單一攝影機的擷取指標。
+
+    幀與片段以滑動時間窗計算速率；ffmpeg 的 CPU 與 RSS 在取快照時才透過 psutil 讀取，
+    不增加擷取迴圈的負擔。
+    """
+
+    def __init__(self, rtmp_url, window=10):
+        self.rtmp_url = rtmp_url
+        self.window = window
+        self.lock = threading.Lock()
+        self.frame_times = deque()
+        self.segment_times = deque()
+        self.frames_total = 0
+        self.read_failures = 0
+        self.reconnects = 0
+        self.reconnect_failures = 0
+        self.reconnect_state = None
+        self.reconnect_transitions = Counter()
+        self.segments_total = 0
+        self.last_segment_end = None
+        self.process = None
+        self.progress = None
+
+    def record_frame(self):
+        now = time.time()
+        with self.lock:
+            self.frames_total += 1
+            self.frame_times.append(now)
+            self._trim(self.frame_times, now)
+
+    def record_read_failure(self):
+        with self.lock:
+            self.read_failures += 1
+
+    def record_reconnect(self, success):
+        with self.lock:
+            self.reconnects += 1
+            if not success:
+                self.reconnect_failures += 1
+
+    def set_reconnect_state(self, state):
+        with self.lock:
+            self.reconnect_state = state
+
+    def record_reconnect_transition(self, old_state, new_state):
+        with self.lock:
+            self.reconnect_state = new_state
+            self.reconnect_transitions[(old_state, new_state)] += 1
+
+    def record_segments(self, segments):
+        if not segments:
+            return
+        now = time.time()
+        with self.lock:
+            self.segments_total += len(segments)
+            self.segment_times.extend([now] * len(segments))
+            self._trim(self.segment_times, now)
+            self.last_segment_end = segments[-1].end_time
+
+    def set_process(self, pid):
+        with self.lock:
+            try:
+                self.process = psutil.Process(pid) if pid else None
+                if self.process is not None:
+                    # 第一次呼叫 cpu_percent 只建立基準，之後的快照才有意義
+                    self.process.cpu_percent(interval=None)
+            except psutil.Error:
+                self.process = None
+
+    def set_progress(self, progress):
+        with self.lock:
+            self.progress = progress
+
+    def snapshot(self):
+        now = time.time()
+        with self.lock:
+            self._trim(self.frame_times, now)
+            self._trim(self.segment_times, now)
+            segment_lag = None
+            if self.last_segment_end is not None:
+                segment_lag = round((datetime.now(timezone.utc) - self.last_segment_end).total_seconds(), 3)
+            cpu_percent, rss_bytes = self._process_usage()
+            progress = self.progress.snapshot() if self.progress else {}
+            return {
+                'fps': round(len(self.frame_times) / self.window, 3),
+                'frames_total': self.frames_total,
+                'read_failures': self.read_failures,
+                'reconnects': self.reconnects,
+                'reconnect_failures': self.reconnect_failures,
+                'reconnect_state': self.reconnect_state,
+                'reconnect_transitions': {f"{old}->{new}": count for (old, new), count in self.reconnect_transitions.items()},
+                'segments_total': self.segments_total,
+                'segments_per_minute': round(len(self.segment_times) * 60 / self.window, 3),
+                'segment_lag_seconds': segment_lag,
+                'ffmpeg_cpu_percent': cpu_percent,
+                'ffmpeg_rss_bytes': rss_bytes,
+                'ffmpeg_fps': progress.get('fps'),
+                'ffmpeg_speed': progress.get('speed'),
+                'ffmpeg_bitrate_kbps': progress.get('bitrate_kbps'),
+                'ffmpeg_drop_frames': progress.get('drop_frames'),
+                'ffmpeg_dup_frames': progress.get('dup_frames'),
+                'ffmpeg_out_time': progress.get('out_time'),
+                'ffmpeg_slow_alerts': progress.get('slow_alerts'),
+            }
+
+    def _process_usage(self):
+        if self.process is None:
+            return None, None
+        try:
+            with self.process.oneshot():
+                return self.process.cpu_percent(interval=None), self.process.memory_info().rss
+        except psutil.Error:
+            self.process = None
+            return None, None
+
+    def _trim(self, times, now):
+        while times and now - times[0] > self.window:
+            times.popleft()
+
+class CaptureMetricsRegistry:
+    """
+    進程內所有攝影機的擷取指標，供 list_running_threads 與 Prometheus 端點讀取。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.cameras = {}
+
+    def get(self, rtmp_url):
+        with self.lock:
+            metrics = self.cameras.get(rtmp_url)
+            if metrics is None:
+                metrics = self.cameras[rtmp_url] = CameraMetrics(rtmp_url)
+            return metrics
+
+    def remove(self, rtmp_url):
+        with self.lock:
+            self.cameras.pop(rtmp_url, None)
+
+    def snapshot(self, rtmp_url):
+        with self.lock:
+            metrics = self.cameras.get(rtmp_url)
+        return metrics.snapshot() if metrics else None
+
+# Prometheus 指標名稱、類型、說明與對應的快照欄位
+PROMETHEUS_METRICS = (
+    ('videocap_frames_per_second', 'gauge', 'Decoded frames read from the ingest process per second', 'fps'),
+    ('videocap_frames_total', 'counter', 'Decoded frames read from the ingest process', 'frames_total'),
+    ('videocap_frame_read_failures_total', 'counter', 'Incomplete frame reads and ingest stalls', 'read_failures'),
+    ('videocap_reconnects_total', 'counter', 'Full reconnect attempts', 'reconnects'),
+    ('videocap_reconnect_failures_total', 'counter', 'Failed reconnect attempts', 'reconnect_failures'),
+    ('videocap_segments_total', 'counter', 'Finished HLS segments', 'segments_total'),
+    ('videocap_segments_per_minute', 'gauge', 'Finished HLS segments per minute', 'segments_per_minute'),
+    ('videocap_segment_lag_seconds', 'gauge', 'Seconds since the end of the newest finished segment', 'segment_lag_seconds'),
+    ('videocap_ffmpeg_cpu_percent', 'gauge', 'CPU usage of the ingest ffmpeg process', 'ffmpeg_cpu_percent'),
+    ('videocap_ffmpeg_rss_bytes', 'gauge', 'Resident memory of the ingest ffmpeg process', 'ffmpeg_rss_bytes'),
+    ('videocap_ffmpeg_fps', 'gauge', 'Encoding frame rate reported by ffmpeg -progress', 'ffmpeg_fps'),
+    ('videocap_ffmpeg_speed', 'gauge', 'Processing speed relative to real time reported by ffmpeg -progress', 'ffmpeg_speed'),
+    ('videocap_ffmpeg_bitrate_kbps', 'gauge', 'Output bitrate reported by ffmpeg -progress', 'ffmpeg_bitrate_kbps'),
+    ('videocap_ffmpeg_drop_frames', 'gauge', 'Frames dropped by the ingest ffmpeg process', 'ffmpeg_drop_frames'),
+    ('videocap_ffmpeg_dup_frames', 'gauge', 'Frames duplicated by the ingest ffmpeg process', 'ffmpeg_dup_frames'),
+    ('videocap_ffmpeg_out_time_seconds', 'gauge', 'Output timestamp reported by ffmpeg -progress', 'ffmpeg_out_time'),
+    ('videocap_ffmpeg_slow_alerts_total', 'counter', 'Times the ingest process ran slower than real time', 'ffmpeg_slow_alerts'),
+)
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def render_prometheus(running_threads):
+    """
+    將 list_running_threads 的結果轉為 Prometheus text exposition 格式。
+
+    Args:
+        running_threads: list_running_threads 回傳的列表，每筆需含 rtmp_url 與 metrics
+
+    Returns:
+        str: Prometheus 格式的指標文字
+    """
+    cameras = [(thread_info['rtmp_url'], thread_info['metrics']) for thread_info in running_threads if thread_info.get('metrics')]
+    lines = []
+    for name, metric_type, help_text, field in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for rtmp_url, metrics in cameras:
+            if metrics.get(field) is not None:
+                lines.append(f'{name}{{camera="{_escape_label(rtmp_url)}"}} {metrics[field]}')
+
+    lines.append("# HELP videocap_reconnect_state Current reconnect circuit state")
+    lines.append("# TYPE videocap_reconnect_state gauge")
+    for rtmp_url, metrics in cameras:
+        if metrics.get('reconnect_state'):
+            lines.append(f'videocap_reconnect_state{{camera="{_escape_label(rtmp_url)}",state="{metrics["reconnect_state"]}"}} 1')
+
+    lines.append("# HELP videocap_reconnect_state_transitions_total Reconnect circuit state transitions")
+    lines.append("# TYPE videocap_reconnect_state_transitions_total counter")
+    for rtmp_url, metrics in cameras:
+        for transition, count in sorted((metrics.get('reconnect_transitions') or {}).items()):
+            old_state, new_state = transition.split('->')
+            lines.append(
+                f'videocap_reconnect_state_transitions_total{{camera="{_escape_label(rtmp_url)}",from="{old_state}",to="{new_state}"}} {count}'
+            )
+    return '\n'.join(lines) + '\n'
@@ -9,8 +9,51 @@ class VideoCapConfig:
     hls_time: int
     video_clip_dir: str
     check_interval: float
-    reconnect_timeout: int
     max_reconnect_attempts: int
+    frame_output_fps: float
+    frame_output_resolution: tuple
+    liveness_timeout: float
+    open_timeout: float
+    supervisor_address: tuple
+    supervisor_authkey: str
+    supervisor_workers: int
+    start_concurrency: int
+    start_stagger: float
+    reconnect_base_delay: float
+    reconnect_max_delay: float
+    circuit_open_cooldown: float
+    circuit_max_cooldown: float
+    probe_timeout: float
+    online_probe_interval: float
+    online_probe_ttl: float
+    online_probe_concurrency: int
+    hls_passthrough: str
+    passthrough_probe_max_age: float
+    retention_interval: float
+    retention_max_age: float
+    retention_camera_max_bytes: int
+    retention_total_max_bytes: int
+    retention_batch_size: int
+    segment_store: str
+    memory_segment_dir: str
+    memory_segment_max_bytes: int
+    hls_segment_type: str
+    low_latency: bool
+    ll_hls_part_time: float
+    ffmpeg_min_speed: float
+    ffmpeg_slow_reports: int
+    config_cache_ttl: float
+    export_max_duration: int
+    max_segment_duration: float
+    export_chunk_size: int
+    frame_store: str
+    frame_store_url: str
+    frame_store_ttl: int
+    frame_store_socket_timeout: float
+    active_check_interval: float
+    snapshot_interval: float
+    snapshot_jpeg_quality: int
+    snapshot_sizes: dict
 
 class ConfigLoader:
     @staticmethod
@@ -22,6 +65,50 @@ class ConfigLoader:
             hls_time=getattr(settings, 'VIDEO_CAP_HLS_TIME', 2),
             video_clip_dir=getattr(settings, 'VIDEO_CAP_CLIP_DIR', 'tmp/video_clip'),
             check_interval=getattr(settings, 'VIDEO_CAP_CHECK_INTERVAL', 0.1),
-            reconnect_timeout=getattr(settings, 'VIDEO_CAP_RECONNECT_TIMEOUT', 5),
-            max_reconnect_attempts=getattr(settings, 'VIDEO_CAP_MAX_RECONNECT_ATTEMPTS', 5)
+            max_reconnect_attempts=getattr(settings, 'VIDEO_CAP_MAX_RECONNECT_ATTEMPTS', 5),
+            frame_output_fps=getattr(settings, 'VIDEO_CAP_FRAME_OUTPUT_FPS', 2),
+            frame_output_resolution=getattr(settings, 'VIDEO_CAP_FRAME_OUTPUT_RESOLUTION', (640, 360)),
+            liveness_timeout=getattr(settings, 'VIDEO_CAP_LIVENESS_TIMEOUT', 3),
+            open_timeout=getattr(settings, 'VIDEO_CAP_OPEN_TIMEOUT', 5),
+            supervisor_address=getattr(settings, 'VIDEO_CAP_SUPERVISOR_ADDRESS', None),
+            supervisor_authkey=getattr(settings, 'VIDEO_CAP_SUPERVISOR_AUTHKEY', None),
+            supervisor_workers=getattr(settings, 'VIDEO_CAP_SUPERVISOR_WORKERS', None),
+            start_concurrency=getattr(settings, 'VIDEO_CAP_START_CONCURRENCY', 8),
+            start_stagger=getattr(settings, 'VIDEO_CAP_START_STAGGER', 0.2),
+            reconnect_base_delay=getattr(settings, 'VIDEO_CAP_RECONNECT_BASE_DELAY', 1),
+            reconnect_max_delay=getattr(settings, 'VIDEO_CAP_RECONNECT_MAX_DELAY', 30),
+            circuit_open_cooldown=getattr(settings, 'VIDEO_CAP_CIRCUIT_OPEN_COOLDOWN', 30),
+            circuit_max_cooldown=getattr(settings, 'VIDEO_CAP_CIRCUIT_MAX_COOLDOWN', 300),
+            probe_timeout=getattr(settings, 'VIDEO_CAP_PROBE_TIMEOUT', 3),
+            online_probe_interval=getattr(settings, 'VIDEO_CAP_ONLINE_PROBE_INTERVAL', 30),
+            online_probe_ttl=getattr(settings, 'VIDEO_CAP_ONLINE_PROBE_TTL', 90),
+            online_probe_concurrency=getattr(settings, 'VIDEO_CAP_ONLINE_PROBE_CONCURRENCY', 8),
+            hls_passthrough=getattr(settings, 'VIDEO_CAP_HLS_PASSTHROUGH', 'auto'),
+            passthrough_probe_max_age=getattr(settings, 'VIDEO_CAP_PASSTHROUGH_PROBE_MAX_AGE', 300),
+            retention_interval=getattr(settings, 'VIDEO_CAP_RETENTION_INTERVAL', 10),
+            retention_max_age=getattr(settings, 'VIDEO_CAP_RETENTION_MAX_AGE', None),
+            retention_camera_max_bytes=getattr(settings, 'VIDEO_CAP_RETENTION_CAMERA_MAX_BYTES', 1024 ** 3),
+            retention_total_max_bytes=getattr(settings, 'VIDEO_CAP_RETENTION_TOTAL_MAX_BYTES', 10 * 1024 ** 3),
+            retention_batch_size=getattr(settings, 'VIDEO_CAP_RETENTION_BATCH_SIZE', 200),
+            segment_store=getattr(settings, 'VIDEO_CAP_SEGMENT_STORE', 'disk'),
+            memory_segment_dir=getattr(settings, 'VIDEO_CAP_MEMORY_SEGMENT_DIR', '/dev/shm/djangoflex_video_clip'),
+            memory_segment_max_bytes=getattr(settings, 'VIDEO_CAP_MEMORY_SEGMENT_MAX_BYTES', 512 * 1024 ** 2),
+            hls_segment_type=getattr(settings, 'VIDEO_CAP_HLS_SEGMENT_TYPE', 'mpegts'),
+            low_latency=getattr(settings, 'VIDEO_CAP_LOW_LATENCY', False),
+            ll_hls_part_time=getattr(settings, 'VIDEO_CAP_LL_HLS_PART_TIME', 0.5),
+            ffmpeg_min_speed=getattr(settings, 'VIDEO_CAP_FFMPEG_MIN_SPEED', 1.0),
+            ffmpeg_slow_reports=getattr(settings, 'VIDEO_CAP_FFMPEG_SLOW_REPORTS', 5),
+            config_cache_ttl=getattr(settings, 'VIDEO_CAP_CONFIG_CACHE_TTL', 300),
+            export_max_duration=getattr(settings, 'VIDEO_CAP_EXPORT_MAX_DURATION', 3600),
+            # 片段只在關鍵幀切分，實際時長可能超過 hls_time；此值需不小於最長的片段
+            max_segment_duration=getattr(settings, 'VIDEO_CAP_MAX_SEGMENT_DURATION', 30),
+            export_chunk_size=getattr(settings, 'VIDEO_CAP_EXPORT_CHUNK_SIZE', 64 * 1024),
+            frame_store=getattr(settings, 'VIDEO_CAP_FRAME_STORE', 'redis'),
+            frame_store_url=getattr(settings, 'VIDEO_CAP_FRAME_STORE_URL', 'redis://localhost:6379/1'),
+            frame_store_ttl=getattr(settings, 'VIDEO_CAP_FRAME_STORE_TTL', 30),
+            frame_store_socket_timeout=getattr(settings, 'VIDEO_CAP_FRAME_STORE_SOCKET_TIMEOUT', 1),
+            active_check_interval=getattr(settings, 'VIDEO_CAP_ACTIVE_CHECK_INTERVAL', 2),
+            snapshot_interval=getattr(settings, 'VIDEO_CAP_SNAPSHOT_INTERVAL', 0.5),
+            snapshot_jpeg_quality=getattr(settings, 'VIDEO_CAP_SNAPSHOT_JPEG_QUALITY', 80),
+            snapshot_sizes=getattr(settings, 'VIDEO_CAP_SNAPSHOT_SIZES', {'thumb': 320})
         )
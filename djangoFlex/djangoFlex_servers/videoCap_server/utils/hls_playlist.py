@@ -0,0 +1,89 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+@dataclass
+class HLSPlaylistSegment:
+    sequence: int
+    uri: str
+    duration: float
+    program_date_time: datetime = None
+
+@dataclass
+class HLSPlaylist:
+    media_sequence: int = 0
+    target_duration: float = 0
+    ended: bool = False
+    init_uri: str = None
+    segments: list = field(default_factory=list)
+
+def parse_playlist(content):
+    """
+    解析 HLS media playlist（index.m3u8）。
+
+    Args:
+        content (str): playlist 文字內容。
+
+    Returns:
+        HLSPlaylist: 包含 media sequence、各片段 EXTINF 時長與 PROGRAM-DATE-TIME 的解析結果。
+    """
+    playlist = HLSPlaylist()
+    pending_duration = None
+    pending_date_time = None
+    sequence = None
+
+    for raw_line in content.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist.media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist.target_duration = float(line.split(':', 1)[1])
+        elif line.startswith('#EXTINF:'):
+            pending_duration = float(line.split(':', 1)[1].split(',', 1)[0])
+        elif line.startswith('#EXT-X-PROGRAM-DATE-TIME:'):
+            pending_date_time = _parse_date_time(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MAP:'):
+            playlist.init_uri = _parse_attribute(line, 'URI')
+        elif line.startswith('#EXT-X-ENDLIST'):
+            playlist.ended = True
+        elif not line.startswith('#'):
+            if sequence is None:
+                sequence = playlist.media_sequence
+            duration = pending_duration if pending_duration is not None else playlist.target_duration
+            if pending_date_time is None and playlist.segments and playlist.segments[-1].program_date_time:
+                # 未標示 PROGRAM-DATE-TIME 的片段，由前一片段的時間加上時長推得
+                previous = playlist.segments[-1]
+                pending_date_time = previous.program_date_time + timedelta(seconds=previous.duration)
+            playlist.segments.append(HLSPlaylistSegment(
+                sequence=sequence,
+                uri=line,
+                duration=duration,
+                program_date_time=pending_date_time
+            ))
+            sequence += 1
+            pending_duration = None
+            pending_date_time = None
+
+    return playlist
+
+def _parse_attribute(line, name):
+    for attribute in line.split(':', 1)[1].split(','):
+        key, _, value = attribute.partition('=')
+        if key.strip() == name:
+            return value.strip().strip('"')
+    return None
+
+def _parse_date_time(value):
+    # ffmpeg 輸出格式如 2024-01-01T12:00:00.000+0800
+    try:
+        return datetime.strptime(value.strip(), '%Y-%m-%dT%H:%M:%S.%f%z')
+    except ValueError:
+        try:
+            return datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+
+def read_playlist(path):
+    with open(path, 'r') as playlist_file:
+        return parse_playlist(playlist_file.read())
@@ -0,0 +1,65 @@
+import threading
+import time
+import numpy as np
+
+class IngestFrameReader:
+    """
+    從 ingest ffmpeg 進程的 stdout 讀取已解碼的 bgr24 幀。
+
+    ffmpeg 在寫入 HLS 片段的同時，會輸出一路降頻、縮小的 rawvideo，
+    這裡只保留最新一幀，並以最後收到幀的時間作為串流存活訊號。
+    """
+
+    def __init__(self, stdout, resolution, metrics=None, on_frame=None):
+        self.stdout = stdout
+        self.metrics = metrics
+        self.on_frame = on_frame
+        self.width, self.height = resolution
+        self.frame_size = self.width * self.height * 3
+        self.lock = threading.Lock()
+        self.latest_frame = None
+        self.last_frame_time = None
+        self.frame_count = 0
+        self.first_frame_event = threading.Event()
+        self.thread = threading.Thread(target=self._read_loop, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def wait_for_first_frame(self, timeout):
+        return self.first_frame_event.wait(timeout)
+
+    def get_latest_frame(self):
+        with self.lock:
+            return self.latest_frame, self.last_frame_time
+
+    def seconds_since_last_frame(self):
+        with self.lock:
+            if self.last_frame_time is None:
+                return None
+            return time.time() - self.last_frame_time
+
+    def _read_loop(self):
+        try:
+            while True:
+                data = self.stdout.read(self.frame_size)
+                if not data:
+                    break
+                if len(data) < self.frame_size:
+                    # 進程中途結束，只讀到不完整的幀
+                    if self.metrics is not None:
+                        self.metrics.record_read_failure()
+                    break
+                frame = np.frombuffer(data, dtype=np.uint8).reshape((self.height, self.width, 3))
+                with self.lock:
+                    self.latest_frame = frame
+                    self.last_frame_time = time.time()
+                    self.frame_count += 1
+                if self.metrics is not None:
+                    self.metrics.record_frame()
+                if self.on_frame is not None:
+                    self.on_frame(frame)
+                self.first_frame_event.set()
+        except (ValueError, OSError):
+            # stdout 在進程終止時被關閉
+            pass
@@ -0,0 +1,100 @@
+import time
+import threading
+from collections import Counter
+from ...visionAI_server.utils.decorators import compute_backoff
+
+class CircuitState:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+class ReconnectPolicy:
+    """
+    單一攝影機的重連策略。
+
+    CLOSED：每次重連失敗後以指數退避加抖動等待。
+    OPEN：連續失敗達 failure_threshold 次後斷路，停止完整重連，
+          只在冷卻時間到期後做一次低成本探測；冷卻時間同樣指數成長。
+    HALF_OPEN：探測成功後允許一次完整重連，成功回到 CLOSED，失敗再次 OPEN。
+
+    on_state_change 在釋放鎖之後才呼叫：回呼可能需要數秒（例如等待 ffmpeg 結束），
+    不能讓 snapshot() 與指標抓取等待。
+    """
+
+    def __init__(self, base_delay=1, max_delay=30, failure_threshold=5,
+                 open_cooldown=30, max_open_cooldown=300, jitter=0.5, on_state_change=None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.open_cooldown = open_cooldown
+        self.max_open_cooldown = max_open_cooldown
+        self.jitter = jitter
+        self.on_state_change = on_state_change
+        self.lock = threading.Lock()
+        self.state = CircuitState.CLOSED
+        self.failures = 0
+        self.open_cycles = 0
+        self.next_attempt_at = 0
+        self.transition_counts = Counter()
+
+    def ready(self):
+        return time.time() >= self.next_attempt_at
+
+    def seconds_until_ready(self):
+        return max(0, self.next_attempt_at - time.time())
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.open_cycles = 0
+            self.next_attempt_at = 0
+            transition = self._transition(CircuitState.CLOSED)
+        self._notify(transition)
+
+    def record_failure(self):
+        transition = None
+        with self.lock:
+            self.failures += 1
+            if self.state == CircuitState.HALF_OPEN or self.failures >= self.failure_threshold:
+                transition = self._open()
+            else:
+                delay = compute_backoff(self.failures - 1, self.base_delay, self.max_delay, self.jitter)
+                self.next_attempt_at = time.time() + delay
+        self._notify(transition)
+
+    def record_probe(self, reachable):
+        with self.lock:
+            if reachable:
+                self.next_attempt_at = 0
+                transition = self._transition(CircuitState.HALF_OPEN)
+            else:
+                transition = self._open()
+        self._notify(transition)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'next_attempt_in': round(self.seconds_until_ready(), 3),
+                'transitions': {f"{old}->{new}": count for (old, new), count in self.transition_counts.items()}
+            }
+
+    def _open(self):
+        cooldown = compute_backoff(self.open_cycles, self.open_cooldown, self.max_open_cooldown, self.jitter)
+        self.open_cycles += 1
+        self.next_attempt_at = time.time() + cooldown
+        return self._transition(CircuitState.OPEN)
+
+    def _transition(self, new_state):
+        # 需在持有鎖時呼叫；回傳 (舊狀態, 新狀態)，狀態未變時回傳 None
+        old_state = self.state
+        if old_state == new_state:
+            return None
+        self.state = new_state
+        self.transition_counts[(old_state, new_state)] += 1
+        return old_state, new_state
+
+    def _notify(self, transition):
+        if transition is not None and self.on_state_change is not None:
+            self.on_state_change(*transition)
@@ -1,39 +1,93 @@
 import subprocess
 import os
+import json
+from dataclasses import dataclass
+
+@dataclass
+class StreamProbeResult:
+    codec_name: str
+    width: int
+    height: int
+    fps: float
+    bit_rate: int
+
+def _parse_frame_rate(rate):
+    try:
+        numerator, _, denominator = rate.partition('/')
+        denominator = float(denominator or 1)
+        return float(numerator) / denominator if denominator else None
+    except (AttributeError, ValueError):
+        return None
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
 class VideoCapUtils:
     @staticmethod
-    def check_camera_online(rtmp_url, timeout=4):
-        try:
-            # 檢查是否在 Docker 環境中
-            is_docker = os.getenv('IS_DOCKER', 'False') == 'True'
-            network_name = os.getenv('NETWORK_NAME', 'djangoflex-network')
-
-            # 如果在 Docker 中，將 localhost 替換為 srs 容器名稱
-            input_url = rtmp_url
-            if is_docker and 'localhost' in rtmp_url:
-                input_url = rtmp_url.replace('localhost', 'srs')
-                print(f"[DEBUG] Docker 環境中 ({network_name}): 將 {rtmp_url} 替換為 {input_url}")
-
-            print(f"[DEBUG] 正在檢查攝像頭狀態：{input_url}")
-            command = [
-                "ffmpeg", "-i", input_url,
-                "-t", "2",  # 最多讀取 2 秒
-                "-f", "null", "-"  # 不輸出結果
-            ]
-            print(f"[DEBUG] 執行命令: {' '.join(command)}")
+    def resolve_input_url(rtmp_url):
+        # 如果在 Docker 中，將 localhost 替換為 srs 容器名稱
+        if os.getenv('IS_DOCKER', 'False') == 'True' and 'localhost' in rtmp_url:
+            return rtmp_url.replace('localhost', 'srs')
+        return rtmp_url
 
+    @staticmethod
+    def probe_stream(rtmp_url, timeout=2):
+        """
+        只讀取串流標頭（codec、解析度、fps、bitrate），不解碼畫面。
+
+        Returns:
+            StreamProbeResult: 探測結果；串流無法開啟或逾時則回傳 None。
+        """
+        command = [
+            'ffprobe',
+            '-v', 'error',
+            '-rw_timeout', str(int(timeout * 1000000)),
+            '-analyzeduration', '500000',
+            '-probesize', '500000',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=codec_name,width,height,avg_frame_rate,r_frame_rate,bit_rate:format=bit_rate',
+            '-of', 'json',
+            VideoCapUtils.resolve_input_url(rtmp_url)
+        ]
+        try:
             result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout)
-            is_online = result.returncode == 0
-            print(f"[DEBUG] 攝像頭狀態檢查結果：{'在線' if is_online else '離線'}")
-            if not is_online:
-                print(f"[DEBUG] FFmpeg 錯誤輸出：{result.stderr.decode()}")
-                print(f"[DEBUG] FFmpeg 返回碼：{result.returncode}")
-            return is_online
-        except subprocess.TimeoutExpired:
-            print(f"[DEBUG] 檢查超時：{input_url}")
-            return False
-        except Exception as e:
-            print(f"[DEBUG] FFmpeg 檢測錯誤：{str(e)}")
-            print(f"[DEBUG] 異常類型：{type(e)}")
-            return False
+        except (subprocess.TimeoutExpired, OSError):
+            return None
+        if result.returncode != 0:
+            return None
+
+        try:
+            info = json.loads(result.stdout.decode() or '{}')
+        except ValueError:
+            return None
+        streams = info.get('streams') or []
+        if not streams:
+            return None
+
+        stream = streams[0]
+        return StreamProbeResult(
+            codec_name=stream.get('codec_name'),
+            width=_parse_int(stream.get('width')),
+            height=_parse_int(stream.get('height')),
+            fps=_parse_frame_rate(stream.get('avg_frame_rate')) or _parse_frame_rate(stream.get('r_frame_rate')),
+            bit_rate=_parse_int(stream.get('bit_rate')) or _parse_int(info.get('format', {}).get('bit_rate'))
+        )
+
+    @staticmethod
+    def check_camera_online(rtmp_url, timeout=4):
+        return VideoCapUtils.probe_stream(rtmp_url, timeout) is not None
+
+    @staticmethod
+    def probe_stream_available(rtmp_url, timeout=3):
+        """
+        斷路期間的探測：以 ffprobe 讀取該路串流的標頭，確認串流確實在推送。
+
+        SRS 即使攝影機的串流已不存在仍會接受 TCP 連線，只探測主機可達會讓斷路器每次冷卻後
+        都進入 HALF_OPEN 並重新啟動 ffmpeg，因此必須探測串流本身。
+        """
+        if rtmp_url == '0':
+            return os.path.exists('/dev/video0')
+        return VideoCapUtils.probe_stream(rtmp_url, timeout) is not None
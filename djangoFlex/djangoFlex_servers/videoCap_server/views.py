@@ -1,4 +1,7 @@
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,6 +10,13 @@ from drf_yasg import openapi
 from django.utils.decorators import method_decorator
 from .services.video_cap_manager import VideoCapManager
 from .services.cameraList_service import CameraListService
+from .services.capture_supervisor_client import CaptureSupervisorClient
+from .services.clip_export_service import ClipExportService
+from .services.snapshot_service import SnapshotService
+from .repositories.video_cap_repository import VideoCapRepository
+from .utils.config_loader import ConfigLoader
+from .utils.capture_metrics import render_prometheus
+from .exceptions.video_cap_exceptions import VideoCapException, ExportRangeError, ExportNotFoundError, SupervisorUnavailableError
 from .models import VideoCapConfig, CameraList
 import time
 from django.http import HttpRequest
@@ -17,9 +27,20 @@ class VideoCapServerView(APIView):
     @classmethod
     def get_video_cap_service(cls):
         if cls.video_cap_service is None:
-            cls.video_cap_service = VideoCapManager()
+            config = ConfigLoader.load_config()
+            if config.supervisor_address:
+                # 擷取由獨立的 capture supervisor 進程執行，web 端只透過控制通道下指令
+                cls.video_cap_service = CaptureSupervisorClient(config.supervisor_address, config.supervisor_authkey)
+            else:
+                cls.video_cap_service = VideoCapManager()
         return cls.video_cap_service
 
+    @staticmethod
+    def service_unavailable(error):
+        # admin 的操作讀取 message 欄位，因此兩個欄位都提供
+        message = f"擷取服務無法使用: {str(error)}"
+        return Response({"error": message, "message": message, "is_running": False}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
     @method_decorator(name='post', decorator=swagger_auto_schema(
         operation_description="Control the video capture service",
         request_body=openapi.Schema(
@@ -39,11 +60,13 @@ class VideoCapServerView(APIView):
                     properties={
                         'message': openapi.Schema(type=openapi.TYPE_STRING, description="Service control message"),
                         'is_running': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Service status"),
+                        'results': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT), description="Per-camera results (start_all only)"),
                     }
                 )
             ),
             400: "Bad Request",
-            500: "Internal Server Error"
+            500: "Internal Server Error",
+            503: "Capture supervisor unavailable"
         }
     ))
     def post(self, request, action=None, rtmp_url=None):
@@ -57,7 +80,10 @@ class VideoCapServerView(APIView):
         action = data.get('action')
         rtmp_url = data.get('rtmp_url')
         camera_name = data.get('camera_name')
-        video_cap_service = self.get_video_cap_service()
+        try:
+            video_cap_service = self.get_video_cap_service()
+        except VideoCapException as e:
+            return self.service_unavailable(e)
 
         if action not in ['start', 'stop', 'status', 'start_all', 'stop_all', 'add_camera', 'delete_camera']:
             return Response({"error": "無效的操作"}, status=status.HTTP_400_BAD_REQUEST)
@@ -67,24 +93,35 @@ class VideoCapServerView(APIView):
 
         if action == 'start':
             success, message = video_cap_service.start_video_cap_service(rtmp_url)
-            VideoCapConfig.objects.filter(rtmp_url=rtmp_url).update(is_active=True)
+            VideoCapRepository.update_config_active(rtmp_url, True)
             is_running = success
 
         elif action == 'stop':
             success, message = video_cap_service.stop_video_cap_service(rtmp_url)
-            VideoCapConfig.objects.filter(rtmp_url=rtmp_url).update(is_active=False)
+            VideoCapRepository.update_config_active(rtmp_url, False)
             is_running = video_cap_service.get_service_running_status(rtmp_url)
 
         elif action == 'status':
             is_running = video_cap_service.get_service_running_status(rtmp_url)
             message = f"Video capture server for {rtmp_url} is {'running' if is_running else 'not running'}"
         elif action == 'start_all':
-            started_count, total_count = video_cap_service.start_all_video_cap_service()
+            try:
+                started_count, total_count, results = video_cap_service.start_all_video_cap_service()
+            except SupervisorUnavailableError as e:
+                return self.service_unavailable(e)
+            except VideoCapException as e:
+                return Response({"error": str(e), "message": str(e), "is_running": False}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             message = f"Started {started_count} out of {total_count} video capture servers"
             is_running = started_count > 0
             success = True
+            return Response({"message": message, "is_running": is_running, "results": results}, status=status.HTTP_200_OK)
         elif action == 'stop_all':
-            stopped_count = video_cap_service.stop_all_video_cap_service()
+            try:
+                stopped_count = video_cap_service.stop_all_video_cap_service()
+            except SupervisorUnavailableError as e:
+                return self.service_unavailable(e)
+            except VideoCapException as e:
+                return Response({"error": str(e), "message": str(e), "is_running": False}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             message = f"Stopped {stopped_count} video capture servers"
             is_running = False
             success = True
@@ -101,3 +138,96 @@ class VideoCapServerView(APIView):
 
         return Response({"message": message, "is_running": is_running},
                         status=status.HTTP_200_OK if success else status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+class CaptureMetricsView(View):
+    """
+    以 Prometheus text 格式輸出每支攝影機的擷取指標。
+    supervisor 模式下指標由各 worker 進程經控制通道彙整。
+    """
+
+    def get(self, request):
+        try:
+            running_threads = VideoCapServerView.get_video_cap_service().list_running_threads()
+        except VideoCapException as e:
+            return JsonResponse({"error": f"擷取服務無法使用: {str(e)}"}, status=503)
+        return HttpResponse(render_prometheus(running_threads), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+class VideoClipExportView(APIView):
+    @method_decorator(name='get', decorator=swagger_auto_schema(
+        operation_description="Export recorded footage in a time range as MP4 without re-encoding",
+        manual_parameters=[
+            openapi.Parameter('rtmp_url', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description="RTMP URL of the camera"),
+            openapi.Parameter('start', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description="Range start (ISO 8601)"),
+            openapi.Parameter('end', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True, description="Range end (ISO 8601)"),
+        ],
+        responses={
+            200: "MP4 stream",
+            400: "Bad Request",
+            404: "No footage in range",
+            500: "Export process failed"
+        }
+    ))
+    def get(self, request):
+        rtmp_url = request.query_params.get('rtmp_url')
+        start_time = self._parse_time(request.query_params.get('start'))
+        end_time = self._parse_time(request.query_params.get('end'))
+        if not rtmp_url or start_time is None or end_time is None:
+            return Response({"error": "需要 rtmp_url 以及 ISO 8601 格式的 start、end"}, status=status.HTTP_400_BAD_REQUEST)
+        if end_time <= start_time:
+            return Response({"error": "結束時間必須晚於開始時間"}, status=status.HTTP_400_BAD_REQUEST)
+
+        export_service = ClipExportService()
+        try:
+            clips = export_service.get_export_clips(rtmp_url, start_time, end_time)
+            chunks = export_service.stream_export(clips, start_time, end_time)
+        except ExportRangeError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ExportNotFoundError as e:
+            return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except VideoCapException as e:
+            return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response = StreamingHttpResponse(chunks, content_type='video/mp4')
+        filename = f"export_{start_time:%Y%m%d%H%M%S}_{end_time:%Y%m%d%H%M%S}.mp4"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @staticmethod
+    def _parse_time(value):
+        try:
+            parsed = parse_datetime(value) if value else None
+        except ValueError:
+            return None
+        if parsed is not None and timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+class CameraSnapshotView(View):
+    """
+    回傳攝影機最新的 JPEG 快照（?size=full|thumb），支援 ETag / If-None-Match。
+    """
+
+    def get(self, request, camera_name):
+        snapshot_service = SnapshotService.get_instance()
+        size = request.GET.get('size', 'full')
+        if size != 'full' and size not in snapshot_service.config.snapshot_sizes:
+            return JsonResponse({"error": f"不支援的尺寸: {size}"}, status=400)
+
+        rtmp_url = snapshot_service.resolve_camera(camera_name)
+        if rtmp_url is None:
+            return JsonResponse({"error": f"找不到攝影機: {camera_name}"}, status=404)
+
+        # 版本未變時只需讀取版本號，不讀取幀資料
+        version = snapshot_service.get_version(rtmp_url)
+        if version and request.headers.get('If-None-Match') == SnapshotService.etag(version, size):
+            response = HttpResponse(status=304)
+        else:
+            data, version, timestamp = snapshot_service.get_snapshot(rtmp_url, size)
+            if data is None:
+                return JsonResponse({"error": "目前沒有可用的畫面"}, status=404)
+            response = HttpResponse(data, content_type='image/jpeg')
+            response['X-Frame-Timestamp'] = f"{timestamp:.3f}"
+
+        response['ETag'] = SnapshotService.etag(version, size)
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,94 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from ultralytics import YOLO
+from djangoFlex_servers.visionAI_server.services.model_registry import MODEL_LOADERS
+from djangoFlex_servers.visionAI_server.utils.detection_utils import EXPORT_PATHS, export_detection_model
+from djangoFlex_servers.visionAI_server.utils.file_utils import download_model_if_not_exists
+from djangoFlex_servers.visionAI_server.utils.quantization_utils import get_quantized_model_path
+from djangoFlex_servers.visionAI_server.utils.video_utils import read_clip_frames
+
+class Command(BaseCommand):
+    help = 'Compare per-frame detection latency and throughput between inference backends on the same clip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('clip', help='Path to a local video clip')
+        parser.add_argument('--model-name', default='360_1280_person_yolov8m')
+        parser.add_argument('--model-version', default='1')
+        parser.add_argument('--backends', nargs='+', default=list(MODEL_LOADERS), choices=list(MODEL_LOADERS))
+        parser.add_argument('--frames', type=int, default=200, help='Maximum number of frames to run per backend')
+        parser.add_argument('--warmup', type=int, default=5, help='Untimed frames run before measuring')
+        parser.add_argument('--batch-size', type=int, default=1, help='Also measure batched throughput when greater than 1')
+        parser.add_argument('--imgsz', type=int, default=1280)
+
+    def handle(self, *args, **options):
+        try:
+            frames = read_clip_frames(options['clip'], options['frames'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        model_path = download_model_if_not_exists(options['model_name'], options['model_version'])
+        predict_kwargs = {'classes': [0], 'verbose': False, 'imgsz': options['imgsz']}
+        self.stdout.write(f'Benchmarking {len(frames)} frames from {options["clip"]}')
+
+        rows = []
+        for label, resolve_path in self.benchmark_targets(options['backends'], model_path):
+            # 每個後端用相同的幀，載入（含首次匯出）時間不計入推論延遲
+            load_started = time.perf_counter()
+            loaded_path = resolve_path()
+            model = YOLO(loaded_path, task='detect')
+            load_seconds = time.perf_counter() - load_started
+            self.stdout.write(f'{label}: {loaded_path}')
+
+            for frame in frames[:options['warmup']]:
+                model.predict(frame, **predict_kwargs)
+
+            latencies = []
+            for frame in frames:
+                started = time.perf_counter()
+                model.predict(frame, **predict_kwargs)
+                latencies.append(time.perf_counter() - started)
+            latencies = np.array(latencies) * 1000
+
+            batched_fps = None
+            if options['batch_size'] > 1:
+                started = time.perf_counter()
+                for index in range(0, len(frames), options['batch_size']):
+                    model.predict(frames[index:index + options['batch_size']], **predict_kwargs)
+                batched_fps = len(frames) / (time.perf_counter() - started)
+
+            rows.append((label, load_seconds, latencies, batched_fps))
+
+        self.stdout.write(f'{"backend":<11} {"load s":>8} {"mean ms":>9} {"p50 ms":>9} {"p95 ms":>9} {"fps":>8} {"batch fps":>10}')
+        for backend, load_seconds, latencies, batched_fps in rows:
+            batched = f'{batched_fps:.2f}' if batched_fps is not None else '-'
+            self.stdout.write(
+                f'{backend:<11} {load_seconds:>8.2f} {latencies.mean():>9.2f} {np.percentile(latencies, 50):>9.2f} '
+                f'{np.percentile(latencies, 95):>9.2f} {1000 / latencies.mean():>8.2f} {batched:>10}'
+            )
+
+    @staticmethod
+    def benchmark_targets(backends, model_path):
+        """
+        列出要量測的模型與其路徑。
+
+        不經過 MODEL_LOADERS：onnx 的載入函式可能自動改用 INT8 模型，
+        這裡固定量測 FP32 的 .onnx，已有量化模型時另外以 onnx-int8 列出。
+
+        Args:
+            backends (list): 要量測的後端，需為 MODEL_LOADERS 中的鍵。
+            model_path (str): best.pt 的路徑。
+
+        Returns:
+            list: (標籤, 回傳模型路徑的函式) 的列表；匯出在函式中進行，計入載入時間。
+        """
+        targets = []
+        for backend in backends:
+            if backend == 'pytorch':
+                targets.append(('pytorch', lambda: model_path))
+                continue
+            targets.append((backend, lambda backend=backend: export_detection_model(model_path, backend)))
+            if backend == 'onnx':
+                quantized_path = get_quantized_model_path(EXPORT_PATHS['onnx'](model_path))
+                if quantized_path.exists():
+                    targets.append(('onnx-int8', lambda: str(quantized_path)))
+        return targets
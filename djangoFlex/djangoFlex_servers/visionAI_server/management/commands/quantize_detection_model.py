@@ -0,0 +1,142 @@
+import math
+import time
+from pathlib import Path
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from ultralytics import YOLO
+from djangoFlex_servers.visionAI_server.utils.detection_metrics import mean_average_precision
+from djangoFlex_servers.visionAI_server.utils.detection_utils import export_detection_model
+from djangoFlex_servers.visionAI_server.utils.file_utils import download_model_if_not_exists
+from djangoFlex_servers.visionAI_server.utils.quantization_utils import quantize_onnx_model, write_quantization_report
+from djangoFlex_servers.visionAI_server.utils.video_utils import read_clip_frames
+
+VIDEO_SUFFIXES = ('.mp4', '.ts', '.mkv', '.avi', '.mov')
+
+def collect_clips(paths):
+    clips = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            clips.extend(sorted(p for p in path.iterdir() if p.suffix.lower() in VIDEO_SUFFIXES))
+        else:
+            clips.append(path)
+    return clips
+
+def run_model(model, frames, predict_kwargs, warmup):
+    """
+    逐幀推論，回傳每幀的 (boxes, scores) 與每幀延遲（毫秒）。
+    """
+    for frame in frames[:warmup]:
+        model.predict(frame, **predict_kwargs)
+
+    outputs = []
+    latencies = []
+    for frame in frames:
+        started = time.perf_counter()
+        result = model.predict(frame, **predict_kwargs)[0]
+        latencies.append((time.perf_counter() - started) * 1000)
+        outputs.append((result.boxes.xyxy.cpu().numpy(), result.boxes.conf.cpu().numpy()))
+    return outputs, np.array(latencies)
+
+class Command(BaseCommand):
+    help = 'Build a static INT8 ONNX variant of a detection model and gate it on mAP drift against FP32'
+
+    def add_arguments(self, parser):
+        parser.add_argument('clips', nargs='+', help='Validation clips or directories of clips')
+        parser.add_argument('--model-name', default='360_1280_person_yolov8m')
+        parser.add_argument('--model-version', default='1')
+        parser.add_argument('--imgsz', type=int, default=1280)
+        parser.add_argument('--frames-per-clip', type=int, default=40, help='Frames sampled from each clip')
+        parser.add_argument('--frame-stride', type=int, default=15, help='Sample one frame every N decoded frames')
+        parser.add_argument('--gt-conf', type=float, default=0.25, help='Confidence for FP32 detections used as ground truth')
+        parser.add_argument('--max-drift', type=float, default=None,
+                            help='Maximum mAP@0.5 drift to accept the INT8 variant (default: VISIONAI_INT8_MAX_MAP_DRIFT)')
+        parser.add_argument('--warmup', type=int, default=3)
+
+    def handle(self, *args, **options):
+        max_drift = options['max_drift']
+        if max_drift is None:
+            max_drift = getattr(settings, 'VISIONAI_INT8_MAX_MAP_DRIFT', 0.02)
+
+        clips = collect_clips(options['clips'])
+        if not clips:
+            raise CommandError('No validation clips found')
+        frames = []
+        try:
+            for clip in clips:
+                frames.extend(read_clip_frames(clip, options['frames_per_clip'], options['frame_stride']))
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        # 交錯切分：偶數幀用於校正，奇數幀用於評估，避免以校正資料評估精度
+        calibration_frames = frames[0::2]
+        evaluation_frames = frames[1::2]
+        if not evaluation_frames:
+            raise CommandError('At least two frames are required for calibration and evaluation')
+        self.stdout.write(f'{len(clips)} clips, {len(calibration_frames)} calibration / {len(evaluation_frames)} evaluation frames')
+
+        model_path = download_model_if_not_exists(options['model_name'], options['model_version'])
+        onnx_path = export_detection_model(model_path, 'onnx', imgsz=options['imgsz'])
+        quantized_path = quantize_onnx_model(onnx_path, calibration_frames, imgsz=options['imgsz'])
+
+        predict_kwargs = {'classes': [0], 'verbose': False, 'imgsz': options['imgsz']}
+        fp32_outputs, fp32_latencies = run_model(
+            YOLO(onnx_path, task='detect'), evaluation_frames, {**predict_kwargs, 'conf': 0.001}, options['warmup']
+        )
+        int8_outputs, int8_latencies = run_model(
+            YOLO(quantized_path, task='detect'), evaluation_frames, {**predict_kwargs, 'conf': 0.001}, options['warmup']
+        )
+
+        # 沒有人工標註，以 FP32 在一般信心門檻下的偵測結果作為偽真值
+        ground_truths = [boxes[scores >= options['gt_conf']] for boxes, scores in fp32_outputs]
+        ground_truth_boxes = int(sum(len(gt) for gt in ground_truths))
+        if ground_truth_boxes == 0:
+            # 沒有真值框時 mAP 無定義（NaN），無法判斷精度落差，不寫出報告
+            raise CommandError(
+                f'FP32 produced no detections above --gt-conf {options["gt_conf"]} on the evaluation frames; '
+                'use validation clips that contain people'
+            )
+        fp32_map = mean_average_precision(fp32_outputs, ground_truths)
+        int8_map = mean_average_precision(int8_outputs, ground_truths)
+        map50_drift = fp32_map['map50'] - int8_map['map50']
+        map50_95_drift = fp32_map['map50_95'] - int8_map['map50_95']
+
+        report = {
+            'model_name': options['model_name'],
+            'model_version': options['model_version'],
+            'fp32_model': str(onnx_path),
+            'int8_model': str(quantized_path),
+            'imgsz': options['imgsz'],
+            'clips': [str(clip) for clip in clips],
+            'calibration_frames': len(calibration_frames),
+            'evaluation_frames': len(evaluation_frames),
+            'ground_truth_boxes': ground_truth_boxes,
+            'fp32_map50': fp32_map['map50'],
+            'fp32_map50_95': fp32_map['map50_95'],
+            'int8_map50': int8_map['map50'],
+            'int8_map50_95': int8_map['map50_95'],
+            'map50_drift': map50_drift,
+            'map50_95_drift': map50_95_drift,
+            'fp32_latency_ms': float(fp32_latencies.mean()),
+            'int8_latency_ms': float(int8_latencies.mean()),
+            'fp32_latency_p95_ms': float(np.percentile(fp32_latencies, 95)),
+            'int8_latency_p95_ms': float(np.percentile(int8_latencies, 95)),
+            'speedup': float(fp32_latencies.mean() / int8_latencies.mean()),
+            'max_drift': max_drift,
+            'accepted': bool(math.isfinite(map50_drift) and map50_drift <= max_drift),
+            'created_at': time.time(),
+        }
+        report_path = write_quantization_report(onnx_path, report)
+
+        self.stdout.write(f'{"":<6} {"mAP50":>8} {"mAP50-95":>9} {"mean ms":>9} {"p95 ms":>9}')
+        for name in ('fp32', 'int8'):
+            self.stdout.write(
+                f'{name:<6} {report[f"{name}_map50"]:>8.4f} {report[f"{name}_map50_95"]:>9.4f} '
+                f'{report[f"{name}_latency_ms"]:>9.2f} {report[f"{name}_latency_p95_ms"]:>9.2f}'
+            )
+        self.stdout.write(f'mAP@0.5 drift {map50_drift:.4f} (mAP@0.5:0.95 drift {map50_95_drift:.4f}), speedup {report["speedup"]:.2f}x')
+        self.stdout.write(f'Report written to {report_path}')
+        if report['accepted']:
+            self.stdout.write(self.style.SUCCESS(f'INT8 variant accepted (drift <= {max_drift}); the onnx backend will load {quantized_path}'))
+        else:
+            self.stdout.write(self.style.WARNING(f'INT8 variant rejected (drift > {max_drift}); the onnx backend keeps FP32'))
@@ -0,0 +1,204 @@
+import time
+import queue
+import bisect
+import threading
+from concurrent.futures import Future, InvalidStateError
+from django.conf import settings
+
+class Histogram:
+    """
+    Prometheus 風格的累積直方圖。
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        with self.lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.count += 1
+
+    def snapshot(self):
+        with self.lock:
+            cumulative = []
+            running = 0
+            for bound, count in zip(self.buckets + [float('inf')], self.counts):
+                running += count
+                cumulative.append((bound, running))
+            return {'buckets': cumulative, 'sum': self.total, 'count': self.count}
+
+class InferenceRequest:
+    def __init__(self, model_handle, frame):
+        self.model_handle = model_handle
+        self.frame = frame
+        self.future = Future()
+        self.submitted_at = time.time()
+
+class BatchInferenceService:
+    """
+    跨攝影機的微批次推論。
+
+    各攝影機的繪圖線程提交關鍵幀後等待結果；背景線程收集請求，
+    湊滿 max_batch_size 或第一個請求等待超過 max_wait_ms 後，以一次批次 predict 處理，
+    再把結果依序交回各請求。追蹤由各攝影機的 DetectionService 在取得結果後自行處理。
+
+    predict 參數由 DetectionService 在建立時傳入，與未批次的路徑共用同一份設定。
+    背景線程的每一輪都受保護，任何例外只會讓該批請求失敗，不會讓線程結束；
+    若線程仍意外停止，下一次 submit 會重新啟動它。
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+    @classmethod
+    def get_instance(cls, model_key, predict_kwargs):
+        with cls._instances_lock:
+            if model_key not in cls._instances:
+                cls._instances[model_key] = cls(
+                    model_key,
+                    predict_kwargs,
+                    max_batch_size=getattr(settings, 'VISIONAI_BATCH_MAX_SIZE', 8),
+                    max_wait_ms=getattr(settings, 'VISIONAI_BATCH_MAX_WAIT_MS', 20)
+                )
+            instance = cls._instances[model_key]
+        if instance.predict_kwargs != predict_kwargs:
+            raise ValueError(f"模型 {model_key} 的批次推論已使用不同的 predict 參數: {instance.predict_kwargs}")
+        return instance
+
+    @classmethod
+    def all_instances(cls):
+        with cls._instances_lock:
+            return list(cls._instances.values())
+
+    def __init__(self, model_key, predict_kwargs, max_batch_size=8, max_wait_ms=20):
+        self.model_key = model_key
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.predict_kwargs = dict(predict_kwargs)
+        self.requests = queue.Queue()
+        self.latency_histogram = Histogram(self.LATENCY_BUCKETS)
+        self.batch_size_histogram = Histogram(range(1, max_batch_size + 1))
+        self.thread_lock = threading.Lock()
+        self.thread = None
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        with self.thread_lock:
+            if self.thread is None or not self.thread.is_alive():
+                if self.thread is not None:
+                    print(f"批次推論線程已停止，重新啟動: {self.model_key}")
+                self.thread = threading.Thread(target=self._run, name='batch-inference', daemon=True)
+                self.thread.start()
+
+    def submit(self, model_handle, frame):
+        """
+        提交一個幀等待批次推論。
+
+        Args:
+            model_handle (ModelHandle): 提交者持有的共用模型 handle。
+            frame (numpy.ndarray): BGR 幀。
+
+        Returns:
+            Future: 結果為該幀的 ultralytics Results。
+        """
+        request = InferenceRequest(model_handle, frame)
+        self.requests.put(request)
+        self._ensure_thread()
+        return request.future
+
+    def _collect_batch(self):
+        first = self.requests.get()
+        batch = [first]
+        deadline = first.submitted_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                # 呼叫端逾時後會取消 future，這些請求不再推論
+                batch = [request for request in self._collect_batch() if not request.future.cancelled()]
+                if batch:
+                    self._process_batch(batch)
+            except Exception as e:
+                print(f"批次推論時發生錯誤: {str(e)}")
+                for request in batch:
+                    self._settle(request.future, exception=e)
+
+    def _process_batch(self, batch):
+        # 同一批的請求共用同一個模型，由第一個請求的 handle 執行
+        results = batch[0].model_handle.predict([request.frame for request in batch], **self.predict_kwargs)
+        if len(results) != len(batch):
+            raise RuntimeError(f"批次推論回傳 {len(results)} 筆結果，預期 {len(batch)} 筆")
+        for request, result in zip(batch, results):
+            self._settle(request.future, result=result)
+
+        finished_at = time.time()
+        self.batch_size_histogram.observe(len(batch))
+        for request in batch:
+            self.latency_histogram.observe(finished_at - request.submitted_at)
+
+    @staticmethod
+    def _settle(future, result=None, exception=None):
+        # 已完成（或呼叫端已逾時取消）的 future 不能再設定結果
+        if future.done():
+            return
+        try:
+            if exception is not None:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def stats(self):
+        return {
+            'model': self.model_key,
+            'queue_size': self.requests.qsize(),
+            'latency_seconds': self.latency_histogram.snapshot(),
+            'batch_size': self.batch_size_histogram.snapshot(),
+        }
+
+def _render_histogram(lines, name, labels, histogram):
+    for bound, count in histogram['buckets']:
+        le = '+Inf' if bound == float('inf') else f"{bound:g}"
+        lines.append(f'{name}_bucket{{{labels},le="{le}"}} {count}')
+    lines.append(f'{name}_sum{{{labels}}} {histogram["sum"]}')
+    lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+
+def render_inference_metrics():
+    """
+    將所有批次推論服務的直方圖轉為 Prometheus text exposition 格式。
+
+    Returns:
+        str: Prometheus 格式的指標文字
+    """
+    lines = [
+        "# HELP visionai_inference_latency_seconds Time from keyframe submission to batched inference result",
+        "# TYPE visionai_inference_latency_seconds histogram",
+    ]
+    all_stats = [service.stats() for service in BatchInferenceService.all_instances()]
+    for stats in all_stats:
+        labels = f'model="{stats["model"][0]}",version="{stats["model"][1]}",backend="{stats["model"][2]}"'
+        _render_histogram(lines, 'visionai_inference_latency_seconds', labels, stats['latency_seconds'])
+
+    lines.append("# HELP visionai_inference_batch_size Number of keyframes per batched forward pass")
+    lines.append("# TYPE visionai_inference_batch_size histogram")
+    for stats in all_stats:
+        labels = f'model="{stats["model"][0]}",version="{stats["model"][1]}",backend="{stats["model"][2]}"'
+        _render_histogram(lines, 'visionai_inference_batch_size', labels, stats['batch_size'])
+    return '\n'.join(lines) + '\n'
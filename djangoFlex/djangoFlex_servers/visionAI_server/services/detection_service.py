@@ -1,22 +1,53 @@
-from ..utils.detection_utils import load_detection_model
-from ..utils.file_utils import download_model_if_not_exists, get_model_base_path
-import os
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from django.conf import settings
+from .model_registry import ModelRegistry
+from .batch_inference_service import BatchInferenceService
+from ..utils.tracker import MultiObjectTracker
 
 class DetectionService:
-    def __init__(self):
-        model_name = "360_1280_person_yolov8m"
-        model_version = "1"
-
+    def __init__(self, model_name="360_1280_person_yolov8m", model_version="1", backend=None):
+        # 推論後端：pytorch、onnx（ONNX Runtime）或 openvino，未指定時依 VISIONAI_INFERENCE_BACKEND 設定
+        backend = backend or getattr(settings, 'VISIONAI_INFERENCE_BACKEND', 'pytorch')
         try:
-            # 確保模型文件存在並獲取完整路徑
-            model_path = download_model_if_not_exists(model_name, model_version)
-            print(f"使用模型路徑: {model_path}")
-
-            # 載入模型
-            self.detection_model = load_detection_model(model_path)
+            # 模型由 ModelRegistry 在進程內共用，追蹤狀態只存在此攝影機自己的 tracker 中
+            self.model_handle = ModelRegistry.get_instance().acquire(model_name, model_version, backend)
         except Exception as e:
             print(f"初始化 DetectionService 時發生錯誤: {str(e)}")
             raise
 
+        self.tracker = MultiObjectTracker()
+        # 批次與未批次的路徑共用同一份 predict 參數；conf 降到 tracker 的低分門檻，
+        # 否則 ultralytics 預設 0.25 會先濾掉低分偵測，第二階段配對永遠拿不到框
+        self.predict_kwargs = {'classes': [0], 'verbose': False, 'imgsz': 1280, 'conf': self.tracker.low_score}
+        self.batch_service = None
+        self.result_timeout = getattr(settings, 'VISIONAI_BATCH_RESULT_TIMEOUT', 10)
+        if getattr(settings, 'VISIONAI_BATCH_INFERENCE', True):
+            self.batch_service = BatchInferenceService.get_instance(self.model_handle.entry.key, self.predict_kwargs)
+
+    @property
+    def detection_model(self):
+        return self.model_handle.model
+
     def detect_objects(self, frame):
-        return self.detection_model.track(frame, classes=[0], verbose=False, imgsz=1280, persist=True)
+        """
+        偵測並追蹤單一幀中的物件。
+
+        Returns:
+            list: 本幀已確認的 TrackedObject。
+        """
+        if self.batch_service is None:
+            result = self.model_handle.predict(frame, **self.predict_kwargs)[0]
+        else:
+            future = self.batch_service.submit(self.model_handle, frame)
+            try:
+                result = future.result(timeout=self.result_timeout)
+            except FuturesTimeoutError:
+                # 取消後批次線程不會再寫入結果；逾時由 process_keyframe 記錄並略過此關鍵幀
+                future.cancel()
+                raise TimeoutError(f"批次推論超過 {self.result_timeout} 秒未回傳結果")
+
+        boxes = result.boxes
+        return self.tracker.update(boxes.xyxy.cpu().numpy(), boxes.conf.cpu().numpy())
+
+    def close(self):
+        self.model_handle.release()
@@ -19,10 +19,17 @@ class DrawingService:
         return fps_controller_adjustment(frame_data, duration, fps)
 
     def is_valid_clip(self, clip_path):
-        return clip_path and os.path.exists(clip_path) and clip_path.endswith('.ts')
+        return clip_path and os.path.exists(clip_path) and clip_path.endswith(('.ts', '.m4s'))
+
+    def clip_source(self, clip_path):
+        # fMP4 片段不含 moov，需透過 concat protocol 接上同目錄的 init.mp4 才能解碼
+        if clip_path.endswith('.m4s'):
+            init_path = os.path.join(os.path.dirname(clip_path), 'init.mp4')
+            return f"concat:{init_path}|{clip_path}"
+        return clip_path
 
     def read_video_frames(self, clip_path):
-        cap = cv2.VideoCapture(clip_path)
+        cap = cv2.VideoCapture(self.clip_source(clip_path))
         frames = []
         duration = 0
 
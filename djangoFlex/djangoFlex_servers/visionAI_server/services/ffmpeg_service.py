@@ -5,10 +5,11 @@ class FFmpegService:
     def __init__(self):
         self.ffmpeg_processes = {}
         self.ffmpeg_checkers = {}
+        self.ffmpeg_progress = {}
 
     def start_ffmpeg_process(self, rtmp_url, output_url):
         try:
-            self.ffmpeg_processes[rtmp_url], self.ffmpeg_checkers[rtmp_url] = create_ffmpeg_process(output_url, 15, (1280, 720))
+            self.ffmpeg_processes[rtmp_url], self.ffmpeg_checkers[rtmp_url], self.ffmpeg_progress[rtmp_url] = create_ffmpeg_process(output_url, 15, (1280, 720))
         except Exception as e:
             raise
 
@@ -22,10 +23,15 @@ class FFmpegService:
                 self.ffmpeg_processes[rtmp_url].kill()
             del self.ffmpeg_processes[rtmp_url]
             del self.ffmpeg_checkers[rtmp_url]
+            self.ffmpeg_progress.pop(rtmp_url, None)
 
     def is_ffmpeg_running(self, rtmp_url):
         return rtmp_url in self.ffmpeg_checkers and self.ffmpeg_checkers[rtmp_url]()
 
+    def get_progress(self, rtmp_url):
+        progress = self.ffmpeg_progress.get(rtmp_url)
+        return progress.snapshot() if progress else None
+
     def write_frame(self, rtmp_url, frame):
         if rtmp_url in self.ffmpeg_processes:
             self.ffmpeg_processes[rtmp_url].stdin.write(frame)
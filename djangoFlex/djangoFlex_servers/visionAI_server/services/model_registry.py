@@ -0,0 +1,144 @@
+import time
+import threading
+from django.conf import settings
+from ..utils.detection_utils import load_detection_model, load_onnx_model, load_openvino_model
+from ..utils.file_utils import download_model_if_not_exists
+
+# backend -> 載入函數，接收 best.pt 的路徑並回傳可呼叫 predict 的模型
+MODEL_LOADERS = {
+    'pytorch': load_detection_model,
+    'onnx': load_onnx_model,
+    'openvino': load_openvino_model,
+}
+
+class ModelEntry:
+    def __init__(self, key, model):
+        self.key = key
+        self.model = model
+        # 同一個模型的推論必須序列化：predictor 狀態掛在模型物件上
+        self.lock = threading.Lock()
+        self.refcount = 0
+        self.last_used = time.time()
+
+class ModelHandle:
+    """
+    共用模型的推論代理，每個使用者（攝影機）各自持有，用於引用計數。
+    追蹤狀態不放在模型上，由各攝影機的 MultiObjectTracker 自行保存。
+    """
+
+    def __init__(self, registry, entry):
+        self.registry = registry
+        self.entry = entry
+        self.released = False
+
+    @property
+    def model(self):
+        return self.entry.model
+
+    def predict(self, frame, **kwargs):
+        with self.entry.lock:
+            self.entry.last_used = time.time()
+            return self.entry.model.predict(frame, **kwargs)
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.registry.release(self.entry)
+
+class ModelRegistry:
+    """
+    進程內共用的模型登錄表，以 (model_name, version, backend) 為鍵，每個模型只載入一次。
+
+    以引用計數追蹤使用者，計數歸零且閒置超過 idle_timeout 秒的模型由背景線程卸載。
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls):
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(getattr(settings, 'VISIONAI_MODEL_IDLE_TIMEOUT', 300))
+            return cls._instance
+
+    def __init__(self, idle_timeout=300):
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.loading = {}
+        self.reaper = None
+
+    def acquire(self, model_name, model_version, backend='pytorch'):
+        """
+        取得共用模型的 handle；模型尚未載入時才下載並載入。
+
+        Args:
+            model_name (str): MLflow 模型名稱。
+            model_version (str): 模型版本。
+            backend (str): 推論後端，需為 MODEL_LOADERS 中的鍵。
+
+        Returns:
+            ModelHandle: 使用完畢需呼叫 release()。
+        """
+        if backend not in MODEL_LOADERS:
+            raise ValueError(f"不支援的推論後端: {backend}")
+        key = (model_name, str(model_version), backend)
+
+        with self.lock:
+            load_lock = self.loading.setdefault(key, threading.Lock())
+
+        # 同一模型只由一個線程載入，其他線程等待後直接共用
+        with load_lock:
+            with self.lock:
+                entry = self.entries.get(key)
+            if entry is None:
+                model_path = download_model_if_not_exists(model_name, model_version)
+                entry = ModelEntry(key, MODEL_LOADERS[backend](model_path))
+                print(f"模型已載入: {key}")
+
+            with self.lock:
+                self.entries[key] = entry
+                entry.refcount += 1
+                entry.last_used = time.time()
+                self._start_reaper()
+        return ModelHandle(self, entry)
+
+    def release(self, entry):
+        with self.lock:
+            entry.refcount = max(0, entry.refcount - 1)
+            entry.last_used = time.time()
+
+    def unload_idle(self):
+        now = time.time()
+        with self.lock:
+            idle_keys = [
+                key for key, entry in self.entries.items()
+                if entry.refcount == 0 and now - entry.last_used >= self.idle_timeout
+            ]
+            for key in idle_keys:
+                del self.entries[key]
+                print(f"模型閒置已卸載: {key}")
+        return idle_keys
+
+    def list_models(self):
+        with self.lock:
+            return [
+                {'model': key, 'refcount': entry.refcount, 'idle_seconds': round(time.time() - entry.last_used, 1)}
+                for key, entry in self.entries.items()
+            ]
+
+    def _start_reaper(self):
+        if self.reaper is not None and self.reaper.is_alive():
+            return
+
+        def reap_loop():
+            while True:
+                time.sleep(max(1, self.idle_timeout / 4))
+                self.unload_idle()
+                with self.lock:
+                    if not self.entries:
+                        self.reaper = None
+                        return
+
+        self.reaper = threading.Thread(target=reap_loop, name='model-registry-reaper', daemon=True)
+        self.reaper.start()
@@ -6,7 +6,11 @@ from .drawing_service import DrawingService
 from .ffmpeg_service import FFmpegService
 from ..models import CameraDrawingStatus
 from ...videoCap_server.models import CurrentVideoClip
+from ...videoCap_server.services.snapshot_service import SnapshotPublisher
+from ...videoCap_server.services.latest_frame_store import annotated_frame_key
+from ...videoCap_server.utils.config_loader import ConfigLoader
 from ..utils.FrameInterpolator import FrameInterpolator
+from ..utils.motion_detector import MotionDetector
 from django.db import transaction
 import time
 import cv2
@@ -20,6 +24,7 @@ class VideoProcessingService:
         self.running = {}
         self.draw_threads = {}
         self.last_processed_clip = {}
+        self.preview_publishers = {}
         self.interpolator_kwargs = {'frame_interval': 10}
 
     def start_draw_service(self, rtmp_url):
@@ -34,8 +39,15 @@ class VideoProcessingService:
             #     return False, "Configuration not found"
 
             self.running[rtmp_url] = True
-            self.rtmp_interpolator[rtmp_url] = FrameInterpolator(**self.interpolator_kwargs)
+            self.rtmp_interpolator[rtmp_url] = FrameInterpolator(motion_detector=MotionDetector(), **self.interpolator_kwargs)
             self.rtmp_detection_service[rtmp_url] = DetectionService()
+            video_cap_config = ConfigLoader.load_config()
+            # 標註後的畫面另外寫入最新幀存放區，供即時預覽使用
+            self.preview_publishers[rtmp_url] = SnapshotPublisher(
+                annotated_frame_key(rtmp_url),
+                video_cap_config.snapshot_interval,
+                video_cap_config.snapshot_jpeg_quality
+            )
 
             self.draw_threads[rtmp_url] = threading.Thread(target=self._draw_loop, args=(rtmp_url,))
             self.draw_threads[rtmp_url].start()
@@ -61,6 +73,12 @@ class VideoProcessingService:
                 del self.draw_threads[rtmp_url]
 
             self.ffmpeg_service.stop_ffmpeg_process(rtmp_url)
+            detection_service = self.rtmp_detection_service.pop(rtmp_url, None)
+            if detection_service is not None:
+                detection_service.close()
+            preview_publisher = self.preview_publishers.pop(rtmp_url, None)
+            if preview_publisher is not None:
+                preview_publisher.close()
 
             CameraDrawingStatus.objects.update_or_create(camera_url=rtmp_url, defaults={'is_drawing': False})
 
@@ -112,6 +130,7 @@ class VideoProcessingService:
                                     if self.running[rtmp_url]:
                                         # print("開始打出interpolation處理結果rtmp")
                                         self.ffmpeg_service.write_frame(rtmp_url, frame)
+                                        self.preview_publishers[rtmp_url](frame)
                                         sleep_time = max(0, ((1 - time_diff) / config['fps']))
                                         time.sleep(sleep_time)
                         else:
@@ -1,3 +1,482 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import Future
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from .services.batch_inference_service import BatchInferenceService
+from .services.detection_service import DetectionService
+from .services.model_registry import ModelRegistry
+from .utils.decorators import compute_backoff
+from .utils.detection_metrics import average_precision, mean_average_precision
+from .utils.ffmpeg_progress import FFmpegProgress, start_progress_reader
+from .utils.FrameInterpolator import FrameInterpolator
+from .utils.motion_detector import MotionDetector
+from .utils.quantization_utils import (
+    detect_head_nodes, get_quantization_report_path, get_quantized_model_path, letterbox, select_onnx_variant
+)
+from .utils.tracker import MultiObjectTracker, TrackedObject, greedy_match, iou_matrix
 
-# Create your tests here.
+class ComputeBackoffTests(SimpleTestCase):
+    def test_backoff_doubles_per_attempt(self):
+        self.assertEqual([compute_backoff(attempt, 1, jitter=0) for attempt in range(4)], [1, 2, 4, 8])
+
+    def test_backoff_is_capped_before_jitter(self):
+        with mock.patch('random.uniform', return_value=0.5):
+            self.assertEqual(compute_backoff(10, 1, max_backoff=30, jitter=1), 30.5)
+
+    def test_jitter_stays_within_bounds(self):
+        for _ in range(100):
+            self.assertTrue(2 <= compute_backoff(1, 1, jitter=0.5) <= 2.5)
+
+def progress_block(speed='1.00x', **overrides):
+    block = {
+        'frame': '150', 'fps': '14.98', 'bitrate': '2480.5kbits/s', 'out_time_us': '10000000',
+        'drop_frames': '0', 'dup_frames': '2', 'speed': speed, 'progress': 'continue'
+    }
+    block.update(overrides)
+    return block
+
+class FFmpegProgressTests(SimpleTestCase):
+    def test_update_parses_progress_block(self):
+        progress = FFmpegProgress('cam')
+        progress.update(progress_block(speed='1.25x'))
+
+        snapshot = progress.snapshot()
+        self.assertEqual(snapshot['frame'], 150)
+        self.assertEqual(snapshot['fps'], 14.98)
+        self.assertEqual(snapshot['bitrate_kbps'], 2480.5)
+        self.assertEqual(snapshot['speed'], 1.25)
+        self.assertEqual(snapshot['dup_frames'], 2)
+        self.assertEqual(snapshot['out_time'], 10.0)
+        self.assertFalse(snapshot['is_slow'])
+
+    def test_out_time_falls_back_to_clock_format(self):
+        progress = FFmpegProgress('cam')
+        progress.update(progress_block(out_time_us='N/A', out_time='01:02:03.500000'))
+
+        self.assertEqual(progress.snapshot()['out_time'], 3723.5)
+
+    def test_unparseable_values_become_none(self):
+        progress = FFmpegProgress('cam')
+        progress.update(progress_block(speed='N/A', bitrate='N/A'))
+
+        self.assertIsNone(progress.snapshot()['speed'])
+        self.assertIsNone(progress.snapshot()['bitrate_kbps'])
+
+    def test_alerts_once_after_sustained_slow_reports_and_on_recovery(self):
+        alerts = []
+        progress = FFmpegProgress('cam', min_speed=1.0, slow_reports=3, on_alert=alerts.append)
+
+        for _ in range(5):
+            progress.update(progress_block(speed='0.8x'))
+        self.assertEqual(len(alerts), 1)
+        self.assertTrue(progress.snapshot()['is_slow'])
+
+        progress.update(progress_block(speed='1.1x'))
+        self.assertEqual(len(alerts), 2)
+        self.assertEqual(progress.snapshot()['slow_alerts'], 1)
+        self.assertFalse(progress.snapshot()['is_slow'])
+
+    def test_alerts_go_to_the_module_logger_by_default(self):
+        progress = FFmpegProgress('cam', slow_reports=1)
+
+        with self.assertLogs('djangoFlex_servers.visionAI_server.utils.ffmpeg_progress', level='WARNING'):
+            progress.update(progress_block(speed='0.5x'))
+
+    def test_reader_splits_progress_blocks_from_log_lines(self):
+        stream = io.BytesIO(
+            b"[flv @ 0x1] Failed to update header\n"
+            b"frame=10\nspeed=0.9x\nprogress=continue\n"
+            b"frame=20\nspeed=1.0x\nprogress=end\n"
+        )
+        progress = FFmpegProgress('cam')
+        logs = []
+
+        start_progress_reader(stream, progress, on_log=logs.append).join(timeout=1)
+
+        self.assertEqual(logs, ['[flv @ 0x1] Failed to update header'])
+        self.assertEqual(progress.snapshot()['frame'], 20)
+        self.assertTrue(progress.ended)
+
+def blank_frame(value=0):
+    return np.full((180, 320, 3), value, dtype=np.uint8)
+
+class MotionDetectorTests(SimpleTestCase):
+    def test_first_frame_always_detects(self):
+        self.assertTrue(MotionDetector().should_detect(blank_frame()))
+
+    def test_static_scene_is_skipped_until_forced(self):
+        detector = MotionDetector(max_skipped_keyframes=2)
+        detector.should_detect(blank_frame())
+
+        self.assertEqual([detector.should_detect(blank_frame()) for _ in range(3)], [False, False, True])
+        self.assertEqual(detector.total_skipped, 2)
+
+    def test_moving_region_triggers_detection(self):
+        detector = MotionDetector()
+        detector.should_detect(blank_frame())
+        frame = blank_frame()
+        frame[40:120, 100:200] = 255
+
+        self.assertGreater(detector.motion_ratio(frame), detector.min_area_ratio)
+        self.assertTrue(detector.should_detect(frame))
+
+    def test_small_noise_is_ignored(self):
+        detector = MotionDetector()
+        detector.should_detect(blank_frame(100))
+
+        self.assertFalse(detector.should_detect(blank_frame(110)))
+
+class StaticGate:
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def should_detect(self, frame):
+        return next(self.results)
+
+class FakeDetectionService:
+    def __init__(self, results):
+        self.results = iter(results)
+
+    def detect_objects(self, frame):
+        return next(self.results)
+
+class FrameInterpolatorMotionGateTests(SimpleTestCase):
+    def test_empty_keyframe_clears_detections_reused_by_the_gate(self):
+        person = TrackedObject(1, (10.0, 10.0, 60.0, 120.0), 0.9)
+        interpolator = FrameInterpolator(frame_interval=10, motion_detector=StaticGate([True, True, False]))
+        detection_service = FakeDetectionService([[person], []])
+
+        interpolator.process_keyframe(blank_frame(), 0, detection_service)
+        self.assertIn(1, interpolator.next_keyframe_detections)
+
+        interpolator.process_keyframe(blank_frame(), 10, detection_service)
+        self.assertEqual(interpolator.next_keyframe_detections, {})
+        self.assertEqual(interpolator.last_keyframe_detections, {})
+
+        # 畫面靜止時沿用空集合，不再畫出已離開的人
+        with mock.patch.object(interpolator, '_draw_detection') as draw:
+            interpolator.process_keyframe(blank_frame(), 20, detection_service)
+        draw.assert_not_called()
+
+class IoUMatrixTests(SimpleTestCase):
+    def test_iou_values(self):
+        boxes_a = np.array([[0, 0, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+        boxes_b = np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32)
+
+        iou = iou_matrix(boxes_a, boxes_b)
+        self.assertEqual(iou.shape, (2, 3))
+        np.testing.assert_allclose(iou[0], [1.0, 50 / 150, 0.0], atol=1e-6)
+
+    def test_empty_inputs(self):
+        self.assertEqual(iou_matrix(np.zeros((0, 4)), np.zeros((3, 4))).shape, (0, 3))
+
+class GreedyMatchTests(SimpleTestCase):
+    def test_highest_iou_pairs_first(self):
+        iou = np.array([[0.9, 0.8], [0.85, 0.1]])
+
+        matches, unmatched_rows, unmatched_cols = greedy_match(iou, 0.3)
+        self.assertEqual(matches, [(0, 0)])
+        self.assertEqual(unmatched_rows, [1])
+        self.assertEqual(unmatched_cols, [1])
+
+    def test_threshold_blocks_weak_pairs(self):
+        matches, unmatched_rows, unmatched_cols = greedy_match(np.array([[0.2]]), 0.3)
+
+        self.assertEqual(matches, [])
+        self.assertEqual((unmatched_rows, unmatched_cols), ([0], [0]))
+
+class MultiObjectTrackerTests(SimpleTestCase):
+    def step(self, tracker, boxes, scores):
+        return {obj.track_id: obj for obj in tracker.update(np.array(boxes, dtype=np.float32), np.array(scores))}
+
+    def test_ids_are_stable_for_moving_objects(self):
+        tracker = MultiObjectTracker()
+        first = self.step(tracker, [[0, 0, 50, 100], [200, 0, 250, 100]], [0.9, 0.8])
+        self.assertEqual(sorted(first), [1, 2])
+
+        for offset in range(5, 30, 5):
+            tracked = self.step(tracker, [[200 + offset, 0, 250 + offset, 100], [offset, 0, 50 + offset, 100]], [0.8, 0.9])
+            self.assertEqual(tracked[1].bbox[0], offset)
+            self.assertEqual(tracked[2].bbox[0], 200 + offset)
+
+    def test_low_score_detection_keeps_an_existing_track(self):
+        tracker = MultiObjectTracker()
+        self.step(tracker, [[0, 0, 50, 100]], [0.9])
+
+        tracked = self.step(tracker, [[2, 0, 52, 100]], [0.3])
+        self.assertEqual(list(tracked), [1])
+
+    def test_low_score_detection_does_not_start_a_track(self):
+        tracker = MultiObjectTracker()
+        self.step(tracker, [[0, 0, 50, 100]], [0.9])
+
+        self.assertEqual(self.step(tracker, [[0, 0, 50, 100], [300, 0, 350, 100]], [0.9, 0.3]).keys(), {1})
+        self.assertEqual(len(tracker.ids), 1)
+
+    def test_new_track_is_confirmed_after_min_hits(self):
+        tracker = MultiObjectTracker(min_hits=2)
+        self.step(tracker, [[0, 0, 50, 100]], [0.9])
+
+        self.assertEqual(list(self.step(tracker, [[0, 0, 50, 100], [300, 0, 350, 100]], [0.9, 0.9])), [1])
+        self.assertEqual(sorted(self.step(tracker, [[0, 0, 50, 100], [300, 0, 350, 100]], [0.9, 0.9])), [1, 2])
+
+    def test_lost_tracks_are_removed_after_max_lost(self):
+        tracker = MultiObjectTracker(max_lost=2)
+        self.step(tracker, [[0, 0, 50, 100]], [0.9])
+
+        for _ in range(3):
+            self.step(tracker, [], [])
+        self.assertEqual(len(tracker.ids), 0)
+
+    def test_track_survives_a_short_occlusion(self):
+        tracker = MultiObjectTracker()
+        for offset in (0, 10, 20):
+            self.step(tracker, [[offset, 0, 50 + offset, 100]], [0.9])
+        self.step(tracker, [], [])
+
+        # 依等速模型外推，重新出現時仍沿用原本的 ID
+        self.assertEqual(list(self.step(tracker, [[40, 0, 90, 100]], [0.9])), [1])
+
+class MeanAveragePrecisionTests(SimpleTestCase):
+    ground_truths = [np.array([[0, 0, 10, 10], [20, 0, 30, 10]], dtype=np.float32)]
+
+    def test_perfect_predictions(self):
+        predictions = [(self.ground_truths[0], np.array([0.9, 0.8]))]
+
+        self.assertEqual(mean_average_precision(predictions, self.ground_truths), {'map50': 1.0, 'map50_95': 1.0})
+
+    def test_false_positive_between_hits(self):
+        boxes = np.array([[0, 0, 10, 10], [50, 50, 60, 60], [20, 0, 30, 10]], dtype=np.float32)
+        predictions = [(boxes, np.array([0.9, 0.8, 0.7]))]
+
+        # 召回率 0~0.5 的 51 個取樣點精確率為 1，其餘 50 點為 2/3
+        self.assertAlmostEqual(average_precision(predictions, self.ground_truths, 0.5), (51 + 50 * 2 / 3) / 101)
+
+    def test_no_predictions(self):
+        predictions = [(np.zeros((0, 4), dtype=np.float32), np.zeros(0))]
+
+        self.assertEqual(average_precision(predictions, self.ground_truths, 0.5), 0.0)
+
+    def test_no_ground_truth_is_nan(self):
+        predictions = [(self.ground_truths[0], np.array([0.9, 0.8]))]
+
+        self.assertTrue(np.isnan(mean_average_precision(predictions, [np.zeros((0, 4))])['map50']))
+
+class LetterboxTests(SimpleTestCase):
+    def test_auto_pads_to_stride_multiple(self):
+        tensor = letterbox(np.zeros((720, 1280, 3), dtype=np.uint8), 1280)
+
+        self.assertEqual(tensor.shape, (1, 3, 736, 1280))
+        self.assertEqual(tensor.dtype, np.float32)
+        self.assertAlmostEqual(float(tensor[0, 0, 0, 0]), 114 / 255, places=5)
+
+    def test_square_padding_without_auto(self):
+        self.assertEqual(letterbox(np.zeros((720, 1280, 3), dtype=np.uint8), 640, auto=False).shape, (1, 3, 640, 640))
+
+class DetectHeadNodesTests(SimpleTestCase):
+    def test_excludes_non_conv_nodes_of_last_layer(self):
+        nodes = [
+            SimpleNamespace(name='/model.0/conv/Conv', op_type='Conv'),
+            SimpleNamespace(name='/model.21/Concat', op_type='Concat'),
+            SimpleNamespace(name='/model.22/cv3.0/cv3.0.2/Conv', op_type='Conv'),
+            SimpleNamespace(name='/model.22/dfl/Softmax', op_type='Softmax'),
+            SimpleNamespace(name='/model.22/Sigmoid', op_type='Sigmoid'),
+            SimpleNamespace(name='/model.22/Concat_5', op_type='Concat'),
+        ]
+        model = SimpleNamespace(graph=SimpleNamespace(node=nodes))
+
+        self.assertEqual(detect_head_nodes(model), ['/model.22/dfl/Softmax', '/model.22/Sigmoid', '/model.22/Concat_5'])
+
+class SelectOnnxVariantTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.onnx_path = os.path.join(self.temp_dir.name, 'best.onnx')
+        open(self.onnx_path, 'w').close()
+        quantized_path = get_quantized_model_path(self.onnx_path)
+        open(quantized_path, 'w').close()
+        os.utime(self.onnx_path, (1000, 1000))
+        os.utime(quantized_path, (2000, 2000))
+
+    def write_report(self, report):
+        with open(get_quantization_report_path(self.onnx_path), 'w') as f:
+            json.dump(report, f)
+
+    def test_accepted_report_selects_int8(self):
+        self.write_report({'accepted': True, 'map50_drift': 0.01})
+
+        self.assertEqual(select_onnx_variant(self.onnx_path, 0.02), str(get_quantized_model_path(self.onnx_path)))
+
+    def test_rejected_report_keeps_fp32(self):
+        self.write_report({'accepted': False, 'map50_drift': 0.01})
+
+        self.assertEqual(select_onnx_variant(self.onnx_path, 0.02), self.onnx_path)
+
+    def test_nan_drift_keeps_fp32(self):
+        self.write_report({'accepted': True, 'map50_drift': float('nan')})
+
+        self.assertEqual(select_onnx_variant(self.onnx_path, 0.02), self.onnx_path)
+
+class ModelRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.loader = mock.Mock(side_effect=lambda path: SimpleNamespace(path=path, predict=mock.Mock(return_value=['result'])))
+        mock.patch.dict('djangoFlex_servers.visionAI_server.services.model_registry.MODEL_LOADERS', {'pytorch': self.loader}).start()
+        mock.patch('djangoFlex_servers.visionAI_server.services.model_registry.download_model_if_not_exists',
+                   side_effect=lambda name, version: f'/models/{name}/{version}/best.pt').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def test_concurrent_acquires_load_the_model_once(self):
+        registry = ModelRegistry(idle_timeout=300)
+        handles = []
+        threads = [threading.Thread(target=lambda: handles.append(registry.acquire('person', 1))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.loader.assert_called_once_with('/models/person/1/best.pt')
+        self.assertEqual(len({id(handle.model) for handle in handles}), 1)
+        self.assertEqual(registry.list_models()[0]['refcount'], 4)
+        self.assertEqual(handles[0].predict('frame', verbose=False), ['result'])
+
+    def test_idle_models_are_unloaded_only_after_every_release(self):
+        registry = ModelRegistry(idle_timeout=0)
+        first = registry.acquire('person', 1)
+        second = registry.acquire('person', 1)
+
+        first.release()
+        first.release()
+        self.assertEqual(registry.unload_idle(), [])
+        second.release()
+        self.assertEqual(registry.unload_idle(), [('person', '1', 'pytorch')])
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            ModelRegistry().acquire('person', 1, backend='tensorrt')
+
+def fake_result(score):
+    boxes = SimpleNamespace(
+        xyxy=SimpleNamespace(cpu=lambda: SimpleNamespace(numpy=lambda: np.array([[0, 0, 10, 10]], dtype=float))),
+        conf=SimpleNamespace(cpu=lambda: SimpleNamespace(numpy=lambda: np.array([score])))
+    )
+    return SimpleNamespace(boxes=boxes)
+
+class BatchInferenceServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.handle = SimpleNamespace(predict=mock.Mock(side_effect=lambda frames, **kwargs: [f'result-{frame}' for frame in frames]))
+        self.service = BatchInferenceService(('person', '1', 'pytorch'), {'verbose': False}, max_batch_size=4, max_wait_ms=50)
+
+    def test_results_are_returned_to_each_submitter(self):
+        futures = [self.service.submit(self.handle, index) for index in range(3)]
+
+        self.assertEqual([future.result(timeout=2) for future in futures], ['result-0', 'result-1', 'result-2'])
+        self.assertEqual(self.service.stats()['batch_size']['count'], 1)
+
+    def test_cancelled_requests_are_not_inferred(self):
+        cancelled = self.service.submit(self.handle, 'late')
+        cancelled.cancel()
+        kept = self.service.submit(self.handle, 'kept')
+
+        self.assertEqual(kept.result(timeout=2), 'result-kept')
+        self.handle.predict.assert_called_once_with(['kept'], verbose=False)
+
+    def test_result_count_mismatch_fails_the_whole_batch(self):
+        self.handle.predict.side_effect = lambda frames, **kwargs: ['only-one']
+        futures = [self.service.submit(self.handle, index) for index in range(2)]
+
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=2)
+
+class DetectionServiceTimeoutTests(SimpleTestCase):
+    def build_service(self, batch_service):
+        service = DetectionService.__new__(DetectionService)
+        service.model_handle = SimpleNamespace()
+        service.predict_kwargs = {'verbose': False}
+        service.tracker = MultiObjectTracker()
+        service.batch_service = batch_service
+        service.result_timeout = 0.01
+        return service
+
+    def test_unanswered_batch_request_times_out_and_is_cancelled(self):
+        pending = Future()
+        service = self.build_service(SimpleNamespace(submit=mock.Mock(return_value=pending)))
+
+        with self.assertRaises(TimeoutError):
+            service.detect_objects('frame')
+        self.assertTrue(pending.cancelled())
+
+    def test_batch_result_is_passed_to_the_tracker(self):
+        answered = Future()
+        answered.set_result(fake_result(0.9))
+        service = self.build_service(SimpleNamespace(submit=mock.Mock(return_value=answered)))
+
+        service.detect_objects('frame')
+
+        self.assertEqual(service.tracker.ids.tolist(), [1])
+
+class DetectionServiceThresholdTests(SimpleTestCase):
+    def setUp(self):
+        self.handle = SimpleNamespace(entry=SimpleNamespace(key=('person', '1', 'pytorch')),
+                                      predict=mock.Mock(return_value=[fake_result(0.15)]))
+        registry = mock.patch('djangoFlex_servers.visionAI_server.services.detection_service.ModelRegistry').start()
+        registry.get_instance.return_value.acquire.return_value = self.handle
+        self.get_batch = mock.patch('djangoFlex_servers.visionAI_server.services.detection_service.BatchInferenceService.get_instance').start()
+        self.addCleanup(mock.patch.stopall)
+
+    @override_settings(VISIONAI_BATCH_INFERENCE=False)
+    def test_predict_uses_the_tracker_low_score_threshold(self):
+        service = DetectionService()
+
+        service.detect_objects('frame')
+
+        self.assertEqual(self.handle.predict.call_args.kwargs['conf'], service.tracker.low_score)
+
+    @override_settings(VISIONAI_BATCH_INFERENCE=True)
+    def test_batch_service_receives_the_same_threshold(self):
+        service = DetectionService()
+
+        predict_kwargs = self.get_batch.call_args.args[1]
+        self.assertEqual(predict_kwargs['conf'], service.tracker.low_score)
+
+class BenchmarkDetectionBackendsTests(SimpleTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.model_path = os.path.join(self.temp_dir.name, 'best.pt')
+        self.fp32_path = os.path.join(self.temp_dir.name, 'best.onnx')
+        self.int8_path = os.path.join(self.temp_dir.name, 'best_int8.onnx')
+        command = 'djangoFlex_servers.visionAI_server.management.commands.benchmark_detection_backends'
+        mock.patch(f'{command}.read_clip_frames', return_value=['frame'] * 3).start()
+        mock.patch(f'{command}.download_model_if_not_exists', return_value=self.model_path).start()
+        mock.patch(f'{command}.export_detection_model', return_value=self.fp32_path).start()
+        self.yolo = mock.patch(f'{command}.YOLO').start()
+        self.addCleanup(mock.patch.stopall)
+
+    def run_benchmark(self):
+        stdout = io.StringIO()
+        call_command('benchmark_detection_backends', 'clip.mp4', '--backends', 'onnx', '--warmup', '0', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_onnx_row_always_loads_the_fp32_model(self):
+        with open(self.int8_path, 'wb') as f:
+            f.write(b'int8')
+
+        output = self.run_benchmark()
+
+        self.assertEqual([call.args[0] for call in self.yolo.call_args_list], [self.fp32_path, self.int8_path])
+        self.assertIn(f'onnx: {self.fp32_path}', output)
+        self.assertIn(f'onnx-int8: {self.int8_path}', output)
+
+    def test_int8_row_is_omitted_without_a_quantized_model(self):
+        output = self.run_benchmark()
+
+        self.assertEqual([call.args[0] for call in self.yolo.call_args_list], [self.fp32_path])
+        self.assertNotIn('onnx-int8', output)
@@ -3,8 +3,10 @@ import numpy as np
 import os
 
 class FrameInterpolator:
-    def __init__(self, frame_interval=5):
+    def __init__(self, frame_interval=5, motion_detector=None):
         self.frame_interval = frame_interval
+        # 可選的移動偵測器：畫面靜止時略過關鍵幀偵測，沿用上一次的結果
+        self.motion_detector = motion_detector
         self.prev_detections = {}
         self.prev_frame_count = 0
         self.last_keyframe_detections = {}
@@ -24,39 +26,43 @@ class FrameInterpolator:
 
     def process_keyframe(self, frame, frame_count, detection_service):
         """處理關鍵幀並進行物件偵測"""
+        if self.motion_detector is not None and not self.motion_detector.should_detect(frame):
+            return self._reuse_keyframe_detections(frame, frame_count)
+
         try:
-            results = detection_service.detect_objects(frame)
-            if results is None or len(results) == 0:
+            tracked_objects = detection_service.detect_objects(frame)
+            if not tracked_objects:
                 print("未檢測到任何物件")
-                return frame
-
-            if results[0].boxes is None or len(results[0].boxes) == 0:
-                print("未檢測到任何邊界框")
+                # 清空關鍵幀結果：畫面變空後若轉為靜止，移動閘門沿用的是空集合，而不是最後一批人的框
+                self.last_keyframe_detections = {}
+                self.next_keyframe_detections = {}
+                self.detection_buffer = {}
+                self.last_keyframe_number = self.next_keyframe_number
+                self.next_keyframe_number = frame_count
                 return frame
 
             current_detections = {}
 
-            for box in results[0].boxes:
-                track_id = int(box.id[0]) if box.id is not None else None
-                if track_id is not None:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    detection = {
-                        'bbox': (x1, y1, x2, y2),
-                        'conf': float(box.conf)
-                    }
-                    current_detections[track_id] = detection
+            for tracked_object in tracked_objects:
+                track_id = tracked_object.track_id
+                x1, y1, x2, y2 = tracked_object.bbox
+                detection = {
+                    'bbox': (x1, y1, x2, y2),
+                    'conf': tracked_object.conf
+                }
+                current_detections[track_id] = detection
 
-                    # Update detection buffer
-                    if track_id not in self.detection_buffer:
-                        self.detection_buffer[track_id] = []
-                    self.detection_buffer[track_id].append((frame_count, detection['bbox'], detection['conf']))
+                # Update detection buffer
+                if track_id not in self.detection_buffer:
+                    self.detection_buffer[track_id] = []
+                self.detection_buffer[track_id].append((frame_count, detection['bbox'], detection['conf']))
 
-                    # Keep only recent detections
-                    if len(self.detection_buffer[track_id]) > self.buffer_size:
-                        self.detection_buffer[track_id].pop(0)
+                # Keep only recent detections
+                if len(self.detection_buffer[track_id]) > self.buffer_size:
+                    self.detection_buffer[track_id].pop(0)
 
-                    # 確保繪製檢測結果
-                    self._draw_detection(frame, track_id, (x1, y1, x2, y2), float(box.conf))
+                # 確保繪製檢測結果
+                self._draw_detection(frame, track_id, (x1, y1, x2, y2), tracked_object.conf)
 
             # 更新關鍵幀資訊
             self.last_keyframe_detections = self.next_keyframe_detections
@@ -69,6 +75,16 @@ class FrameInterpolator:
 
         return frame
 
+    def _reuse_keyframe_detections(self, frame, frame_count):
+        """畫面靜止時沿用上一個關鍵幀的偵測結果，之間的插值幀維持相同位置"""
+        for track_id, detection in self.next_keyframe_detections.items():
+            self._draw_detection(frame, track_id, detection['bbox'], detection['conf'])
+
+        self.last_keyframe_detections = self.next_keyframe_detections
+        self.last_keyframe_number = self.next_keyframe_number
+        self.next_keyframe_number = frame_count
+        return frame
+
     def _cubic_interpolation(self, p0, p1, p2, p3, t):
         """Cubic interpolation between points"""
         t2 = t * t
@@ -2,6 +2,24 @@ import time
 import random
 from functools import wraps
 
+def compute_backoff(attempt, backoff_in_seconds=1, max_backoff=None, jitter=1):
+    """
+    計算第 attempt 次重試前的等待時間：指數退避加上隨機抖動。
+
+    Args:
+        attempt (int): 已失敗的次數（從 0 開始）。
+        backoff_in_seconds (float): 初始退避時間（秒）。
+        max_backoff (float): 退避時間上限（秒），None 表示不設上限。
+        jitter (float): 隨機抖動的最大秒數。
+
+    Returns:
+        float: 等待秒數。
+    """
+    sleep = backoff_in_seconds * 2 ** attempt
+    if max_backoff is not None:
+        sleep = min(sleep, max_backoff)
+    return sleep + random.uniform(0, jitter)
+
 def retry_with_backoff(retries=5, backoff_in_seconds=1):
     """
     裝飾器：使用指數退避策略重試失敗的函數。
@@ -23,8 +41,7 @@ def retry_with_backoff(retries=5, backoff_in_seconds=1):
                 except Exception as e:
                     if x == retries:
                         raise
-                    sleep = backoff_in_seconds * 2 ** x + random.uniform(0, 1)
-                    time.sleep(sleep)
+                    time.sleep(compute_backoff(x, backoff_in_seconds))
                     x += 1
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,72 @@
+import numpy as np
+from .tracker import iou_matrix
+
+COCO_IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+
+def average_precision(predictions, ground_truths, iou_threshold):
+    """
+    計算單一類別在指定 IoU 門檻下的 AP（101 點插值，同 COCO）。
+
+    Args:
+        predictions (list): 每幀一組 (boxes, scores)，boxes 為 (N, 4) 的 xyxy。
+        ground_truths (list): 每幀一組 (M, 4) 的 xyxy 真值框，順序與 predictions 相同。
+        iou_threshold (float): 判定為正確偵測的最低 IoU。
+
+    Returns:
+        float: AP 值；沒有任何真值框時回傳 nan。
+    """
+    total_gt = sum(len(gt) for gt in ground_truths)
+    if total_gt == 0:
+        return float('nan')
+
+    all_scores = []
+    all_hits = []
+    for (boxes, scores), gt in zip(predictions, ground_truths):
+        if len(boxes) == 0:
+            continue
+        order = np.argsort(-scores)
+        iou = iou_matrix(np.asarray(boxes, dtype=np.float32)[order], np.asarray(gt, dtype=np.float32).reshape(-1, 4))
+        matched = np.zeros(iou.shape[1], dtype=bool)
+        hits = np.zeros(len(order), dtype=bool)
+        # 依分數由高到低，每個預測配對 IoU 最高且尚未被配對的真值框
+        for row in range(len(order)):
+            if iou.shape[1] == 0:
+                break
+            candidates = np.where(matched, -1, iou[row])
+            best = int(np.argmax(candidates))
+            if candidates[best] >= iou_threshold:
+                matched[best] = True
+                hits[row] = True
+        all_scores.append(np.asarray(scores)[order])
+        all_hits.append(hits)
+
+    if not all_scores:
+        return 0.0
+
+    order = np.argsort(-np.concatenate(all_scores), kind='stable')
+    hits = np.concatenate(all_hits)[order]
+    true_positives = np.cumsum(hits)
+    false_positives = np.cumsum(~hits)
+    recall = true_positives / total_gt
+    precision = true_positives / np.maximum(true_positives + false_positives, 1e-9)
+
+    # 精確率取右側最大值形成包絡線，再於 101 個召回率點取樣
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    sample_points = np.linspace(0, 1, 101)
+    indices = np.searchsorted(recall, sample_points, side='left')
+    sampled = np.where(indices < len(precision), precision[np.minimum(indices, len(precision) - 1)], 0)
+    return float(sampled.mean())
+
+def mean_average_precision(predictions, ground_truths):
+    """
+    計算 mAP@0.5 與 mAP@0.5:0.95。
+
+    Args:
+        predictions (list): 每幀一組 (boxes, scores)。
+        ground_truths (list): 每幀一組真值框。
+
+    Returns:
+        dict: {'map50': float, 'map50_95': float}
+    """
+    aps = [average_precision(predictions, ground_truths, threshold) for threshold in COCO_IOU_THRESHOLDS]
+    return {'map50': aps[0], 'map50_95': float(np.mean(aps))}
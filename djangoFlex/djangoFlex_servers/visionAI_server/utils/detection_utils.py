@@ -1,5 +1,14 @@
+import os
 from pathlib import Path
+from django.conf import settings
 from ultralytics import YOLO
+from .quantization_utils import select_onnx_variant
+
+# 匯出格式 -> 匯出結果相對於 best.pt 的路徑（ultralytics 預設輸出在權重檔旁）
+EXPORT_PATHS = {
+    'onnx': lambda model_path: Path(model_path).with_suffix('.onnx'),
+    'openvino': lambda model_path: Path(model_path).with_name(f"{Path(model_path).stem}_openvino_model"),
+}
 
 def load_detection_model(model_path):
     """
@@ -20,4 +29,63 @@ def load_detection_model(model_path):
             raise FileNotFoundError(f"Model path '{model_path}' does not exist.")
         return YOLO(model_path)
     except Exception as e:
-        raise
\ No newline at end of file
+        raise
+
+def export_detection_model(model_path, export_format, imgsz=1280):
+    """
+    將 best.pt 匯出為指定格式並快取在同一目錄；已存在且比權重檔新時直接沿用。
+
+    Args:
+        model_path (str): best.pt 的路徑。
+        export_format (str): 匯出格式，需為 EXPORT_PATHS 中的鍵。
+        imgsz (int): 匯出時固定的輸入尺寸，需與推論時的 imgsz 一致。
+
+    Returns:
+        str: 匯出模型的路徑。
+
+    Raises:
+        FileNotFoundError: 如果模型文件不存在。
+        ValueError: 如果匯出格式不支援。
+    """
+    if export_format not in EXPORT_PATHS:
+        raise ValueError(f"不支援的匯出格式: {export_format}")
+    if not Path(model_path).exists():
+        raise FileNotFoundError(f"Model path '{model_path}' does not exist.")
+
+    export_path = EXPORT_PATHS[export_format](model_path)
+    if export_path.exists() and os.path.getmtime(export_path) >= os.path.getmtime(model_path):
+        return str(export_path)
+
+    print(f"匯出 {export_format} 模型: {export_path}")
+    # dynamic=True 保留可變的 batch 維度，批次推論服務才能一次送入多幀
+    exported = YOLO(model_path).export(format=export_format, imgsz=imgsz, dynamic=True, half=False)
+    return str(exported)
+
+def load_onnx_model(model_path):
+    """
+    以 ONNX Runtime 執行的 YOLO 模型，匯出檔快取在 best.pt 旁。
+
+    已有通過精度門檻的 INT8 量化模型時自動改用量化版本（可用 VISIONAI_INT8_AUTO_SELECT 關閉）。
+
+    Args:
+        model_path (str): best.pt 的路徑。
+
+    Returns:
+        YOLO: 以 ONNX 模型建立、介面與 PyTorch 版本相同的 YOLO 物件。
+    """
+    onnx_path = export_detection_model(model_path, 'onnx')
+    if getattr(settings, 'VISIONAI_INT8_AUTO_SELECT', True):
+        onnx_path = select_onnx_variant(onnx_path, getattr(settings, 'VISIONAI_INT8_MAX_MAP_DRIFT', 0.02))
+    return YOLO(onnx_path, task='detect')
+
+def load_openvino_model(model_path):
+    """
+    以 OpenVINO 執行的 YOLO 模型，匯出目錄快取在 best.pt 旁。
+
+    Args:
+        model_path (str): best.pt 的路徑。
+
+    Returns:
+        YOLO: 以 OpenVINO 模型建立、介面與 PyTorch 版本相同的 YOLO 物件。
+    """
+    return YOLO(export_detection_model(model_path, 'openvino'), task='detect')
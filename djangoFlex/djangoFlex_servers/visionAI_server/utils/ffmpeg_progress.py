@@ -0,0 +1,153 @@
+import re
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# -progress 輸出為 key=value 行，每個區塊以 progress=continue|end 結尾
+PROGRESS_LINE_PATTERN = re.compile(r'^(frame|fps|stream_\d+_\d+_q|bitrate|total_size|out_time_us|out_time_ms|out_time|dup_frames|drop_frames|speed|progress)=(.*)$')
+
+def _parse_float(value, suffix=''):
+    value = value.strip()
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+def _parse_int(value):
+    try:
+        return int(value.strip())
+    except ValueError:
+        return None
+
+def _parse_out_time(block):
+    out_time_us = _parse_int(block.get('out_time_us', ''))
+    if out_time_us is not None:
+        return out_time_us / 1_000_000
+    # 舊版 ffmpeg 只有 HH:MM:SS.micro 格式
+    parts = block.get('out_time', '').split(':')
+    if len(parts) == 3:
+        hours, minutes, seconds = _parse_int(parts[0]), _parse_int(parts[1]), _parse_float(parts[2])
+        if None not in (hours, minutes, seconds):
+            return hours * 3600 + minutes * 60 + seconds
+    return None
+
+class FFmpegProgress:
+    """
+    單一 ffmpeg 進程的 -progress 遙測資料。
+
+    連續 slow_reports 次回報的 speed 低於 min_speed 時發出一次警示，
+    在進程真正落後（延遲累積、丟幀）之前提早發現；速度恢復後重置。
+    警示預設寫入本模組的 logger（WARNING），由部署端的 logging 設定決定去向。
+    """
+
+    def __init__(self, name, min_speed=1.0, slow_reports=5, on_alert=None):
+        self.name = name
+        self.min_speed = min_speed
+        self.slow_reports = slow_reports
+        self.on_alert = on_alert or logger.warning
+        self.lock = threading.Lock()
+        self.frame = None
+        self.fps = None
+        self.bitrate_kbps = None
+        self.speed = None
+        self.drop_frames = None
+        self.dup_frames = None
+        self.out_time = None
+        self.ended = False
+        self.updated_at = None
+        self.slow_count = 0
+        self.slow_alerts = 0
+
+    def update(self, block):
+        """
+        套用一個完整的 -progress 區塊。
+
+        Args:
+            block (dict): 同一區塊中的 key=value 內容。
+        """
+        with self.lock:
+            self.frame = _parse_int(block.get('frame', ''))
+            self.fps = _parse_float(block.get('fps', ''))
+            self.bitrate_kbps = _parse_float(block.get('bitrate', ''), 'kbits/s')
+            self.speed = _parse_float(block.get('speed', ''), 'x')
+            self.drop_frames = _parse_int(block.get('drop_frames', ''))
+            self.dup_frames = _parse_int(block.get('dup_frames', ''))
+            self.out_time = _parse_out_time(block)
+            self.ended = block.get('progress') == 'end'
+            self.updated_at = time.time()
+            alert = self._check_speed()
+
+        if alert:
+            self.on_alert(alert)
+
+    def _check_speed(self):
+        if self.speed is None or self.ended:
+            return None
+        if self.speed >= self.min_speed:
+            recovered = self.slow_count >= self.slow_reports
+            self.slow_count = 0
+            return f"FFmpeg ({self.name}) 處理速度已恢復: {self.speed}x" if recovered else None
+
+        self.slow_count += 1
+        if self.slow_count == self.slow_reports:
+            self.slow_alerts += 1
+            return (f"FFmpeg ({self.name}) 處理速度 {self.speed}x 已連續 {self.slow_count} 次低於 "
+                    f"{self.min_speed}x，即將落後於即時（drop={self.drop_frames}, dup={self.dup_frames}）")
+        return None
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'frame': self.frame,
+                'fps': self.fps,
+                'bitrate_kbps': self.bitrate_kbps,
+                'speed': self.speed,
+                'drop_frames': self.drop_frames,
+                'dup_frames': self.dup_frames,
+                'out_time': self.out_time,
+                'is_slow': self.slow_count >= self.slow_reports,
+                'slow_alerts': self.slow_alerts,
+                'updated_at': self.updated_at,
+            }
+
+def start_progress_reader(stream, progress, on_log=None):
+    """
+    在背景線程讀取 ffmpeg 的 stderr（搭配 -progress pipe:2），
+    key=value 行整理成區塊寫入 progress，其餘日誌行交給 on_log。
+
+    Args:
+        stream: ffmpeg 進程的 stderr（bytes）。
+        progress (FFmpegProgress): 寫入遙測資料的對象。
+        on_log (callable): 處理一般日誌行的函數，None 表示忽略。
+
+    Returns:
+        threading.Thread: 已啟動的讀取線程。
+    """
+    def read_loop():
+        block = {}
+        try:
+            for raw_line in iter(stream.readline, b''):
+                line = raw_line.decode('utf-8', errors='replace').strip()
+                if not line:
+                    continue
+                match = PROGRESS_LINE_PATTERN.match(line)
+                if match is None:
+                    if on_log is not None:
+                        on_log(line)
+                    continue
+                key, value = match.groups()
+                block[key] = value
+                if key == 'progress':
+                    progress.update(block)
+                    block = {}
+        except (ValueError, OSError):
+            # stderr 在進程終止時被關閉
+            pass
+
+    thread = threading.Thread(target=read_loop, daemon=True)
+    thread.start()
+    return thread
@@ -1,6 +1,10 @@
+import logging
 import subprocess
+from .ffmpeg_progress import FFmpegProgress, start_progress_reader
 
-def create_ffmpeg_process(output_url, fps, frame_size):
+logger = logging.getLogger(__name__)
+
+def create_ffmpeg_process(output_url, fps, frame_size, min_speed=1.0):
     """
     創建 FFmpeg 進程用於視頻流處理。
 
@@ -8,9 +12,10 @@ def create_ffmpeg_process(output_url, fps, frame_size):
         output_url (str): 輸出視頻流的 URL。
         fps (int): 幀率。
         frame_size (tuple): 幀大小，格式為 (width, height)。
+        min_speed (float): 低於此處理速度（相對即時）時發出警示。
 
     Returns:
-        tuple: 包含 FFmpeg 進程對象和檢查進程狀態的函數。
+        tuple: 包含 FFmpeg 進程對象、檢查進程狀態的函數，以及 -progress 遙測對象。
 
     Raises:
         Exception: 如果創建進程時發生錯誤。
@@ -39,14 +44,18 @@ def create_ffmpeg_process(output_url, fps, frame_size):
             '-b:v', '2500k',
             '-maxrate', '2500k',
             '-bufsize', '5000k',
+            '-nostats',
+            '-progress', 'pipe:2',
             output_url
         ]
-        process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE)
+        process = subprocess.Popen(ffmpeg_command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        progress = FFmpegProgress(output_url, min_speed=min_speed)
+        start_progress_reader(process.stderr, progress, on_log=lambda line: logger.warning(f"FFmpeg ({output_url}): {line}"))
 
         def check_process():
             return process.poll() is None
 
-        return process, check_process
+        return process, check_process, progress
     except Exception as e:
         raise
 
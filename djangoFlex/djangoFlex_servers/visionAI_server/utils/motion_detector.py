@@ -0,0 +1,67 @@
+import cv2
+
+class MotionDetector:
+    """
+    以縮小的灰階幀做幀差，判斷關鍵幀是否需要重新執行物件偵測。
+
+    比對對象是上一次實際偵測時的參考幀，緩慢的移動也會逐步累積到門檻；
+    連續略過 max_skipped_keyframes 次後強制偵測一次，避免光線漂移讓結果過期太久。
+    """
+
+    def __init__(self, width=160, blur_size=5, pixel_threshold=25, min_area_ratio=0.002, max_skipped_keyframes=30):
+        self.width = width
+        self.blur_size = blur_size
+        self.pixel_threshold = pixel_threshold
+        self.min_area_ratio = min_area_ratio
+        self.max_skipped_keyframes = max_skipped_keyframes
+        self.reference = None
+        self.skipped_keyframes = 0
+        self.total_skipped = 0
+        self.total_detected = 0
+
+    def _preprocess(self, frame):
+        height = max(1, round(frame.shape[0] * self.width / frame.shape[1]))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (self.blur_size, self.blur_size), 0)
+
+    def motion_ratio(self, frame):
+        """
+        計算與參考幀相比變化像素的比例。
+
+        Args:
+            frame (numpy.ndarray): BGR 幀。
+
+        Returns:
+            float: 變化像素佔全部像素的比例；尚無參考幀時回傳 1.0。
+        """
+        return self._motion_ratio(self._preprocess(frame))
+
+    def _motion_ratio(self, gray):
+        if self.reference is None or self.reference.shape != gray.shape:
+            return 1.0
+        diff = cv2.absdiff(self.reference, gray)
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        return cv2.countNonZero(mask) / mask.size
+
+    def should_detect(self, frame):
+        """
+        判斷此關鍵幀是否需要執行偵測；需要時同時更新參考幀。
+
+        Args:
+            frame (numpy.ndarray): BGR 關鍵幀。
+
+        Returns:
+            bool: 畫面有變化或已連續略過太多次時回傳 True。
+        """
+        gray = self._preprocess(frame)
+        moved = self._motion_ratio(gray) >= self.min_area_ratio
+        if moved or self.skipped_keyframes >= self.max_skipped_keyframes:
+            self.reference = gray
+            self.skipped_keyframes = 0
+            self.total_detected += 1
+            return True
+
+        self.skipped_keyframes += 1
+        self.total_skipped += 1
+        return False
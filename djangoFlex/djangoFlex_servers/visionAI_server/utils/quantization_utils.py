@@ -0,0 +1,180 @@
+import re
+import json
+import math
+from pathlib import Path
+import cv2
+import numpy as np
+
+def get_quantized_model_path(onnx_path):
+    """
+    INT8 量化模型的快取路徑，與 FP32 的 best.onnx 放在同一目錄。
+    """
+    return Path(onnx_path).with_name(f"{Path(onnx_path).stem}_int8.onnx")
+
+def get_quantization_report_path(onnx_path):
+    return Path(onnx_path).with_name(f"{Path(onnx_path).stem}_int8_report.json")
+
+def letterbox(frame, imgsz, stride=32, auto=True, pad_value=114):
+    """
+    與 ultralytics 推論時相同的 letterbox 前處理。
+
+    動態輸入的 ONNX 模型推論時使用 auto=True：等比例縮放後只補到 stride 的倍數，
+    得到的是長方形輸入而不是 imgsz x imgsz 的正方形；校正時需使用相同形狀，
+    否則統計到的激活值範圍（尤其是補邊區域）與實際推論不同。
+
+    Args:
+        frame (numpy.ndarray): BGR 幀。
+        imgsz (int): 長邊縮放到的尺寸。
+        stride (int): 模型的最大下採樣倍數。
+        auto (bool): True 時只補到 stride 的倍數，False 時補成正方形。
+        pad_value (int): 補邊的灰階值。
+
+    Returns:
+        numpy.ndarray: 形狀為 (1, 3, H, W)、範圍 0~1 的 RGB float32 張量。
+    """
+    height, width = frame.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    resized_width, resized_height = round(width * ratio), round(height * ratio)
+    pad_width, pad_height = imgsz - resized_width, imgsz - resized_height
+    if auto:
+        pad_width, pad_height = pad_width % stride, pad_height % stride
+    pad_width, pad_height = pad_width / 2, pad_height / 2
+
+    if (resized_width, resized_height) != (width, height):
+        frame = cv2.resize(frame, (resized_width, resized_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_height - 0.1), round(pad_height + 0.1)
+    left, right = round(pad_width - 0.1), round(pad_width + 0.1)
+    padded = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(pad_value,) * 3)
+    tensor = padded[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+def detect_head_nodes(onnx_model):
+    """
+    找出 YOLOv8 Detect head 中不應量化的後處理節點。
+
+    head 最後把像素尺度的框座標與 0~1 的類別分數 Concat 成同一個輸出，
+    若一起量化會共用同一組 uint8 scale，分數幾乎全部被抹平。
+    ultralytics 匯出的節點名稱為 /model.<層號>/...，head 是層號最大的模組；
+    其中的 Conv 仍量化，DFL、解碼、Sigmoid 與 Concat 等後處理保留 FP32。
+
+    Args:
+        onnx_model (onnx.ModelProto): FP32 ONNX 模型。
+
+    Returns:
+        list: 要排除的節點名稱。
+    """
+    pattern = re.compile(r'^/model\.(\d+)/')
+    layer_nodes = {}
+    for node in onnx_model.graph.node:
+        match = pattern.match(node.name)
+        if match:
+            layer_nodes.setdefault(int(match.group(1)), []).append(node)
+    if not layer_nodes:
+        return []
+    head_nodes = layer_nodes[max(layer_nodes)]
+    return [node.name for node in head_nodes if node.op_type != 'Conv']
+
+class FrameCalibrationDataReader:
+    """
+    onnxruntime 靜態量化的校正資料來源，逐幀提供前處理後的輸入。
+    """
+
+    def __init__(self, input_name, frames, imgsz, stride=32):
+        self.input_name = input_name
+        self.frames = iter(frames)
+        self.imgsz = imgsz
+        self.stride = stride
+
+    def get_next(self):
+        frame = next(self.frames, None)
+        if frame is None:
+            return None
+        return {self.input_name: letterbox(frame, self.imgsz, self.stride)}
+
+    def rewind(self):
+        pass
+
+def quantize_onnx_model(onnx_path, calibration_frames, imgsz=1280):
+    """
+    以校正幀對 FP32 ONNX 模型做靜態 INT8 量化（QDQ 格式、權重逐通道）。
+
+    只量化 Conv（YOLOv8 的運算量幾乎都在 Conv），Detect head 的後處理節點另外排除，
+    避免框座標與類別分數共用同一組量化 scale。
+
+    Args:
+        onnx_path (str): FP32 best.onnx 的路徑。
+        calibration_frames (list): 用於統計激活值範圍的 BGR 幀。
+        imgsz (int): 推論輸入尺寸，需與匯出及推論時一致。
+
+    Returns:
+        str: 量化模型的路徑。
+
+    Raises:
+        ValueError: 如果沒有校正幀。
+    """
+    import onnx
+    import onnxruntime
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+
+    if not calibration_frames:
+        raise ValueError("量化需要至少一幀校正資料")
+
+    input_name = onnxruntime.InferenceSession(str(onnx_path), providers=['CPUExecutionProvider']).get_inputs()[0].name
+    nodes_to_exclude = detect_head_nodes(onnx.load(str(onnx_path)))
+    quantized_path = get_quantized_model_path(onnx_path)
+    print(f"以 {len(calibration_frames)} 幀校正量化模型（排除 {len(nodes_to_exclude)} 個 head 節點）: {quantized_path}")
+    quantize_static(
+        str(onnx_path),
+        str(quantized_path),
+        FrameCalibrationDataReader(input_name, calibration_frames, imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        calibrate_method=CalibrationMethod.MinMax,
+        op_types_to_quantize=['Conv'],
+        nodes_to_exclude=nodes_to_exclude,
+    )
+    return str(quantized_path)
+
+def write_quantization_report(onnx_path, report):
+    report_path = get_quantization_report_path(onnx_path)
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return str(report_path)
+
+def select_onnx_variant(onnx_path, max_drift):
+    """
+    依量化報告決定使用 INT8 或 FP32 模型。
+
+    只有量化模型存在、比 FP32 模型新、報告標示 accepted，且報告中 mAP@0.5 相對 FP32 的落差
+    為有限值並不超過 max_drift 時才選用 INT8；缺少任何條件都使用 FP32。
+
+    Args:
+        onnx_path (str): FP32 best.onnx 的路徑。
+        max_drift (float): 可接受的最大 mAP@0.5 落差。
+
+    Returns:
+        str: 實際要載入的模型路徑。
+    """
+    quantized_path = get_quantized_model_path(onnx_path)
+    report_path = get_quantization_report_path(onnx_path)
+    if not quantized_path.exists() or not report_path.exists():
+        return str(onnx_path)
+    if quantized_path.stat().st_mtime < Path(onnx_path).stat().st_mtime:
+        print(f"量化模型比 FP32 模型舊，改用 FP32: {onnx_path}")
+        return str(onnx_path)
+
+    with open(report_path, encoding='utf-8') as f:
+        report = json.load(f)
+    drift = report.get('map50_drift')
+    if not report.get('accepted'):
+        print(f"量化報告未通過精度門檻，使用 FP32 模型: {report_path}")
+        return str(onnx_path)
+    # NaN 與任何數值比較都是 False，需先排除非有限值
+    if not isinstance(drift, (int, float)) or not math.isfinite(drift) or drift > max_drift:
+        print(f"量化模型精度落差 {drift} 超過門檻 {max_drift}，使用 FP32 模型")
+        return str(onnx_path)
+
+    print(f"使用 INT8 量化模型: {quantized_path}（mAP@0.5 落差 {drift:.4f}）")
+    return str(quantized_path)
@@ -0,0 +1,174 @@
+from dataclasses import dataclass
+import numpy as np
+
+@dataclass
+class TrackedObject:
+    track_id: int
+    bbox: tuple
+    conf: float
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    以向量化方式計算兩組邊界框兩兩之間的 IoU。
+
+    Args:
+        boxes_a (numpy.ndarray): 形狀為 (N, 4) 的 xyxy 邊界框。
+        boxes_b (numpy.ndarray): 形狀為 (M, 4) 的 xyxy 邊界框。
+
+    Returns:
+        numpy.ndarray: 形狀為 (N, M) 的 IoU 矩陣。
+    """
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    top_left = np.maximum(boxes_a[:, None, :2], boxes_b[None, :, :2])
+    bottom_right = np.minimum(boxes_a[:, None, 2:], boxes_b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    area_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+def greedy_match(iou, threshold):
+    """
+    依 IoU 由高到低貪婪配對，每列、每行最多配對一次。
+
+    Args:
+        iou (numpy.ndarray): (N, M) 的 IoU 矩陣。
+        threshold (float): 低於此 IoU 的組合不配對。
+
+    Returns:
+        tuple: (配對列表 [(列, 行)], 未配對的列, 未配對的行)。
+    """
+    matches = []
+    matched_rows = set()
+    matched_cols = set()
+    if iou.size > 0:
+        rows, cols = np.unravel_index(np.argsort(-iou, axis=None), iou.shape)
+        for row, col in zip(rows, cols):
+            if iou[row, col] < threshold:
+                break
+            if row in matched_rows or col in matched_cols:
+                continue
+            matches.append((int(row), int(col)))
+            matched_rows.add(row)
+            matched_cols.add(col)
+    unmatched_rows = [row for row in range(iou.shape[0]) if row not in matched_rows]
+    unmatched_cols = [col for col in range(iou.shape[1]) if col not in matched_cols]
+    return matches, unmatched_rows, unmatched_cols
+
+class MultiObjectTracker:
+    """
+    每支攝影機獨立的多目標追蹤器（ByteTrack 式兩階段關聯）。
+
+    只接收原始偵測結果（xyxy 與信心分數），狀態完全存在此物件中，
+    因此多支攝影機可以共用同一個偵測模型與批次推論，而追蹤 ID 仍各自穩定。
+
+    1. 既有軌跡以等速模型預測位置，先與高分偵測以 IoU 配對。
+    2. 剩下的軌跡再與低分偵測配對，找回被遮擋而分數下降的目標。
+    3. 未配對的高分偵測建立新軌跡；連續遺失超過 max_lost 次的軌跡移除。
+    """
+
+    def __init__(self, high_score=0.5, low_score=0.1, new_track_score=0.6,
+                 match_iou=0.2, low_match_iou=0.5, max_lost=30, min_hits=2, velocity_smoothing=0.7):
+        self.high_score = high_score
+        self.low_score = low_score
+        self.new_track_score = new_track_score
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_lost = max_lost
+        self.min_hits = min_hits
+        self.velocity_smoothing = velocity_smoothing
+        self.next_id = 1
+        self.update_count = 0
+        self.bboxes = np.zeros((0, 4), dtype=np.float32)
+        self.velocities = np.zeros((0, 4), dtype=np.float32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.lost = np.zeros(0, dtype=np.int64)
+
+    def reset(self):
+        self.__init__(self.high_score, self.low_score, self.new_track_score, self.match_iou,
+                      self.low_match_iou, self.max_lost, self.min_hits, self.velocity_smoothing)
+
+    def update(self, boxes, scores):
+        """
+        以一幀的偵測結果更新軌跡。
+
+        Args:
+            boxes (numpy.ndarray): 形狀為 (N, 4) 的 xyxy 邊界框。
+            scores (numpy.ndarray): 形狀為 (N,) 的信心分數。
+
+        Returns:
+            list: 本次有更新且已確認的 TrackedObject。
+        """
+        self.update_count += 1
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+
+        # 依遺失的次數外推位置，遮擋後重新出現時仍能配對
+        predicted = self.bboxes + self.velocities * (self.lost + 1)[:, None]
+
+        high = np.flatnonzero(scores >= self.high_score)
+        low = np.flatnonzero((scores >= self.low_score) & (scores < self.high_score))
+
+        matches, unmatched_tracks, unmatched_high = greedy_match(iou_matrix(predicted, boxes[high]), self.match_iou)
+        matches = [(track, high[det]) for track, det in matches]
+
+        low_matches, unmatched_tracks_after_low, _ = greedy_match(
+            iou_matrix(predicted[unmatched_tracks], boxes[low]), self.low_match_iou
+        )
+        matches += [(unmatched_tracks[track], low[det]) for track, det in low_matches]
+        unmatched_tracks = [unmatched_tracks[track] for track in unmatched_tracks_after_low]
+
+        updated = np.zeros(len(self.ids), dtype=bool)
+        if matches:
+            track_index = np.array([track for track, _ in matches])
+            det_index = np.array([det for _, det in matches])
+            steps = (self.lost[track_index] + 1)[:, None]
+            observed_velocity = (boxes[det_index] - self.bboxes[track_index]) / steps
+            self.velocities[track_index] = (
+                self.velocity_smoothing * self.velocities[track_index]
+                + (1 - self.velocity_smoothing) * observed_velocity
+            )
+            self.bboxes[track_index] = boxes[det_index]
+            self.scores[track_index] = scores[det_index]
+            self.hits[track_index] += 1
+            self.lost[track_index] = 0
+            updated[track_index] = True
+
+        if unmatched_tracks:
+            self.lost[unmatched_tracks] += 1
+
+        keep = self.lost <= self.max_lost
+        self._filter_tracks(keep)
+        updated = updated[keep]
+
+        new_dets = [high[det] for det in unmatched_high if scores[high[det]] >= self.new_track_score]
+        if new_dets:
+            updated = np.concatenate([updated, np.ones(len(new_dets), dtype=bool)])
+            self._add_tracks(boxes[new_dets], scores[new_dets])
+
+        # 第一次更新時直接確認，之後的新軌跡需連續命中 min_hits 次
+        confirmed = updated & ((self.hits >= self.min_hits) | (self.update_count == 1))
+        return [
+            TrackedObject(int(self.ids[index]), tuple(float(value) for value in self.bboxes[index]), float(self.scores[index]))
+            for index in np.flatnonzero(confirmed)
+        ]
+
+    def _filter_tracks(self, keep):
+        self.bboxes = self.bboxes[keep]
+        self.velocities = self.velocities[keep]
+        self.scores = self.scores[keep]
+        self.ids = self.ids[keep]
+        self.hits = self.hits[keep]
+        self.lost = self.lost[keep]
+
+    def _add_tracks(self, boxes, scores):
+        count = len(boxes)
+        self.bboxes = np.concatenate([self.bboxes, boxes])
+        self.velocities = np.concatenate([self.velocities, np.zeros((count, 4), dtype=np.float32)])
+        self.scores = np.concatenate([self.scores, scores])
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+        self.hits = np.concatenate([self.hits, np.ones(count, dtype=np.int64)])
+        self.lost = np.concatenate([self.lost, np.zeros(count, dtype=np.int64)])
+        self.next_id += count
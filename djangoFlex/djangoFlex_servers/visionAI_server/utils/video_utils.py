@@ -1,3 +1,4 @@
+import cv2
 
 def fps_controller_adjustment(frames, duration, fps):
     """
@@ -26,4 +27,38 @@ def fps_controller_adjustment(frames, duration, fps):
         # 增加幀數
         return frames + [frames[-1]] * (target_frame_count - current_frame_count)
 
+def read_clip_frames(clip_path, max_frames, stride=1):
+    """
+    從本地影片檔解碼幀，供基準測試與量化校正使用。
+
+    Args:
+        clip_path (str): 影片檔路徑。
+        max_frames (int): 最多回傳的幀數。
+        stride (int): 每隔幾幀取一幀。
+
+    Returns:
+        list: BGR 幀列表。
+
+    Raises:
+        ValueError: 如果影片無法開啟或沒有解碼出任何幀。
+    """
+    capture = cv2.VideoCapture(str(clip_path))
+    if not capture.isOpened():
+        raise ValueError(f"無法開啟影片: {clip_path}")
+    frames = []
+    index = 0
+    try:
+        while len(frames) < max_frames:
+            ret, frame = capture.read()
+            if not ret:
+                break
+            if index % stride == 0:
+                frames.append(frame)
+            index += 1
+    finally:
+        capture.release()
+    if not frames:
+        raise ValueError(f"影片沒有解碼出任何幀: {clip_path}")
+    return frames
+
 # Add other video-related utility functions here
@@ -0,0 +1,11 @@
+from django.http import HttpResponse
+from django.views import View
+from .services.batch_inference_service import render_inference_metrics
+
+class InferenceMetricsView(View):
+    """
+    以 Prometheus text 格式輸出批次推論的延遲與批次大小直方圖。
+    """
+
+    def get(self, request):
+        return HttpResponse(render_inference_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')